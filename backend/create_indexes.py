@@ -4,10 +4,14 @@ Run this once to optimize database performance
 """
 import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
 import os
 from pathlib import Path
 from dotenv import load_dotenv
 
+from utils.notifications import backfill_broadcast_seq
+from utils.search import build_order_search_fields
+
 # Load environment variables
 ROOT_DIR = Path('/app/backend')
 load_dotenv(ROOT_DIR / '.env')
@@ -36,8 +40,35 @@ async def create_indexes():
         await db.orders.create_index('status')
         await db.orders.create_index('payment_status')
         await db.orders.create_index([('business_id', 1), ('created_at', -1)])  # Compound index
+        # Keyset pagination: (created_at, id) matches the page sort exactly
+        await db.orders.create_index([('created_at', -1), ('id', -1)])
+        await db.orders.create_index([('business_id', 1), ('created_at', -1), ('id', -1)])
+        await db.orders.create_index([('status', 1), ('created_at', -1), ('id', -1)])
+        # Teknisi order list (per assignee / per status)
+        await db.orders.create_index([('requires_technician', 1), ('assigned_to', 1), ('created_at', -1)])
+        await db.orders.create_index([('requires_technician', 1), ('status', 1), ('created_at', -1)])
+        # Order search: multikey prefix tokens
+        await db.orders.create_index([('search_tokens', 1), ('created_at', -1)])
+        await db.orders.create_index([('business_id', 1), ('search_tokens', 1)])
         print("✅ Orders indexes created")
         
+        # Backfill search tokens for orders created before search existed
+        backfilled = 0
+        operations = []
+        async for order in db.orders.find(
+            {'search_tokens': {'$exists': False}},
+            {'_id': 0, 'id': 1, 'customer_name': 1, 'customer_phone': 1, 'customer_email': 1, 'order_number': 1}
+        ):
+            operations.append(UpdateOne({'id': order['id']}, {'$set': build_order_search_fields(order)}))
+            if len(operations) >= 1000:
+                await db.orders.bulk_write(operations, ordered=False)
+                backfilled += len(operations)
+                operations = []
+        if operations:
+            await db.orders.bulk_write(operations, ordered=False)
+            backfilled += len(operations)
+        print(f"✅ Order search tokens backfilled ({backfilled} orders)")
+        
         # Transactions collection indexes
         await db.transactions.create_index('created_at')
         await db.transactions.create_index('business_id')
@@ -45,6 +76,10 @@ async def create_indexes():
         await db.transactions.create_index('category')
         await db.transactions.create_index('order_id')
         await db.transactions.create_index([('business_id', 1), ('created_at', -1)])  # Compound index
+        # Keyset pagination: (created_at, id) matches the page sort exactly
+        await db.transactions.create_index([('created_at', -1), ('id', -1)])
+        await db.transactions.create_index([('business_id', 1), ('created_at', -1), ('id', -1)])
+        await db.transactions.create_index([('transaction_type', 1), ('created_at', -1), ('id', -1)])
         print("✅ Transactions indexes created")
         
         # Businesses collection indexes
@@ -64,11 +99,95 @@ async def create_indexes():
         await db.loket_daily_reports.create_index([('business_id', 1), ('report_date', -1)])
         print("✅ Loket reports indexes created")
         
+        # PPOB journal & tutup buku indexes
+        await db.ppob_journal_entries.create_index('tanggal')
+        await db.ppob_journal_entries.create_index('reference_id')
+        await db.ppob_period_closings.create_index('period', unique=True)
+        await db.ppob_period_closings.create_index([('period_end', -1)])
+        print("✅ PPOB accounting indexes created")
+        
+        # PPOB loket shift & saldo chaining indexes
+        await db.ppob_loket_shifts.create_index('id', unique=True)
+        await db.ppob_loket_shifts.create_index([('business_id', 1), ('tanggal', -1)])
+        await db.ppob_channel_saldo.create_index([('business_id', 1), ('channel_name', 1)], unique=True)
+        # Outstanding setoran queue: only 'Belum Disetor' shifts are indexed
+        belum_disetor = {'status_setoran': 'Belum Disetor'}
+        await db.ppob_loket_shifts.create_index(
+            [('business_id', 1), ('tanggal', 1)],
+            name='outstanding_setoran_business',
+            partialFilterExpression=belum_disetor
+        )
+        await db.ppob_loket_shifts.create_index(
+            [('tanggal', 1)],
+            name='outstanding_setoran',
+            partialFilterExpression=belum_disetor
+        )
+        await db.ppob_setoran_counters.create_index('business_id', unique=True)
+        # Bulk import batches (partial imports are located by batch)
+        await db.ppob_loket_shifts.create_index('import_batch_id', sparse=True)
+        await db.ppob_kasir_reports.create_index('import_batch_id', sparse=True)
+        await db.ppob_journal_entries.create_index('import_batch_id', sparse=True)
+        print("✅ PPOB loket shift indexes created")
+        
+        # Order timeline (newest first per order)
+        await db.order_events.create_index([('order_id', 1), ('ts', -1), ('id', -1)])
+        print("✅ Order events indexes created")
+        
+        # Unique document codes (allocated by utils/sequences.py)
+        unique_codes = [
+            (db.orders, 'order_number'),
+            (db.transactions, 'transaction_code'),
+        ]
+        for collection, field in unique_codes:
+            try:
+                await collection.create_index(
+                    field,
+                    unique=True,
+                    partialFilterExpression={field: {'$type': 'string'}}
+                )
+            except Exception as e:
+                # Duplicates from the old random codes must be fixed before the index can be built
+                print(f"⚠️  Unique index on {collection.name}.{field} skipped: {str(e)}")
+        print("✅ Unique code indexes created")
+        
+        # Technical progress: one document per order
+        await db.technical_progress.create_index('order_id', unique=True)
+        print("✅ Technical progress indexes created")
+        
+        # Notifications: inbox (personal + broadcast) and entity timeline
+        await db.notifications.create_index([('user_id', 1), ('is_read', 1), ('created_at', -1)])
+        await db.notifications.create_index([('user_id', 1), ('created_at', -1)])
+        await db.notifications.create_index([('related_type', 1), ('related_id', 1), ('created_at', -1), ('id', -1)])
+        await db.notification_reads.create_index([('user_id', 1), ('notification_id', 1)], unique=True)
+        await db.notifications.create_index([('user_id', 1), ('seq', -1)])
+        await db.notification_reads.create_index([('user_id', 1), ('notification_seq', 1)])
+        print("✅ Notifications indexes created")
+        
+        # Number broadcasts stored before the broadcast sequence existed
+        numbered = await backfill_broadcast_seq(db)
+        print(f"✅ Broadcast seqs backfilled ({numbered} broadcasts)")
+        
         # Activity logs indexes
         await db.activity_logs.create_index('created_at')
         await db.activity_logs.create_index('user_id')
+        await db.activity_logs.create_index([('user_id', 1), ('created_at', -1)])
+        await db.activity_logs.create_index([('related_type', 1), ('related_id', 1), ('created_at', -1), ('id', -1)])
+        await db.activity_logs.create_index([('level', 1), ('created_at', -1)])
         print("✅ Activity logs indexes created")
         
+        # Backfill level for entries logged before it existed (one-off regex pass)
+        result = await db.activity_logs.update_many(
+            {'level': {'$exists': False}, 'action': {'$regex': 'error', '$options': 'i'}},
+            {'$set': {'level': 'error'}}
+        )
+        await db.activity_logs.update_many({'level': {'$exists': False}}, {'$set': {'level': 'info'}})
+        print(f"✅ Activity log levels backfilled ({result.modified_count} errors)")
+        
+        # Error groups (by traceback fingerprint)
+        await db.error_groups.create_index([('last_seen', -1)])
+        await db.error_groups.create_index([('count', -1)])
+        print("✅ Error groups indexes created")
+        
         print("\n" + "=" * 60)
         print("✅ All indexes created successfully!")
         print("\nIndexes will significantly improve query performance.")
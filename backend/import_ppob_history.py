@@ -0,0 +1,86 @@
+"""
+Script to bulk import historical PPOB loket shift & kasir reports
+Usage:
+    python import_ppob_history.py --user-id <owner_id> --loket shifts.csv --kasir kasir.json
+Files may be JSON (array of records) or CSV (list columns as JSON arrays)
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from models import PPOBLoketShiftImport, PPOBKasirReportCreate
+from utils.ppob_import import parse_ppob_csv, validate_ppob_records, import_ppob_records
+
+# Load environment variables
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+
+def load_records(path: str, model) -> list:
+    """Load and validate records from a JSON or CSV file"""
+    text = Path(path).read_text(encoding='utf-8-sig')
+    try:
+        records = parse_ppob_csv(text) if path.lower().endswith('.csv') else json.loads(text)
+    except HTTPException as e:
+        print(f"❌ {path}: {e.detail['message']} - {e.detail['error']}")
+        sys.exit(1)
+
+    valid, errors = validate_ppob_records(records, model)
+    if errors:
+        print(f"❌ {path}: {len(errors)} record tidak valid")
+        for error in errors[:20]:
+            print(f"   baris {error['index']}: {error['errors']}")
+        sys.exit(1)
+
+    print(f"✅ {path}: {len(valid)} record valid")
+    return valid
+
+
+async def main(args):
+    loket_shifts = load_records(args.loket, PPOBLoketShiftImport) if args.loket else []
+    kasir_reports = load_records(args.kasir, PPOBKasirReportCreate) if args.kasir else []
+
+    # MongoDB connection
+    mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+    client = AsyncIOMotorClient(mongo_url)
+    db = client[os.environ.get('DB_NAME', 'gelis_db')]
+
+    print("🔧 Importing PPOB history...")
+    try:
+        summary = await import_ppob_records(
+            db, loket_shifts, kasir_reports, args.user_id, chunk_size=args.chunk_size
+        )
+        print(f"✅ Loket shifts imported : {summary['loket_shifts_imported']}")
+        print(f"✅ Kasir reports imported: {summary['kasir_reports_imported']}")
+        print(f"✅ Journal entries       : {summary['journal_entries_created']}")
+        print(f"✅ Shifts settled (Lunas): {summary['shifts_settled']}")
+    except HTTPException as e:
+        if e.status_code >= 500 and isinstance(e.detail, dict):
+            # Chunks already written stay in the database
+            print(f"\n❌ {e.detail['message']}")
+            print(f"   Error: {e.detail['error']}")
+            print(f"⚠️  Loket shifts tersimpan : {e.detail['loket_shifts_imported']}")
+            print(f"⚠️  Kasir reports tersimpan: {e.detail['kasir_reports_imported']}")
+            print(f"⚠️  Journal entries        : {e.detail['journal_entries_created']}")
+            print(f"⚠️  Shifts settled (Lunas) : {e.detail['shifts_settled']}")
+            print(f"   Hapus dokumen dengan import_batch_id={e.detail['import_batch_id']} sebelum import ulang")
+        else:
+            print(f"\n❌ Import ditolak: {e.detail}")
+    finally:
+        client.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Bulk import PPOB history')
+    parser.add_argument('--loket', help='File laporan shift loket (.json/.csv)')
+    parser.add_argument('--kasir', help='File laporan kasir (.json/.csv)')
+    parser.add_argument('--user-id', required=True, help='User ID yang tercatat sebagai created_by')
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    asyncio.run(main(parser.parse_args()))
@@ -36,6 +36,7 @@ class NotificationType(str, Enum):
     WARNING = 'warning'
     ERROR = 'error'
     SUCCESS = 'success'
+    PPOB_SETORAN = 'ppob_setoran'
 
 # User Models
 class UserBase(BaseModel):
@@ -141,6 +142,15 @@ class Order(OrderBase):
     updated_at: datetime
     technical_progress: Optional[Dict[str, Any]] = None  # Technical progress data
 
+class BulkOrderAssign(BaseModel):
+    order_ids: List[str] = Field(..., min_length=1, max_length=500)
+    technician_id: Optional[str] = None  # Kosong / None = lepas penugasan
+
+class BulkOrderStatusUpdate(BaseModel):
+    order_ids: List[str] = Field(..., min_length=1, max_length=500)
+    status: OrderStatus
+    notes: Optional[str] = None
+
 # Transaction Models
 class TransactionBase(BaseModel):
     business_id: str
@@ -305,6 +315,7 @@ class Notification(NotificationBase):
 class ActivityLogBase(BaseModel):
     user_id: str
     action: str
+    level: str = 'info'
     description: Optional[str] = None
     ip_address: Optional[str] = None
     user_agent: Optional[str] = None
@@ -747,6 +758,15 @@ class PPOBKasirReportResponse(PPOBKasirReport):
     created_by: str
     created_at: datetime
 
+# BULK IMPORT PPOB (data historis outlet baru)
+
+class PPOBLoketShiftImport(PPOBLoketShiftReportCreate):
+    import_ref: Optional[str] = None  # Referensi lokal, bisa dipakai di setoran_loket.loket_report_id
+
+class PPOBBulkImportRequest(BaseModel):
+    loket_shifts: List[PPOBLoketShiftImport] = []
+    kasir_reports: List[PPOBKasirReportCreate] = []
+
 # MENU 3: AKUNTING PPOB (Supporting Models)
 
 class PPOBAccountBalance(BaseModel):
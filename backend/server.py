@@ -1,11 +1,16 @@
-from fastapi import FastAPI, APIRouter, HTTPException, status, Depends, Request, Body
+from fastapi import FastAPI, APIRouter, HTTPException, status, Depends, Request, Body, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import PlainTextResponse
+from fastapi.security import HTTPAuthorizationCredentials
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import ExecutionTimeout
 from dotenv import load_dotenv
 from pathlib import Path
 import os
+import asyncio
 import logging
+import secrets
 from datetime import datetime, timezone, timedelta
 from typing import List, Optional
 
@@ -15,10 +20,50 @@ from models import *
 # Import utils
 from utils.auth import (
     get_password_hash, verify_password, create_access_token, 
-    get_current_user, decode_token
+    get_current_user, decode_token, security
 )
 from utils.permissions import check_permission, require_permission, ROLE_OWNER
-from utils.helpers import generate_id, generate_code, utc_now
+from utils.helpers import generate_id, utc_now
+from utils.sequences import sequence_allocator
+from utils.pagination import fetch_keyset_page
+from utils.cache import app_cache, ORDERS_CACHE
+from utils.background_writer import background_writer
+from utils.transactions import commit_together
+from utils.retention import purge_activity_logs, run_retention_loop
+from utils.timeline import get_entity_timeline
+from utils.settings_service import settings_service
+from utils.metrics import metrics, MetricsMiddleware
+from utils.db_monitoring import db_listener, DbStatsMiddleware
+from utils.db_introspection import get_collections_info, explain_find, clamp_max_time_ms, DEFAULT_QUERY_TIME_MS
+from utils.error_tracking import LEVEL_INFO, LEVEL_ERROR, ErrorCaptureMiddleware
+from utils.notifications import (
+    BROADCAST_MANAGER, build_notification, send_notifications,
+    get_inbox, get_unread_count, mark_read, mark_all_read
+)
+from utils.order_events import (
+    build_order_event, record_order_event, get_order_events, token_actor,
+    ORDER_CREATED, ORDER_STATUS_CHANGED, ORDER_PROGRESS_UPDATED, ORDER_STEP_UPDATED,
+    ORDER_ASSIGNED, ORDER_PAYMENT_RECEIVED
+)
+from utils.technical_progress import (
+    calculate_overall_progress, build_progress_summary, newer_summary_filter,
+    update_progress_step, get_progress_by_order_ids
+)
+from utils.search import (
+    SEARCH_FIELDS_EXCLUDED, build_order_search_fields, search_fields_for_update,
+    parse_search_terms, build_order_search_pipeline
+)
+from utils.ppob_accounting import (
+    build_ppob_loket_shift, build_ppob_kasir_report,
+    get_latest_ppob_closing, open_period_query, ensure_ppob_period_open,
+    aggregate_ppob_account_totals, merge_ppob_account_totals,
+    close_ppob_period, reopen_ppob_period
+)
+from utils.ppob_import import parse_ppob_csv, validate_ppob_records, import_ppob_records
+from utils.ppob_saldo import update_channel_saldo_index, get_channel_saldo, find_channel_saldo_gaps
+from utils.ppob_setoran import (
+    add_outstanding_setoran, settle_loket_shifts, get_setoran_counters, get_outstanding_setoran_queue
+)
 
 # Activity logging helper
 async def log_activity(
@@ -28,13 +73,37 @@ async def log_activity(
     ip_address: str = '0.0.0.0',
     related_type: str = None,
     related_id: str = None,
-    metadata: dict = None
+    metadata: dict = None,
+    critical: bool = False,
+    level: str = LEVEL_INFO
 ):
-    """Log user activity for audit trail"""
-    activity_log = {
+    """
+    Log user activity for audit trail.
+    Entries are batched off the request path by the background writer;
+    critical=True writes synchronously (deletes, period closing, imports).
+    level (info/warning/error) is indexed for /dev/errors.
+    """
+    activity_log = build_activity_log(user_id, action, description, ip_address, related_type, related_id, metadata, level)
+    if critical:
+        await db.activity_logs.insert_one(activity_log)
+    else:
+        await background_writer.put('activity_logs', activity_log)
+
+def build_activity_log(
+    user_id: str,
+    action: str,
+    description: str,
+    ip_address: str = '0.0.0.0',
+    related_type: str = None,
+    related_id: str = None,
+    metadata: dict = None,
+    level: str = LEVEL_INFO
+) -> dict:
+    return {
         'id': generate_id(),
         'user_id': user_id,
         'action': action,
+        'level': level,
         'description': description,
         'ip_address': ip_address,
         'related_type': related_type,
@@ -42,15 +111,17 @@ async def log_activity(
         'metadata': metadata or {},
         'created_at': utc_now().isoformat()
     }
-    await db.activity_logs.insert_one(activity_log)
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection (Kubernetes will inject MONGO_URL and DB_NAME, fallback for local dev)
 mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[db_listener])
 db = client[os.environ.get('DB_NAME', 'gelis_db')]
+background_writer.bind(db)
+sequence_allocator.bind(db)
+settings_service.bind(db)
 
 # Create the main app
 app = FastAPI(title='GELIS - Sistem Monitoring Operasional Multi-Bisnis')
@@ -140,13 +211,13 @@ async def login(login_data: UserLogin, request: Request):
         metadata={'username': user['username'], 'role_id': user['role_id'], 'user_agent': request.headers.get('user-agent')}
     )
     
-    # Create access token
+    # Create access token (lifetime from the session_timeout setting)
     access_token = create_access_token(data={
         'sub': user['id'],
         'username': user['username'],
         'email': user['email'],
         'role_id': user['role_id']
-    })
+    }, expires_delta=timedelta(minutes=await settings_service.get_session_timeout()))
     
     # Get role name
     role = await db.roles.find_one({'id': user['role_id']}, {'_id': 0})
@@ -318,18 +389,160 @@ async def get_orders(
         query['status'] = status_filter
     
     # Pagination for faster loading (default: 100 latest orders)
-    orders = await db.orders.find(query, {'_id': 0}).sort('created_at', -1).skip(skip).limit(limit).to_list(limit)
+    orders = await db.orders.find(query, SEARCH_FIELDS_EXCLUDED).sort('created_at', -1).skip(skip).limit(limit).to_list(limit)
     for order in orders:
         for field in ['created_at', 'updated_at', 'completion_date']:
             if order.get(field) and isinstance(order[field], str):
                 order[field] = datetime.fromisoformat(order[field])
     return orders
 
+@api_router.get('/orders/page', response_model=dict)
+async def get_orders_page(
+    business_id: Optional[str] = None,
+    status_filter: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = 100,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Cursor-based order list: pass `next_cursor` from the previous page as `after`.
+    Each page is a single index seek on (created_at, id), regardless of depth.
+    """
+    user = await db.users.find_one({'id': current_user['sub']}, {'_id': 0})
+    if user['role_id'] not in [1, 2, 5, 6, 8]:  # Owner, Manager, Kasir, Loket
+        raise HTTPException(status_code=403, detail='Tidak memiliki akses ke menu Pesanan')
+    
+    query = {}
+    if business_id:
+        query['business_id'] = business_id
+    if status_filter:
+        query['status'] = status_filter
+    
+    orders, next_cursor = await fetch_keyset_page(db.orders, query, limit, after, projection=SEARCH_FIELDS_EXCLUDED)
+    
+    return {
+        'items': orders,
+        'count': len(orders),
+        'next_cursor': next_cursor
+    }
+
+@api_router.get('/orders/status-board', response_model=dict)
+async def get_order_status_board(
+    business_id: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    requires_technician: Optional[bool] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Jumlah & nilai pesanan per (business, status, payment_status) dalam satu agregasi.
+    Hasil di-cache dan di-invalidate setiap ada perubahan pesanan.
+    """
+    user = await db.users.find_one({'id': current_user['sub']}, {'_id': 0})
+    if user['role_id'] not in [1, 2, 3, 5, 6, 8]:
+        raise HTTPException(status_code=403, detail='Tidak memiliki akses ke menu Pesanan')
+    
+    cache_key = ('status-board', business_id, start_date, end_date, requires_technician)
+    cached = app_cache.get(ORDERS_CACHE, cache_key)
+    if cached is not None:
+        return {**cached, 'cached': True}
+    # Version before the query: a write landing during the aggregation skips the store
+    cache_version = app_cache.version(ORDERS_CACHE)
+    
+    query = {}
+    if business_id:
+        query['business_id'] = business_id
+    if start_date and end_date:
+        query['created_at'] = {'$gte': start_date, '$lte': end_date}
+    if requires_technician is not None:
+        query['requires_technician'] = requires_technician
+    
+    pipeline = [
+        {'$match': query},
+        {'$group': {
+            '_id': {'business_id': '$business_id', 'status': '$status', 'payment_status': '$payment_status'},
+            'count': {'$sum': 1},
+            'total_amount': {'$sum': '$total_amount'},
+            'paid_amount': {'$sum': '$paid_amount'}
+        }}
+    ]
+    groups = await db.orders.aggregate(pipeline).to_list(None)
+    
+    businesses = {}
+    totals = {'count': 0, 'total_amount': 0.0, 'paid_amount': 0.0, 'by_status': {}, 'by_payment_status': {}}
+    for group in groups:
+        key = group['_id']
+        board = businesses.setdefault(key.get('business_id'), {
+            'business_id': key.get('business_id'),
+            'count': 0, 'total_amount': 0.0, 'paid_amount': 0.0,
+            'by_status': {}, 'by_payment_status': {}, 'groups': []
+        })
+        for target in (board, totals):
+            target['count'] += group['count']
+            target['total_amount'] += group['total_amount']
+            target['paid_amount'] += group['paid_amount']
+            target['by_status'][key.get('status')] = target['by_status'].get(key.get('status'), 0) + group['count']
+            target['by_payment_status'][key.get('payment_status')] = target['by_payment_status'].get(key.get('payment_status'), 0) + group['count']
+        board['groups'].append({
+            'status': key.get('status'),
+            'payment_status': key.get('payment_status'),
+            'count': group['count'],
+            'total_amount': group['total_amount'],
+            'paid_amount': group['paid_amount']
+        })
+    
+    result = {
+        'businesses': sorted(businesses.values(), key=lambda b: b['business_id'] or ''),
+        'totals': totals,
+        'generated_at': utc_now().isoformat()
+    }
+    app_cache.set(ORDERS_CACHE, cache_key, result, version=cache_version)
+    
+    return {**result, 'cached': False}
+
+@api_router.get('/orders/search', response_model=dict)
+async def search_orders(
+    q: str,
+    business_id: Optional[str] = None,
+    status_filter: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 20,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Cari pesanan berdasarkan nama/telepon/email pelanggan atau nomor order.
+    Setiap kata dicocokkan sebagai prefix (as-you-type), hasil diurutkan
+    berdasarkan kecocokan kata utuh lalu yang terbaru.
+    """
+    user = await db.users.find_one({'id': current_user['sub']}, {'_id': 0})
+    if user['role_id'] not in [1, 2, 5, 6, 8]:  # Owner, Manager, Kasir, Loket
+        raise HTTPException(status_code=403, detail='Tidak memiliki akses ke menu Pesanan')
+    
+    terms = parse_search_terms(q)
+    limit = max(1, min(limit, 100))
+    
+    filters = {}
+    if business_id:
+        filters['business_id'] = business_id
+    if status_filter:
+        filters['status'] = status_filter
+    
+    # Fetch one extra to know whether another page exists
+    pipeline = build_order_search_pipeline(terms, filters, max(skip, 0), limit + 1)
+    orders = await db.orders.aggregate(pipeline).to_list(limit + 1)
+    
+    return {
+        'items': orders[:limit],
+        'count': min(len(orders), limit),
+        'terms': terms,
+        'has_more': len(orders) > limit
+    }
+
 @api_router.post('/orders', response_model=Order)
 async def create_order(order_data: OrderCreate, current_user: dict = Depends(get_current_user)):
     order_dict = order_data.model_dump()
     order_dict['id'] = generate_id()
-    order_dict['order_number'] = generate_code('ORD', 12)
+    order_dict['order_number'] = await sequence_allocator.next_code('ORD')
     order_dict['status'] = OrderStatus.PENDING
     
     # Auto-set payment status based on paid_amount
@@ -348,14 +561,16 @@ async def create_order(order_data: OrderCreate, current_user: dict = Depends(get
     doc = order_dict.copy()
     doc['created_at'] = doc['created_at'].isoformat()
     doc['updated_at'] = doc['updated_at'].isoformat()
+    doc.update(build_order_search_fields(doc))
     
-    await db.orders.insert_one(doc)
+    # Order + its payment transaction commit together; side effects are deferred
+    writes = [lambda session: db.orders.insert_one(doc, session=session)]
     
     # AUTO-CREATE TRANSACTION if payment received on creation
     if order_dict.get('paid_amount', 0) > 0:
         transaction = {
             'id': generate_id(),
-            'transaction_code': generate_code('TXN', 12),
+            'transaction_code': await sequence_allocator.next_code('TXN'),
             'business_id': order_dict['business_id'],
             'transaction_type': 'income',
             'category': 'Order Payment',
@@ -367,8 +582,19 @@ async def create_order(order_data: OrderCreate, current_user: dict = Depends(get
             'created_by': current_user['sub'],
             'created_at': utc_now().isoformat()
         }
-        await db.transactions.insert_one(transaction)
-        
+        writes.append(lambda session: db.transactions.insert_one(transaction, session=session))
+    
+    await commit_together(client, writes)
+    app_cache.invalidate(ORDERS_CACHE)
+    
+    background_writer.insert('order_events', build_order_event(order_dict['id'], ORDER_CREATED, token_actor(current_user), {
+        'status': order_dict['status'],
+        'payment_status': order_dict['payment_status'],
+        'total_amount': order_dict.get('total_amount', 0),
+        'paid_amount': order_dict.get('paid_amount', 0)
+    }))
+    
+    if order_dict.get('paid_amount', 0) > 0:
         # Log activity
         await log_activity(
             user_id=current_user['sub'],
@@ -380,18 +606,13 @@ async def create_order(order_data: OrderCreate, current_user: dict = Depends(get
         )
     
     # Create notification for manager
-    notif = {
-        'id': generate_id(),
-        'user_id': 'broadcast_manager',  # Special ID for broadcast
-        'title': 'Pesanan Baru',
-        'message': f"Pesanan baru {order_dict['order_number']} dari {order_dict['customer_name']}",
-        'type': 'info',
-        'related_id': order_dict['id'],
-        'related_type': 'order',
-        'is_read': False,
-        'created_at': utc_now().isoformat()
-    }
-    await db.notifications.insert_one(notif)
+    await send_notifications(db, [build_notification(
+        BROADCAST_MANAGER,
+        'Pesanan Baru',
+        f"Pesanan baru {order_dict['order_number']} dari {order_dict['customer_name']}",
+        related_type='order',
+        related_id=order_dict['id']
+    )], background_writer)
     
     return Order(**order_dict)
 
@@ -402,6 +623,9 @@ async def update_order(
     payment_status: Optional[str] = None,
     assigned_to: Optional[str] = None,
     paid_amount: Optional[float] = None,
+    customer_name: Optional[str] = None,
+    customer_phone: Optional[str] = None,
+    customer_email: Optional[str] = None,
     current_user: dict = Depends(get_current_user)
 ):
     # Get existing order
@@ -411,29 +635,35 @@ async def update_order(
     
     update_data = {'updated_at': utc_now().isoformat()}
     
+    # Customer data edits (search tokens rebuilt below)
+    for field, value in (('customer_name', customer_name), ('customer_phone', customer_phone), ('customer_email', customer_email)):
+        if value is not None:
+            update_data[field] = value
+    actor = token_actor(current_user)
+    events = []
+    notifications = []
+    transaction = None
+    
     if status:
         update_data['status'] = status
         if status == 'completed':
             update_data['completion_date'] = utc_now().isoformat()
+        events.append(build_order_event(order_id, ORDER_STATUS_CHANGED, actor, {'from': order.get('status'), 'to': status}))
     
     if payment_status:
         update_data['payment_status'] = payment_status
     
     if assigned_to:
         update_data['assigned_to'] = assigned_to
-        # Create notification for assigned user
-        notif = {
-            'id': generate_id(),
-            'user_id': assigned_to,
-            'title': 'Pesanan Ditugaskan',
-            'message': f"Anda ditugaskan untuk pesanan {order['order_number']}",
-            'type': 'info',
-            'related_id': order_id,
-            'related_type': 'order',
-            'is_read': False,
-            'created_at': utc_now().isoformat()
-        }
-        await db.notifications.insert_one(notif)
+        events.append(build_order_event(order_id, ORDER_ASSIGNED, actor, {'from': order.get('assigned_to'), 'to': assigned_to}))
+        # Notification for the assigned user, sent once the update is committed
+        notifications.append(build_notification(
+            assigned_to,
+            'Pesanan Ditugaskan',
+            f"Anda ditugaskan untuk pesanan {order['order_number']}",
+            related_type='order',
+            related_id=order_id
+        ))
     
     # AUTO-CREATE TRANSACTION when payment received
     if paid_amount is not None and paid_amount > 0:
@@ -444,7 +674,7 @@ async def update_order(
             # Create income transaction automatically
             transaction = {
                 'id': generate_id(),
-                'transaction_code': generate_code('TXN', 12),
+                'transaction_code': await sequence_allocator.next_code('TXN'),
                 'business_id': order['business_id'],
                 'transaction_type': 'income',
                 'category': 'Order Payment',
@@ -456,28 +686,232 @@ async def update_order(
                 'created_by': current_user['sub'],
                 'created_at': utc_now().isoformat()
             }
-            await db.transactions.insert_one(transaction)
-            
-            # Log activity
-            activity_log = {
-                'id': generate_id(),
-                'user_id': current_user['sub'],
-                'action': 'payment_received',
-                'description': f"Pembayaran {new_payment} untuk order {order['order_number']} - Auto transaction created",
-                'ip_address': '0.0.0.0',
-                'created_at': utc_now().isoformat()
-            }
-            await db.activity_logs.insert_one(activity_log)
+            events.append(build_order_event(order_id, ORDER_PAYMENT_RECEIVED, actor, {
+                'amount': new_payment,
+                'paid_amount': paid_amount,
+                'transaction_id': transaction['id']
+            }))
         
         update_data['paid_amount'] = paid_amount
     
-    result = await db.orders.update_one({'id': order_id}, {'$set': update_data})
+    # Keep search tokens in sync with customer name/phone/email
+    update_data.update(search_fields_for_update(order, update_data))
     
-    if result.modified_count == 0:
+    # Order update + payment transaction commit together
+    results = []
+    
+    async def update_order_doc(session):
+        results.append(await db.orders.update_one({'id': order_id}, {'$set': update_data}, session=session))
+    
+    writes = [update_order_doc]
+    if transaction:
+        writes.append(lambda session: db.transactions.insert_one(transaction, session=session))
+    await commit_together(client, writes)
+    app_cache.invalidate(ORDERS_CACHE)
+    
+    # A retried transaction runs the writes again; the last attempt is the committed one
+    if results[-1].modified_count == 0:
         raise HTTPException(status_code=404, detail='Order tidak ditemukan')
     
+    background_writer.insert_many('order_events', events)
+    await send_notifications(db, notifications, background_writer)
+    
+    # Logged only once the payment transaction is actually committed
+    if transaction:
+        await log_activity(
+            current_user['sub'],
+            'payment_received',
+            f"Pembayaran {transaction['amount']} untuk order {order['order_number']} - Auto transaction created",
+            related_type='order',
+            related_id=order_id,
+            metadata={'amount': transaction['amount'], 'transaction_id': transaction['id']}
+        )
+    
     return {'message': 'Order berhasil diupdate', 'auto_transaction_created': paid_amount is not None and (paid_amount - order.get('paid_amount', 0)) > 0}
 
+async def _load_bulk_orders(order_ids: List[str]) -> tuple:
+    """Fetch the orders of a bulk request in one query; returns (orders, missing_ids)"""
+    order_ids = list(dict.fromkeys(order_ids))
+    orders = await db.orders.find(
+        {'id': {'$in': order_ids}},
+        {'_id': 0, 'id': 1, 'order_number': 1, 'status': 1, 'assigned_to': 1}
+    ).to_list(len(order_ids))
+    found = {order['id'] for order in orders}
+    return orders, [order_id for order_id in order_ids if order_id not in found]
+
+@api_router.post('/orders/bulk/assign', response_model=dict)
+async def bulk_assign_orders(
+    request: BulkOrderAssign,
+    current_user: dict = Depends(get_current_user)
+):
+    """Tugaskan (atau lepas) teknisi untuk banyak pesanan sekaligus"""
+    user = await db.users.find_one({'id': current_user['sub']}, {'_id': 0})
+    if user['role_id'] not in [1, 2, 8]:
+        raise HTTPException(status_code=403, detail='Hanya Owner/Manager yang dapat menugaskan teknisi')
+    
+    # Validate technician once for the whole batch
+    technician = None
+    if request.technician_id:
+        technician = await db.users.find_one({'id': request.technician_id, 'role_id': 7}, {'_id': 0})
+        if not technician:
+            raise HTTPException(status_code=404, detail='Teknisi tidak ditemukan')
+        if not technician.get('is_active', False):
+            raise HTTPException(status_code=400, detail='Teknisi tidak aktif')
+    
+    orders, missing = await _load_bulk_orders(request.order_ids)
+    if not orders:
+        raise HTTPException(status_code=404, detail='Order tidak ditemukan')
+    
+    now = utc_now().isoformat()
+    result = await db.orders.update_many(
+        {'id': {'$in': [order['id'] for order in orders]}},
+        {'$set': {'assigned_to': request.technician_id or None, 'updated_at': now}}
+    )
+    app_cache.invalidate(ORDERS_CACHE)
+    
+    tech_name = technician.get('full_name', technician.get('username', 'Unknown')) if technician else 'None'
+    background_writer.insert_many('order_events', [
+        build_order_event(order['id'], ORDER_ASSIGNED, user, {
+            'from': order.get('assigned_to'),
+            'to': request.technician_id or None,
+            'technician_name': tech_name if technician else None,
+            'bulk': True
+        })
+        for order in orders
+    ])
+    background_writer.insert_many('activity_logs', [
+        build_activity_log(
+            current_user['sub'],
+            'assign_technician',
+            f"Menugaskan order {order.get('order_number', order['id'])} ke teknisi {tech_name}",
+            related_type='order',
+            related_id=order['id'],
+            metadata={'bulk': True}
+        )
+        for order in orders
+    ])
+    if technician:
+        await send_notifications(db, [
+            build_notification(
+                request.technician_id,
+                'Pesanan Ditugaskan',
+                f"Anda ditugaskan untuk pesanan {order.get('order_number', order['id'])}",
+                related_type='order',
+                related_id=order['id'],
+                created_at=now
+            )
+            for order in orders
+        ], background_writer)
+    
+    return {
+        'message': f'{result.modified_count} pesanan berhasil ditugaskan',
+        'assigned_to': request.technician_id or None,
+        'updated': result.modified_count,
+        'not_found': missing
+    }
+
+@api_router.post('/orders/bulk/status', response_model=dict)
+async def bulk_update_order_status(
+    request: BulkOrderStatusUpdate,
+    current_user: dict = Depends(get_current_user)
+):
+    """Ubah status banyak pesanan sekaligus (mis. menutup pesanan selesai)"""
+    user = await db.users.find_one({'id': current_user['sub']}, {'_id': 0})
+    if user['role_id'] not in [1, 2, 8]:
+        raise HTTPException(status_code=403, detail='Tidak memiliki akses')
+    
+    orders, missing = await _load_bulk_orders(request.order_ids)
+    if not orders:
+        raise HTTPException(status_code=404, detail='Order tidak ditemukan')
+    
+    # Orders already in the target status are left untouched
+    to_update = [order for order in orders if order.get('status') != request.status.value]
+    
+    now = utc_now().isoformat()
+    update_data = {'status': request.status.value, 'updated_at': now}
+    if request.status == OrderStatus.COMPLETED:
+        update_data['completion_date'] = now
+    
+    modified = 0
+    if to_update:
+        result = await db.orders.update_many(
+            {'id': {'$in': [order['id'] for order in to_update]}},
+            {'$set': update_data}
+        )
+        modified = result.modified_count
+        app_cache.invalidate(ORDERS_CACHE)
+    
+    background_writer.insert_many('order_events', [
+        build_order_event(order['id'], ORDER_STATUS_CHANGED, user, {
+            'from': order.get('status'),
+            'to': request.status.value,
+            'notes': request.notes,
+            'bulk': True
+        })
+        for order in to_update
+    ])
+    background_writer.insert_many('activity_logs', [
+        build_activity_log(
+            current_user['sub'],
+            'update_order_status',
+            f"Update status order {order.get('order_number', order['id'])} menjadi {request.status.value}",
+            related_type='order',
+            related_id=order['id'],
+            metadata={'bulk': True, 'from': order.get('status')}
+        )
+        for order in to_update
+    ])
+    # Notify assigned technicians whose orders changed
+    await send_notifications(db, [
+        build_notification(
+            order['assigned_to'],
+            'Status Pesanan Diubah',
+            f"Status pesanan {order.get('order_number', order['id'])} diubah menjadi {request.status.value}",
+            related_type='order',
+            related_id=order['id'],
+            created_at=now
+        )
+        for order in to_update
+        if order.get('assigned_to') and order['assigned_to'] != current_user['sub']
+    ], background_writer)
+    
+    return {
+        'message': f'{modified} pesanan berhasil diupdate menjadi {request.status.value}',
+        'updated': modified,
+        'unchanged': len(orders) - len(to_update),
+        'not_found': missing
+    }
+
+@api_router.get('/orders/{order_id}/events', response_model=dict)
+async def get_order_timeline(
+    order_id: str,
+    event_type: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = 50,
+    current_user: dict = Depends(get_current_user)
+):
+    """Timeline pesanan (terbaru dulu); pass `next_cursor` sebagai `after` untuk halaman berikutnya"""
+    user = await db.users.find_one({'id': current_user['sub']}, {'_id': 0})
+    order = await db.orders.find_one({'id': order_id}, {'_id': 0, 'id': 1, 'assigned_to': 1, 'notes': 1})
+    if not order:
+        raise HTTPException(status_code=404, detail='Order tidak ditemukan')
+    
+    if user['role_id'] == 7:  # Teknisi
+        if order.get('assigned_to') != current_user['sub']:
+            raise HTTPException(status_code=403, detail='Order tidak di-assign ke Anda')
+    elif user['role_id'] not in [1, 2, 5, 6, 8]:
+        raise HTTPException(status_code=403, detail='Tidak memiliki akses ke menu Pesanan')
+    
+    events, next_cursor = await get_order_events(db, order_id, after, limit, event_type)
+    
+    return {
+        'order_id': order_id,
+        'events': events,
+        'count': len(events),
+        'next_cursor': next_cursor,
+        'notes': order.get('notes')  # Catatan awal pesanan (termasuk catatan lama sebelum timeline)
+    }
+
 # ============= TRANSACTION ROUTES =============
 @api_router.get('/transactions', response_model=List[Transaction])
 async def get_transactions(
@@ -510,11 +944,42 @@ async def get_transactions(
     
     return transactions
 
+@api_router.get('/transactions/page', response_model=dict)
+async def get_transactions_page(
+    business_id: Optional[str] = None,
+    transaction_type: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = 100,
+    current_user: dict = Depends(get_current_user)
+):
+    """Cursor-based transaction list: pass `next_cursor` from the previous page as `after`"""
+    user = await db.users.find_one({'id': current_user['sub']}, {'_id': 0})
+    if user['role_id'] not in [1, 2, 3, 8]:  # Owner, Manager, Finance, IT Developer
+        raise HTTPException(status_code=403, detail='Tidak memiliki akses ke menu Akunting')
+    
+    query = {}
+    if business_id:
+        query['business_id'] = business_id
+    if transaction_type:
+        query['transaction_type'] = transaction_type
+    if start_date and end_date:
+        query['created_at'] = {'$gte': start_date, '$lte': end_date}
+    
+    transactions, next_cursor = await fetch_keyset_page(db.transactions, query, limit, after)
+    
+    return {
+        'items': transactions,
+        'count': len(transactions),
+        'next_cursor': next_cursor
+    }
+
 @api_router.post('/transactions', response_model=Transaction)
 async def create_transaction(txn_data: TransactionCreate, current_user: dict = Depends(get_current_user)):
     txn_dict = txn_data.model_dump()
     txn_dict['id'] = generate_id()
-    txn_dict['transaction_code'] = generate_code('TXN', 12)
+    txn_dict['transaction_code'] = await sequence_allocator.next_code('TXN')
     txn_dict['created_by'] = current_user['sub']
     txn_dict['created_at'] = utc_now()
     
@@ -570,15 +1035,14 @@ async def delete_transaction(transaction_id: str, current_user: dict = Depends(g
         raise HTTPException(status_code=404, detail='Transaksi tidak ditemukan')
     
     # Log activity
-    activity_log = {
-        'id': generate_id(),
-        'user_id': current_user['sub'],
-        'action': 'delete_transaction',
-        'description': f"Menghapus transaksi {transaction['transaction_code']} - {transaction['description']} (Rp {transaction['amount']})",
-        'ip_address': '0.0.0.0',
-        'created_at': utc_now().isoformat()
-    }
-    await db.activity_logs.insert_one(activity_log)
+    await log_activity(
+        current_user['sub'],
+        'delete_transaction',
+        f"Menghapus transaksi {transaction['transaction_code']} - {transaction['description']} (Rp {transaction['amount']})",
+        related_type='transaction',
+        related_id=transaction_id,
+        critical=True
+    )
     
     return {'message': 'Transaksi berhasil dihapus'}
 
@@ -903,11 +1367,13 @@ async def toggle_user_active(user_id: str, current_user: dict = Depends(get_curr
 
 # ============= NOTIFICATION ROUTES =============
 @api_router.get('/notifications', response_model=List[Notification])
-async def get_notifications(current_user: dict = Depends(get_current_user)):
-    notifications = await db.notifications.find(
-        {'$or': [{'user_id': current_user['sub']}, {'user_id': 'broadcast_manager'}]},
-        {'_id': 0}
-    ).sort('created_at', -1).limit(100).to_list(100)
+async def get_notifications(
+    unread_only: bool = False,
+    limit: int = 100,
+    current_user: dict = Depends(get_current_user)
+):
+    user = await db.users.find_one({'id': current_user['sub']}, {'_id': 0, 'id': 1, 'role_id': 1})
+    notifications = await get_inbox(db, user, unread_only, limit)
     
     for notif in notifications:
         if isinstance(notif.get('created_at'), str):
@@ -915,14 +1381,23 @@ async def get_notifications(current_user: dict = Depends(get_current_user)):
     
     return notifications
 
+@api_router.get('/notifications/unread-count', response_model=dict)
+async def get_notification_unread_count(current_user: dict = Depends(get_current_user)):
+    """Badge count, read from the maintained per-user counter"""
+    user = await db.users.find_one({'id': current_user['sub']}, {'_id': 0, 'id': 1, 'role_id': 1})
+    return {'unread': await get_unread_count(db, user)}
+
+@api_router.put('/notifications/read-all')
+async def mark_all_notifications_read(current_user: dict = Depends(get_current_user)):
+    user = await db.users.find_one({'id': current_user['sub']}, {'_id': 0, 'id': 1, 'role_id': 1})
+    updated = await mark_all_read(db, user)
+    
+    return {'message': 'Semua notifikasi ditandai sudah dibaca', 'updated': updated}
+
 @api_router.put('/notifications/{notif_id}/read')
 async def mark_notification_read(notif_id: str, current_user: dict = Depends(get_current_user)):
-    result = await db.notifications.update_one(
-        {'id': notif_id, 'user_id': current_user['sub']},
-        {'$set': {'is_read': True}}
-    )
-    
-    if result.modified_count == 0:
+    user = await db.users.find_one({'id': current_user['sub']}, {'_id': 0, 'id': 1, 'role_id': 1})
+    if not await mark_read(db, user, notif_id):
         raise HTTPException(status_code=404, detail='Notifikasi tidak ditemukan')
     
     return {'message': 'Notifikasi ditandai sudah dibaca'}
@@ -931,6 +1406,8 @@ async def mark_notification_read(notif_id: str, current_user: dict = Depends(get
 @api_router.get('/activity-logs', response_model=List[ActivityLog])
 async def get_activity_logs(
     user_id: Optional[str] = None,
+    related_type: Optional[str] = None,
+    related_id: Optional[str] = None,
     limit: int = 100,
     current_user: dict = Depends(get_current_user)
 ):
@@ -939,9 +1416,14 @@ async def get_activity_logs(
     if user['role_id'] not in [1, 2, 8]:  # Owner, Manager, IT Developer
         raise HTTPException(status_code=403, detail='Tidak memiliki izin')
     
+    # Per-user and per-entity timelines are served by compound indexes
     query = {}
     if user_id:
         query['user_id'] = user_id
+    if related_type:
+        query['related_type'] = related_type
+    if related_id:
+        query['related_id'] = related_id
     
     logs = await db.activity_logs.find(query, {'_id': 0}).sort('created_at', -1).limit(limit).to_list(limit)
     
@@ -951,35 +1433,57 @@ async def get_activity_logs(
     
     return logs
 
-# ============= SETTINGS ROUTES =============
-@api_router.get('/settings/{key}')
-async def get_setting(key: str, current_user: dict = Depends(get_current_user)):
-    setting = await db.settings.find_one({'setting_key': key}, {'_id': 0})
-    if not setting:
-        return {'setting_key': key, 'setting_value': {}}
+@api_router.get('/timeline/{related_type}/{related_id}', response_model=dict)
+async def get_related_timeline(
+    related_type: str,
+    related_id: str,
+    after: Optional[str] = None,
+    limit: int = 50,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Semua yang tercatat untuk satu entitas (order, transaction, ppob_period_closing, ...):
+    activity log + notifikasi (+ order events untuk order), terbaru dulu.
+    Pass `next_cursor` sebagai `after` untuk halaman berikutnya.
+    """
+    user = await db.users.find_one({'id': current_user['sub']}, {'_id': 0})
+    if user['role_id'] not in [1, 2, 3, 8]:  # Owner, Manager, Finance, IT Developer
+        raise HTTPException(status_code=403, detail='Tidak memiliki izin')
     
-    return setting
+    items, next_cursor = await get_entity_timeline(db, related_type, related_id, after, limit)
+    
+    return {
+        'related_type': related_type,
+        'related_id': related_id,
+        'items': items,
+        'count': len(items),
+        'next_cursor': next_cursor
+    }
 
-@api_router.put('/settings/{key}')
-async def update_setting(key: str, value: dict, current_user: dict = Depends(get_current_user)):
-    # Check permission
+@api_router.post('/activity-logs/purge', response_model=dict)
+async def purge_expired_activity_logs(
+    dry_run: bool = False,
+    archive: bool = True,
+    current_user: dict = Depends(get_current_user)
+):
+    """Jalankan retensi activity log sekarang (sesuai setting data_retention_days)"""
     user = await db.users.find_one({'id': current_user['sub']}, {'_id': 0})
-    if user['role_id'] != ROLE_OWNER:
+    if user['role_id'] not in [1, 8]:  # Owner, IT Developer
         raise HTTPException(status_code=403, detail='Tidak memiliki izin')
     
-    await db.settings.update_one(
-        {'setting_key': key},
-        {
-            '$set': {
-                'setting_value': value,
-                'updated_by': current_user['sub'],
-                'updated_at': utc_now().isoformat()
-            }
-        },
-        upsert=True
-    )
+    summary = await purge_activity_logs(db, archive=archive, dry_run=dry_run)
     
-    return {'message': 'Setting berhasil diupdate'}
+    if not dry_run:
+        await log_activity(
+            current_user['sub'],
+            'PURGE_ACTIVITY_LOGS',
+            f"Purged {summary['purged']} activity logs older than {summary['cutoff']}",
+            related_type='activity_logs',
+            metadata=summary,
+            critical=True
+        )
+    
+    return summary
 
 # ============= DAILY REPORT ROUTES =============
 @api_router.get('/reports/loket-daily', response_model=List[LoketDailyReport])
@@ -1031,7 +1535,7 @@ async def create_loket_daily_report(report_data: LoketDailyReportCreate, current
     if report_dict.get('total_setoran_shift', 0) > 0:
         transaction = {
             'id': generate_id(),
-            'transaction_code': generate_code('TXN', 12),
+            'transaction_code': await sequence_allocator.next_code('TXN'),
             'business_id': report_dict['business_id'],
             'transaction_type': 'income',
             'category': 'Setoran Loket',
@@ -1103,7 +1607,7 @@ async def create_kasir_daily_report(report_data: KasirDailyReportCreate, current
     if total_setoran > 0:
         txn = {
             'id': generate_id(),
-            'transaction_code': generate_code('TXN', 12),
+            'transaction_code': await sequence_allocator.next_code('TXN'),
             'business_id': report_dict['business_id'],
             'transaction_type': 'income',
             'category': 'Setoran Kasir',
@@ -1122,7 +1626,7 @@ async def create_kasir_daily_report(report_data: KasirDailyReportCreate, current
     if report_dict.get('belanja_loket', 0) > 0:
         txn = {
             'id': generate_id(),
-            'transaction_code': generate_code('TXN', 12),
+            'transaction_code': await sequence_allocator.next_code('TXN'),
             'business_id': report_dict['business_id'],
             'transaction_type': 'expense',
             'category': 'Belanja Operasional',
@@ -1141,7 +1645,7 @@ async def create_kasir_daily_report(report_data: KasirDailyReportCreate, current
     if report_dict.get('total_admin', 0) > 0:
         txn = {
             'id': generate_id(),
-            'transaction_code': generate_code('TXN', 12),
+            'transaction_code': await sequence_allocator.next_code('TXN'),
             'business_id': report_dict['business_id'],
             'transaction_type': 'income',
             'category': 'Admin Fee',
@@ -1564,7 +2068,12 @@ async def delete_kasir_daily_report(report_id: str, current_user: dict = Depends
 
 # ============= TEKNISI ROUTES =============
 @api_router.get('/teknisi/orders', response_model=List[Order])
-async def get_teknisi_orders(current_user: dict = Depends(get_current_user)):
+async def get_teknisi_orders(
+    status_filter: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    current_user: dict = Depends(get_current_user)
+):
     # Get orders assigned to current teknisi - ONLY orders that require technician
     user = await db.users.find_one({'id': current_user['sub']}, {'_id': 0})
     
@@ -1579,32 +2088,25 @@ async def get_teknisi_orders(current_user: dict = Depends(get_current_user)):
     if user['role_id'] == 7:  # Teknisi
         query['assigned_to'] = current_user['sub']
     
-    orders = await db.orders.find(query, {'_id': 0}).sort('created_at', -1).to_list(1000)
+    if status_filter:
+        query['status'] = status_filter
+    
+    limit = max(1, min(limit, 500))
+    orders = await db.orders.find(query, SEARCH_FIELDS_EXCLUDED).sort('created_at', -1).skip(skip).limit(limit).to_list(limit)
+    
+    # Progress summary is denormalised on the order; only legacy orders
+    # without it are joined, in one batched query
+    progress_map = await get_progress_by_order_ids(
+        db, [order['id'] for order in orders if not order.get('technical_progress')]
+    )
     
-    # Attach technical progress data to each order
     for order in orders:
         for field in ['created_at', 'updated_at', 'completion_date']:
             if order.get(field) and isinstance(order[field], str):
                 order[field] = datetime.fromisoformat(order[field])
         
-        # Get technical progress
-        progress = await db.technical_progress.find_one({'order_id': order['id']}, {'_id': 0})
-        if progress:
-            # Calculate overall progress
-            if progress.get('steps'):
-                total_weight = sum(step.get('step_weight', 0) for step in progress['steps'])
-                overall_progress = 0.0
-                for step in progress['steps']:
-                    weight = step.get('step_weight', 0)
-                    if step.get('status') == 'completed':
-                        overall_progress += weight
-                    elif step.get('status') == 'in_progress':
-                        overall_progress += weight * 0.5
-                progress['overall_progress'] = overall_progress
-            else:
-                progress['overall_progress'] = 0.0
-            
-            order['technical_progress'] = progress
+        if order['id'] in progress_map:
+            order['technical_progress'] = progress_map[order['id']]
     
     return orders
 
@@ -1642,24 +2144,24 @@ async def update_order_status_by_teknisi(
     if status == 'completed':
         update_data['completion_date'] = utc_now().isoformat()
     
-    if notes:
-        current_notes = order.get('notes', '')
-        timestamp = utc_now().strftime('%Y-%m-%d %H:%M:%S')
-        user_name = user.get('full_name', user.get('username', 'Unknown'))
-        update_data['notes'] = f"{current_notes}\n[{timestamp}] {user_name}: {notes}".strip()
-    
     await db.orders.update_one({'id': order_id}, {'$set': update_data})
+    app_cache.invalidate(ORDERS_CACHE)
+    
+    # Notes go to the order timeline, not the order document
+    await record_order_event(db, order_id, ORDER_STATUS_CHANGED, user, {
+        'from': order.get('status'),
+        'to': status,
+        'notes': notes
+    })
     
     # Log activity
-    activity_log = {
-        'id': generate_id(),
-        'user_id': current_user['sub'],
-        'action': 'update_order_status',
-        'description': f"Update status order {order['order_number']} menjadi {status}",
-        'ip_address': '0.0.0.0',
-        'created_at': utc_now().isoformat()
-    }
-    await db.activity_logs.insert_one(activity_log)
+    await log_activity(
+        current_user['sub'],
+        'update_order_status',
+        f"Update status order {order['order_number']} menjadi {status}",
+        related_type='order',
+        related_id=order_id
+    )
     
     return {'message': f'Status order berhasil diupdate menjadi {status}'}
 
@@ -1697,18 +2199,22 @@ async def assign_technician_to_order(
     }
     
     await db.orders.update_one({'id': order_id}, {'$set': update_data})
+    app_cache.invalidate(ORDERS_CACHE)
     
     # Log activity
     tech_name = technician.get('full_name', technician.get('username', 'Unknown')) if technician_id else 'None'
-    activity_log = {
-        'id': generate_id(),
-        'user_id': current_user['sub'],
-        'action': 'assign_technician',
-        'description': f"Menugaskan order {order.get('order_number', order_id)} ke teknisi {tech_name}",
-        'ip_address': '0.0.0.0',
-        'created_at': utc_now().isoformat()
-    }
-    await db.activity_logs.insert_one(activity_log)
+    await record_order_event(db, order_id, ORDER_ASSIGNED, user, {
+        'from': order.get('assigned_to'),
+        'to': technician_id or None,
+        'technician_name': tech_name if technician_id else None
+    })
+    await log_activity(
+        current_user['sub'],
+        'assign_technician',
+        f"Menugaskan order {order.get('order_number', order_id)} ke teknisi {tech_name}",
+        related_type='order',
+        related_id=order_id
+    )
     
     return {'message': 'Teknisi berhasil ditugaskan', 'assigned_to': technician_id}
 
@@ -1750,12 +2256,14 @@ async def update_order_progress(
         update_data['status'] = 'completed'
         update_data['completion_date'] = utc_now().isoformat()
     
-    if notes:
-        current_notes = order.get('notes', '')
-        timestamp = utc_now().strftime('%Y-%m-%d %H:%M:%S')
-        update_data['notes'] = f"{current_notes}\n[{timestamp}] Progress {progress}%: {notes}".strip()
-    
     await db.orders.update_one({'id': order_id}, {'$set': update_data})
+    app_cache.invalidate(ORDERS_CACHE)
+    
+    await record_order_event(db, order_id, ORDER_PROGRESS_UPDATED, user, {
+        'progress': progress,
+        'status': update_data.get('status'),
+        'notes': notes
+    })
     
     return {'message': f'Progress order berhasil diupdate menjadi {progress}%'}
 
@@ -1927,7 +2435,7 @@ async def get_journal_entries(
 async def create_journal_entry(entry_data: JournalEntryCreate, current_user: dict = Depends(get_current_user)):
     entry_dict = entry_data.model_dump()
     entry_dict['id'] = generate_id()
-    entry_dict['entry_number'] = generate_code('JE', 12)
+    entry_dict['entry_number'] = await sequence_allocator.next_code('JE')
     entry_dict['created_by'] = current_user['sub']
     entry_dict['created_at'] = utc_now()
     
@@ -2158,45 +2666,9 @@ async def init_data():
 
 # ============= SETTINGS ENDPOINTS =============
 @api_router.get('/settings/all')
-async def get_all_settings(current_user: User = Depends(get_current_user)):
-    """Get all settings"""
-    settings_docs = await db.settings.find({}, {'_id': 0}).to_list(length=None)
-    
-    # Convert to dict
-    settings_dict = {}
-    for doc in settings_docs:
-        settings_dict[doc['setting_key']] = doc.get('setting_value')
-    
-    # Add default values if not exist
-    defaults = {
-        'company_name': 'PT. GELIS Indonesia',
-        'company_address': 'Jl. Contoh No. 123, Jakarta Selatan',
-        'company_phone': '021-12345678',
-        'company_email': 'info@gelis.com',
-        'company_website': 'https://gelis.com',
-        'timezone': 'Asia/Jakarta',
-        'language': 'id',
-        'currency': 'IDR',
-        'date_format': 'DD/MM/YYYY',
-        'time_format': '24h',
-        'email_notifications': True,
-        'whatsapp_notifications': False,
-        'push_notifications': True,
-        'is_mock_data': True,
-        'data_retention_days': 365,
-        'auto_backup': False,
-        'backup_frequency': 'daily',
-        'session_timeout': 43200,
-        'password_expiry_days': 90,
-        'max_login_attempts': 5,
-        'two_factor_auth': False,
-    }
-    
-    for key, default_val in defaults.items():
-        if key not in settings_dict:
-            settings_dict[key] = default_val
-    
-    return settings_dict
+async def get_all_settings(current_user: dict = Depends(get_current_user)):
+    """Get all settings (served from the in-memory settings service, defaults merged)"""
+    return await settings_service.all()
 
 
 
@@ -2229,15 +2701,27 @@ async def get_system_health(current_user: dict = Depends(get_current_user)):
     # Get total active users
     total_users = await db.users.count_documents({'is_active': True})
     
+    # Request metrics of this worker process (see /metrics)
+    summary = metrics.summary()
+    
     return {
         'backend_status': 'healthy',
         'database_status': db_status,
         'total_users': total_users,
-        'uptime': 'N/A',  # Can be implemented with process start time
+        'uptime': summary['uptime'],
+        'uptime_seconds': summary['uptime_seconds'],
         'collections': collections,
-        'response_time': '< 100ms',
-        'requests_per_min': 0,
-        'error_rate': '0%',
+        'response_time': f"{summary['latency_ms']['p95']}ms" if summary['latency_ms']['p95'] is not None else 'N/A',
+        'latency_ms': summary['latency_ms'],
+        'requests_total': summary['requests_total'],
+        'requests_per_min': summary['requests_per_min'],
+        'requests_per_sec': summary['requests_per_sec'],
+        'error_rate': f"{summary['error_rate']}%",
+        'in_flight': summary['in_flight'],
+        'slowest_routes': summary['slowest_routes'],
+        'background_writer': background_writer.stats(),
+        'cache': app_cache.stats(),
+        'settings': settings_service.stats(),
         'timestamp': utc_now().isoformat()
     }
 
@@ -2311,8 +2795,8 @@ async def clear_cache(current_user: dict = Depends(get_current_user)):
     if user['role_id'] != 8:
         raise HTTPException(status_code=403, detail='Akses ditolak - IT Developer only')
     
-    # Placeholder for cache clearing logic
-    return {'message': 'Cache cleared successfully', 'timestamp': utc_now().isoformat()}
+    removed = app_cache.clear()
+    return {'message': 'Cache cleared successfully', 'entries_removed': removed, 'timestamp': utc_now().isoformat()}
 
 @api_router.get('/dev/errors')
 async def get_recent_errors(current_user: dict = Depends(get_current_user)):
@@ -2321,60 +2805,121 @@ async def get_recent_errors(current_user: dict = Depends(get_current_user)):
     if user['role_id'] != 8:
         raise HTTPException(status_code=403, detail='Akses ditolak - IT Developer only')
     
-    # Get recent activity logs with errors
+    # Indexed (level, created_at) lookup
     errors = await db.activity_logs.find(
-        {'action': {'$regex': 'error', '$options': 'i'}},
+        {'level': LEVEL_ERROR},
         {'_id': 0}
     ).sort('created_at', -1).limit(50).to_list(50)
     
     return errors
 
-@api_router.get('/dev/database/collections')
-async def get_database_collections(current_user: dict = Depends(get_current_user)):
-    """Get all database collections info - IT Developer only"""
+@api_router.get('/dev/errors/groups')
+async def get_error_groups(
+    sort: str = 'last_seen',
+    limit: int = 50,
+    current_user: dict = Depends(get_current_user)
+):
+    """Server errors grouped by traceback fingerprint - IT Developer only"""
     user = await db.users.find_one({'id': current_user['sub']}, {'_id': 0})
     if user['role_id'] != 8:
         raise HTTPException(status_code=403, detail='Akses ditolak - IT Developer only')
     
-    collections = await db.list_collection_names()
+    if sort not in ['last_seen', 'count']:
+        raise HTTPException(status_code=400, detail="sort harus 'last_seen' atau 'count'")
     
-    collection_info = []
-    for coll_name in collections:
-        count = await db[coll_name].count_documents({})
-        collection_info.append({
-            'name': coll_name,
-            'count': count
-        })
+    limit = max(1, min(limit, 200))
+    groups = await db.error_groups.find(
+        {}, {'_id': 0, 'traceback': 0}
+    ).sort(sort, -1).limit(limit).to_list(limit)
+    
+    return groups
+
+@api_router.get('/dev/errors/groups/{fingerprint}')
+async def get_error_group(fingerprint: str, current_user: dict = Depends(get_current_user)):
+    """One error group with its traceback and latest occurrences - IT Developer only"""
+    user = await db.users.find_one({'id': current_user['sub']}, {'_id': 0})
+    if user['role_id'] != 8:
+        raise HTTPException(status_code=403, detail='Akses ditolak - IT Developer only')
+    
+    group = await db.error_groups.find_one({'_id': fingerprint}, {'_id': 0})
+    if not group:
+        raise HTTPException(status_code=404, detail='Error group tidak ditemukan')
+    
+    group['occurrences'] = await db.activity_logs.find(
+        {'related_type': 'error_group', 'related_id': fingerprint},
+        {'_id': 0}
+    ).sort('created_at', -1).limit(20).to_list(20)
+    
+    return group
+
+@api_router.get('/dev/db/stats')
+async def get_db_command_stats(current_user: dict = Depends(get_current_user)):
+    """Most expensive MongoDB commands and recent slow queries (this worker) - IT Developer only"""
+    user = await db.users.find_one({'id': current_user['sub']}, {'_id': 0})
+    if user['role_id'] != 8:
+        raise HTTPException(status_code=403, detail='Akses ditolak - IT Developer only')
     
-    return collection_info
+    return db_listener.stats()
+
+@api_router.get('/dev/database/collections')
+async def get_database_collections(current_user: dict = Depends(get_current_user)):
+    """
+    Get all database collections info - IT Developer only.
+    Counts are estimates from collection metadata; sizes from $collStats,
+    index usage from $indexStats (unused_indexes = no ops since mongod start).
+    """
+    user = await db.users.find_one({'id': current_user['sub']}, {'_id': 0})
+    if user['role_id'] != 8:
+        raise HTTPException(status_code=403, detail='Akses ditolak - IT Developer only')
+    
+    return await get_collections_info(db)
 
 @api_router.post('/dev/database/query')
 async def run_database_query(
     query: dict,
     collection: str,
+    explain: bool = False,
+    max_time_ms: int = DEFAULT_QUERY_TIME_MS,
     current_user: dict = Depends(get_current_user)
 ):
-    """Run custom database query - IT Developer only"""
+    """
+    Run custom database query - IT Developer only.
+    explain=true returns the winning plan, keys/docs examined, execution time
+    and whether it was a COLLSCAN instead of the rows. max_time_ms (max 30000)
+    is enforced server-side so an ad-hoc query cannot pin the primary.
+    """
     user = await db.users.find_one({'id': current_user['sub']}, {'_id': 0})
     if user['role_id'] != 8:
         raise HTTPException(status_code=403, detail='Akses ditolak - IT Developer only')
     
+    max_time_ms = clamp_max_time_ms(max_time_ms)
+    
     try:
-        results = await db[collection].find(query, {'_id': 0}).limit(100).to_list(100)
+        if explain:
+            return {
+                'collection': collection,
+                'max_time_ms': max_time_ms,
+                'explain': await explain_find(db, collection, query, 100, max_time_ms)
+            }
+        
+        results = await db[collection].find(query, {'_id': 0}).limit(100).max_time_ms(max_time_ms).to_list(100)
         return {
             'collection': collection,
             'count': len(results),
             'results': results
         }
+    except ExecutionTimeout:
+        raise HTTPException(status_code=400, detail=f'Query melebihi batas waktu {max_time_ms}ms')
     except Exception as e:
         raise HTTPException(status_code=400, detail=f'Query error: {str(e)}')
 
 @api_router.put('/settings/bulk')
 async def update_bulk_settings(
     data: dict,
-    current_user: User = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user)
 ):
     """Update multiple settings at once"""
+    user = await db.users.find_one({'id': current_user['sub']}, {'_id': 0})
     if user['role_id'] not in [1, 2, 8]:  # Owner, Manager, IT Developer only
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -2384,23 +2929,12 @@ async def update_bulk_settings(
     settings = data.get('settings', {})
     section = data.get('section', 'all')
     
-    # Update each setting
-    for key, value in settings.items():
-        await db.settings.update_one(
-            {'setting_key': key},
-            {
-                '$set': {
-                    'setting_value': value,
-                    'updated_by': current_user.id,
-                    'updated_at': utc_now().isoformat()
-                }
-            },
-            upsert=True
-        )
+    # One bulk_write for all keys
+    await settings_service.set_many(settings, updated_by=current_user['sub'])
     
     # Log activity
     await log_activity(
-        user_id=current_user.id,
+        user_id=current_user['sub'],
         action='settings.update',
         description=f'Updated {section} settings',
         metadata={'section': section}
@@ -2408,6 +2942,26 @@ async def update_bulk_settings(
     
     return {'message': 'Pengaturan berhasil disimpan'}
 
+# Registered after /settings/all and /settings/bulk so those aren't captured as {key}
+@api_router.get('/settings/{key}')
+async def get_setting(key: str, current_user: dict = Depends(get_current_user)):
+    setting = await settings_service.get_document(key)
+    if not setting:
+        return {'setting_key': key, 'setting_value': {}}
+    
+    return setting
+
+@api_router.put('/settings/{key}')
+async def update_setting(key: str, value: dict, current_user: dict = Depends(get_current_user)):
+    # Check permission
+    user = await db.users.find_one({'id': current_user['sub']}, {'_id': 0})
+    if user['role_id'] != ROLE_OWNER:
+        raise HTTPException(status_code=403, detail='Tidak memiliki izin')
+    
+    await settings_service.set(key, value, updated_by=current_user['sub'])
+    
+    return {'message': 'Setting berhasil diupdate'}
+
 @api_router.post('/settings/test-email')
 async def test_email(
     data: dict,
@@ -2419,9 +2973,10 @@ async def test_email(
 
 # ============= DATA MANAGEMENT ENDPOINTS =============
 @api_router.post('/data/clear-mock')
-async def clear_mock_data(current_user: User = Depends(get_current_user)):
+async def clear_mock_data(current_user: dict = Depends(get_current_user)):
     """Clear all mock data and keep only owner user"""
-    if current_user.role_id != 1:  # Owner only
+    user = await db.users.find_one({'id': current_user['sub']}, {'_id': 0})
+    if user['role_id'] != 1:  # Owner only
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail='Hanya Owner yang dapat menghapus data mockup'
@@ -2435,6 +2990,7 @@ async def clear_mock_data(current_user: User = Depends(get_current_user)):
     
     # Delete all mock orders
     deleted_orders = await db.orders.delete_many({'is_mock': True})
+    app_cache.invalidate(ORDERS_CACHE)
     
     # Delete all mock transactions
     deleted_transactions = await db.accounting.delete_many({'is_mock': True})
@@ -2452,15 +3008,11 @@ async def clear_mock_data(current_user: User = Depends(get_current_user)):
     # Keep activity logs for audit trail (don't delete)
     
     # Update is_mock_data setting
-    await db.settings.update_one(
-        {'setting_key': 'is_mock_data'},
-        {'$set': {'setting_value': False, 'updated_at': utc_now().isoformat()}},
-        upsert=True
-    )
+    await settings_service.set('is_mock_data', False)
     
     # Log activity
     await log_activity(
-        user_id=current_user.id,
+        user_id=current_user['sub'],
         action='data.clear_mock',
         description='Cleared all mock data from system',
         metadata={
@@ -2564,6 +3116,20 @@ async def health_check():
             'timestamp': utc_now().isoformat()
         }
 
+# Bearer token for Prometheus scrapers (unset = IT Developer login only)
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+@app.get('/metrics', response_class=PlainTextResponse)
+async def prometheus_metrics(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Request metrics in Prometheus text format (per worker process)"""
+    token = credentials.credentials
+    if not (METRICS_TOKEN and secrets.compare_digest(token.encode(), METRICS_TOKEN.encode())):
+        payload = decode_token(token)
+        user = await db.users.find_one({'id': payload.get('sub')}, {'_id': 0, 'role_id': 1})
+        if not user or user['role_id'] != 8:
+            raise HTTPException(status_code=403, detail='Akses ditolak - IT Developer only')
+    return PlainTextResponse(metrics.render_prometheus(), media_type='text/plain; version=0.0.4')
+
 # Root endpoint
 @app.get('/')
 async def root():
@@ -2579,7 +3145,10 @@ async def root():
 # ============= FASE 1: CRITICAL ENHANCEMENTS ENDPOINTS =============
 
 # Import report generator
-from utils.report_generator import report_generator
+from utils.report_generator import (
+    report_generator, get_report_executor, shutdown_report_executor,
+    stream_ppob_loket_shift_zip, render_ppob_loket_shifts_excel
+)
 
 # 1. PLN TECHNICAL WORK PROGRESS ENDPOINTS
 
@@ -2616,8 +3185,13 @@ async def create_technical_progress(
     doc = progress_dict.copy()
     doc['created_at'] = doc['created_at'].isoformat()
     doc['updated_at'] = doc['updated_at'].isoformat()
+    doc['overall_progress'] = calculate_overall_progress(doc['steps'])
     
     await db.technical_progress.insert_one(doc)
+    await db.orders.update_one(
+        {'id': progress_data.order_id},
+        {'$set': {'technical_progress': build_progress_summary(doc)}}
+    )
     
     await log_activity(
         current_user['sub'],
@@ -2650,65 +3224,37 @@ async def update_technical_step(
     current_user: dict = Depends(get_current_user)
 ):
     """Update status of a specific technical step"""
-    # Get current progress
-    progress = await db.technical_progress.find_one({'order_id': order_id}, {'_id': 0})
-    if not progress:
-        raise HTTPException(status_code=404, detail='Progress tidak ditemukan')
-    
-    # Find and update the step
     step_name = step_update.get('step_name')
     new_status = step_update.get('status')
     notes = step_update.get('notes')
     photos = step_update.get('photos', [])
     
-    steps = progress.get('steps', [])
-    step_found = False
-    overall_progress = 0.0
-    
-    for step in steps:
-        if step['step_name'] == step_name:
-            step_found = True
-            step['status'] = new_status
-            if notes:
-                step['notes'] = notes
-            if photos:
-                step['photos'] = photos
-            
-            if new_status == 'in_progress' and not step.get('started_at'):
-                step['started_at'] = utc_now().isoformat()
-            elif new_status == 'completed':
-                step['completed_at'] = utc_now().isoformat()
-        
-        # Calculate overall progress
-        if step['status'] == 'completed':
-            overall_progress += step['step_weight']
-    
-    if not step_found:
+    # Positional update of just this step; overall_progress recomputed server-side
+    progress = await update_progress_step(db, order_id, step_name, new_status, notes, photos)
+    if not progress:
+        if not await db.technical_progress.find_one({'order_id': order_id}, {'_id': 0, 'id': 1}):
+            raise HTTPException(status_code=404, detail='Progress tidak ditemukan')
         raise HTTPException(status_code=404, detail=f'Step {step_name} tidak ditemukan')
     
-    # Update progress in database
-    await db.technical_progress.update_one(
-        {'order_id': order_id},
-        {
-            '$set': {
-                'steps': steps,
-                'overall_progress': overall_progress,
-                'updated_at': utc_now().isoformat()
-            }
-        }
-    )
+    overall_progress = progress['overall_progress']
     
-    # Update order status based on progress
+    # Denormalise progress summary + status onto the order for list views
+    summary = build_progress_summary(progress)
+    order_update = {'technical_progress': summary}
     if overall_progress >= 100:
-        await db.orders.update_one(
-            {'id': order_id},
-            {'$set': {'status': 'completed', 'completion_date': utc_now().isoformat()}}
-        )
+        order_update['status'] = 'completed'
+        order_update['completion_date'] = utc_now().isoformat()
     elif overall_progress > 0:
-        await db.orders.update_one(
-            {'id': order_id},
-            {'$set': {'status': 'processing'}}
-        )
+        order_update['status'] = 'processing'
+    # Skipped when a concurrent step update already stored a newer summary
+    await db.orders.update_one(newer_summary_filter(order_id, summary), {'$set': order_update})
+    app_cache.invalidate(ORDERS_CACHE)
+    await record_order_event(db, order_id, ORDER_STEP_UPDATED, token_actor(current_user), {
+        'step_name': step_name,
+        'status': new_status,
+        'overall_progress': overall_progress,
+        'notes': notes
+    })
     
     await log_activity(
         current_user['sub'],
@@ -2739,7 +3285,7 @@ async def auto_sync_to_accounting(
 ):
     """Helper function to automatically create accounting transaction"""
     try:
-        transaction_code = f"TRX-{datetime.now().strftime('%Y%m%d')}-{generate_id()[:8]}"
+        transaction_code = await sequence_allocator.next_code('TRX')
         
         transaction_dict = {
             'id': generate_id(),
@@ -2773,40 +3319,6 @@ async def auto_sync_to_accounting(
 
 # ============= SISTEM PPOB ENDPOINTS =============
 
-# Helper function untuk double-entry accounting PPOB
-async def create_ppob_journal_entry(
-    tanggal: datetime,
-    description: str,
-    debit_account: str,
-    kredit_account: str,
-    amount: float,
-    reference_type: str,
-    reference_id: str,
-    user_id: str
-):
-    """Create double-entry journal for PPOB"""
-    try:
-        journal_entry = {
-            'id': generate_id(),
-            'tanggal': tanggal.isoformat() if isinstance(tanggal, datetime) else tanggal,
-            'description': description,
-            'debit_account': debit_account,
-            'debit_amount': amount,
-            'kredit_account': kredit_account,
-            'kredit_amount': amount,
-            'reference_type': reference_type,
-            'reference_id': reference_id,
-            'created_at': utc_now().isoformat(),
-            'created_by': user_id
-        }
-        
-        await db.ppob_journal_entries.insert_one(journal_entry)
-        return journal_entry['id']
-    except Exception as e:
-        print(f"Error creating PPOB journal: {str(e)}")
-        return None
-
-
 # MENU 1: LAPORAN LOKET PPOB ENDPOINTS
 
 @api_router.post('/ppob/loket-shift', response_model=dict)
@@ -2819,77 +3331,50 @@ async def create_ppob_loket_shift(
     - Debit: Piutang Setoran Loket
     - Kredit: Pendapatan PPOB
     """
-    # Calculate totals
-    total_penjualan = 0.0
-    total_sisa_setoran = 0.0
-    
-    for channel in report_data.channels:
-        # Auto-calculate per channel
-        channel.sisa_setoran = channel.total_penjualan
-        channel.saldo_akhir = channel.saldo_awal + channel.saldo_inject - channel.total_penjualan
-        
-        total_penjualan += channel.total_penjualan
-        total_sisa_setoran += channel.sisa_setoran
+    # Reject postings into a closed (tutup buku) period
+    await ensure_ppob_period_open(db, report_data.tanggal)
     
-    # Create report
-    report_dict = report_data.model_dump()
-    report_dict['id'] = generate_id()
-    report_dict['total_penjualan'] = total_penjualan
-    report_dict['total_sisa_setoran'] = total_sisa_setoran
-    report_dict['status_setoran'] = 'Belum Disetor'
-    report_dict['created_by'] = current_user['id']
-    report_dict['created_at'] = utc_now()
+    # Build report + AUTO-ACCOUNTING double entry
+    doc, journal_entries = build_ppob_loket_shift(report_data, current_user['sub'])
+    total_penjualan = doc['total_penjualan']
+    total_sisa_setoran = doc['total_sisa_setoran']
     
-    # Serialize
-    doc = report_dict.copy()
-    doc['tanggal'] = doc['tanggal'].isoformat() if isinstance(doc['tanggal'], datetime) else doc['tanggal']
-    doc['created_at'] = doc['created_at'].isoformat()
+    # Check saldo_awal against previous shift's saldo_akhir per channel
+    doc['saldo_gaps'] = find_channel_saldo_gaps(await get_channel_saldo(db, doc['business_id']), doc)
     
     await db.ppob_loket_shifts.insert_one(doc)
-    
-    # AUTO-ACCOUNTING: Double Entry
-    # Debit: Piutang Setoran Loket
-    # Kredit: Pendapatan PPOB
-    await create_ppob_journal_entry(
-        tanggal=report_data.tanggal,
-        description=f"Penjualan PPOB Shift {report_data.shift} - {report_data.nama_petugas}",
-        debit_account="Piutang Setoran Loket",
-        kredit_account="Pendapatan PPOB",
-        amount=total_penjualan,
-        reference_type="loket_shift",
-        reference_id=report_dict['id'],
-        user_id=current_user['id']
-    )
+    await db.ppob_journal_entries.insert_many(journal_entries)
+    await update_channel_saldo_index(db, [doc])
+    await add_outstanding_setoran(db, [doc])
     
     # Create notification untuk kasir
     kasir_users = await db.users.find({'role_id': 5}, {'_id': 0}).to_list(length=100)  # Role 5 = Kasir
-    for kasir in kasir_users:
-        notification = {
-            'id': generate_id(),
-            'user_id': kasir['id'],
-            'type': 'ppob_setoran',
-            'title': 'Setoran PPOB Baru',
-            'message': f"Setoran shift {report_data.shift} dari {report_data.nama_petugas} sebesar Rp {total_sisa_setoran:,.0f} menunggu penerimaan",
-            'is_read': False,
-            'related_type': 'ppob_loket_shift',
-            'related_id': report_dict['id'],
-            'created_at': utc_now().isoformat()
-        }
-        await db.notifications.insert_one(notification)
+    await send_notifications(db, [
+        build_notification(
+            kasir['id'],
+            'Setoran PPOB Baru',
+            f"Setoran shift {report_data.shift} dari {report_data.nama_petugas} sebesar Rp {total_sisa_setoran:,.0f} menunggu penerimaan",
+            type='ppob_setoran',
+            related_type='ppob_loket_shift',
+            related_id=doc['id']
+        )
+        for kasir in kasir_users
+    ])
     
     await log_activity(
-        current_user['id'],
+        current_user['sub'],
         'CREATE_PPOB_LOKET_SHIFT',
         f"Created PPOB loket shift report: Rp {total_penjualan:,.0f}",
         related_type='ppob_loket_shift',
-        related_id=report_dict['id']
+        related_id=doc['id']
     )
     
     return {
         'message': 'Laporan shift berhasil disimpan & auto-sync ke accounting!',
-        'id': report_dict['id'],
+        'id': doc['id'],
         'total_penjualan': total_penjualan,
-        'status_setoran': 'Belum Disetor'
+        'status_setoran': 'Belum Disetor',
+        'saldo_gaps': doc['saldo_gaps']
     }
 
 
@@ -2932,6 +3417,134 @@ async def get_ppob_loket_shifts(
     }
 
 
+@api_router.get('/ppob/loket-shift/saldo-awal', response_model=dict)
+async def get_ppob_saldo_awal(
+    business_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Pre-fill saldo_awal shift berikutnya dari saldo_akhir shift terakhir per channel
+    (dibaca dari index ppob_channel_saldo, bukan scan ppob_loket_shifts)
+    """
+    saldo = await get_channel_saldo(db, business_id)
+    
+    return {
+        'business_id': business_id,
+        'channels': [
+            {
+                'channel_name': s['channel_name'],
+                'saldo_awal': s['saldo_akhir'],
+                'last_tanggal': s['tanggal'],
+                'last_shift': s['shift'],
+                'last_petugas': s.get('nama_petugas'),
+                'last_report_id': s['report_id']
+            }
+            for s in saldo
+        ]
+    }
+
+
+PPOB_EXPORT_MAX_SHIFTS = 2000
+PPOB_EXPORT_CHUNK_SIZE = 25
+
+
+@api_router.get('/ppob/loket-shift/export')
+async def export_ppob_loket_shifts(
+    business_id: str,
+    start_date: str,
+    end_date: str,
+    format: ExportFormat = ExportFormat.PDF,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Export semua laporan shift loket dalam rentang tanggal (tutup bulan):
+    - pdf: ZIP berisi satu PDF per shift, dirender paralel di worker process
+      dan dikirim bertahap (stream) per chunk yang selesai
+    - excel: satu workbook, satu sheet per hari
+    """
+    from fastapi.responses import Response, StreamingResponse
+    
+    user = await db.users.find_one({'id': current_user['sub']}, {'_id': 0})
+    if user['role_id'] not in [1, 2, 3, 8]:  # Owner, Manager, Finance, IT Developer
+        raise HTTPException(status_code=403, detail='Tidak memiliki akses')
+    
+    if format not in [ExportFormat.PDF, ExportFormat.EXCEL]:
+        raise HTTPException(status_code=400, detail='Format harus pdf atau excel')
+    
+    try:
+        range_start = datetime.fromisoformat(start_date)
+        range_end = datetime.fromisoformat(end_date) + timedelta(days=1)  # end_date inklusif
+    except ValueError:
+        raise HTTPException(status_code=400, detail='Format tanggal tidak valid (YYYY-MM-DD)')
+    
+    query = {
+        'business_id': business_id,
+        'tanggal': {'$gte': range_start.isoformat(), '$lt': range_end.isoformat()}
+    }
+    shifts = await db.ppob_loket_shifts.find(query, {'_id': 0}).sort(
+        [('tanggal', 1), ('shift', 1)]
+    ).to_list(length=PPOB_EXPORT_MAX_SHIFTS + 1)
+    
+    if not shifts:
+        raise HTTPException(status_code=404, detail='Tidak ada laporan shift pada rentang tanggal ini')
+    if len(shifts) > PPOB_EXPORT_MAX_SHIFTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f'Terlalu banyak shift (maks {PPOB_EXPORT_MAX_SHIFTS}), perkecil rentang tanggal'
+        )
+    
+    base_name = f"ppob_loket_{business_id[-8:]}_{range_start.strftime('%Y%m%d')}_{(range_end - timedelta(days=1)).strftime('%Y%m%d')}"
+    
+    await log_activity(
+        current_user['sub'],
+        'EXPORT_PPOB_LOKET_SHIFTS',
+        f"Exported {len(shifts)} loket shift(s) as {format.value}",
+        related_type='export'
+    )
+    
+    if format == ExportFormat.PDF:
+        # Chunks keep pickling overhead low while spreading work across workers
+        return StreamingResponse(
+            stream_ppob_loket_shift_zip(shifts, PPOB_EXPORT_CHUNK_SIZE, await settings_service.get_timezone()),
+            media_type='application/zip',
+            headers={'Content-Disposition': f'attachment; filename="{base_name}.zip"'}
+        )
+    
+    # A workbook is a single file: rendered in one go in a worker process
+    content = await asyncio.get_running_loop().run_in_executor(
+        get_report_executor(), render_ppob_loket_shifts_excel, shifts
+    )
+    return Response(
+        content,
+        media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        headers={'Content-Disposition': f'attachment; filename="{base_name}.xlsx"'}
+    )
+
+
+@api_router.get('/ppob/setoran/outstanding', response_model=dict)
+async def get_ppob_outstanding_setoran(
+    business_id: Optional[str] = None,
+    limit: int = 100,
+    current_user: dict = Depends(get_current_user)
+):
+    """Antrian shift loket yang belum disetor + total piutang setoran (dari counter)"""
+    user = await db.users.find_one({'id': current_user['sub']}, {'_id': 0})
+    if user['role_id'] not in [1, 2, 3, 5, 8]:  # Owner, Manager, Finance, Kasir, IT Developer
+        raise HTTPException(status_code=403, detail='Tidak memiliki akses')
+    
+    limit = max(1, min(limit, 500))
+    queue = await get_outstanding_setoran_queue(db, business_id, limit)
+    counters = await get_setoran_counters(db, business_id)
+    
+    return {
+        'queue': queue,
+        'count': len(queue),
+        'outstanding_count': sum(c.get('outstanding_count', 0) for c in counters),
+        'outstanding_total': sum(c.get('outstanding_total', 0.0) for c in counters),
+        'per_business': counters
+    }
+
+
 # MENU 2: LAPORAN KASIR PPOB ENDPOINTS
 
 @api_router.post('/ppob/kasir-report', response_model=dict)
@@ -2946,125 +3559,35 @@ async def create_ppob_kasir_report(
     3. Kas Kecil: Auto-calculate
     4. Admin: Debit Kas, Kredit Pendapatan Admin
     """
-    # Calculate totals
-    total_setoran_loket = sum(s.amount for s in report_data.setoran_loket)
-    total_topup = sum(t.amount for t in report_data.topup_saldo)
-    saldo_kas_kecil = report_data.penerimaan_kas_kecil - report_data.pengurangan_kas_kecil
-    
-    # Create report
-    report_dict = report_data.model_dump()
-    report_dict['id'] = generate_id()
-    report_dict['total_setoran_loket'] = total_setoran_loket
-    report_dict['total_topup'] = total_topup
-    report_dict['saldo_kas_kecil'] = saldo_kas_kecil
-    report_dict['created_by'] = current_user['id']
-    report_dict['created_at'] = utc_now()
+    # Reject postings into a closed (tutup buku) period
+    await ensure_ppob_period_open(db, report_data.tanggal)
     
-    # Serialize
-    doc = report_dict.copy()
-    doc['tanggal'] = doc['tanggal'].isoformat() if isinstance(doc['tanggal'], datetime) else doc['tanggal']
-    doc['created_at'] = doc['created_at'].isoformat()
+    # Build report + AUTO-ACCOUNTING entries
+    doc, journal_entries, settled_shift_ids = build_ppob_kasir_report(report_data, current_user['sub'])
+    total_setoran_loket = doc['total_setoran_loket']
+    total_topup = doc['total_topup']
+    saldo_kas_kecil = doc['saldo_kas_kecil']
     
     await db.ppob_kasir_reports.insert_one(doc)
     
-    # AUTO-ACCOUNTING ENTRIES
-    
-    # 1. Setoran Loket: Close piutang
-    if total_setoran_loket > 0:
-        await create_ppob_journal_entry(
-            tanggal=report_data.tanggal,
-            description="Penerimaan Setoran Loket PPOB",
-            debit_account="Kas",
-            kredit_account="Piutang Setoran Loket",
-            amount=total_setoran_loket,
-            reference_type="kasir_report",
-            reference_id=report_dict['id'],
-            user_id=current_user['id']
-        )
-        
-        # Update status setoran loket → Lunas
-        for setoran in report_data.setoran_loket:
-            await db.ppob_loket_shifts.update_one(
-                {'id': setoran.loket_report_id},
-                {'$set': {'status_setoran': 'Lunas'}}
-            )
-    
-    # 2. Setoran Loket Luar
-    if report_data.setoran_loket_luar > 0:
-        await create_ppob_journal_entry(
-            tanggal=report_data.tanggal,
-            description="Setoran Loket Luar PPOB",
-            debit_account="Kas",
-            kredit_account="Pendapatan PPOB Loket Luar",
-            amount=report_data.setoran_loket_luar,
-            reference_type="kasir_report",
-            reference_id=report_dict['id'],
-            user_id=current_user['id']
-        )
-    
-    # 3. Penerimaan Admin
-    if report_data.penerimaan_admin > 0:
-        await create_ppob_journal_entry(
-            tanggal=report_data.tanggal,
-            description="Penerimaan Admin PPOB",
-            debit_account="Kas",
-            kredit_account="Pendapatan Admin",
-            amount=report_data.penerimaan_admin,
-            reference_type="kasir_report",
-            reference_id=report_dict['id'],
-            user_id=current_user['id']
-        )
-    
-    # 4. Topup Saldo Loket
-    if total_topup > 0:
-        await create_ppob_journal_entry(
-            tanggal=report_data.tanggal,
-            description=f"Topup Saldo PPOB - {len(report_data.topup_saldo)} channel(s)",
-            debit_account="Modal Saldo PPOB",
-            kredit_account="Kas",
-            amount=total_topup,
-            reference_type="kasir_report",
-            reference_id=report_dict['id'],
-            user_id=current_user['id']
-        )
-    
-    # 5. Kas Kecil - Pengeluaran
-    if report_data.pengurangan_kas_kecil > 0:
-        await create_ppob_journal_entry(
-            tanggal=report_data.tanggal,
-            description="Pengeluaran Kas Kecil",
-            debit_account="Biaya Operasional",
-            kredit_account="Kas Kecil",
-            amount=report_data.pengurangan_kas_kecil,
-            reference_type="kasir_report",
-            reference_id=report_dict['id'],
-            user_id=current_user['id']
-        )
+    if journal_entries:
+        await db.ppob_journal_entries.insert_many(journal_entries)
     
-    # 6. Kas Kecil - Penerimaan
-    if report_data.penerimaan_kas_kecil > 0:
-        await create_ppob_journal_entry(
-            tanggal=report_data.tanggal,
-            description="Penerimaan Kas Kecil",
-            debit_account="Kas Kecil",
-            kredit_account="Kas",
-            amount=report_data.penerimaan_kas_kecil,
-            reference_type="kasir_report",
-            reference_id=report_dict['id'],
-            user_id=current_user['id']
-        )
+    # Update status setoran loket → Lunas (+ outstanding counters)
+    if settled_shift_ids:
+        await settle_loket_shifts(db, settled_shift_ids)
     
     await log_activity(
-        current_user['id'],
+        current_user['sub'],
         'CREATE_PPOB_KASIR_REPORT',
         f"Created PPOB kasir report: Setoran Rp {total_setoran_loket:,.0f}",
         related_type='ppob_kasir_report',
-        related_id=report_dict['id']
+        related_id=doc['id']
     )
     
     return {
         'message': 'Laporan kasir berhasil disimpan & auto-sync ke accounting!',
-        'id': report_dict['id'],
+        'id': doc['id'],
         'total_setoran': total_setoran_loket,
         'total_topup': total_topup,
         'saldo_kas_kecil': saldo_kas_kecil
@@ -3098,6 +3621,79 @@ async def get_ppob_kasir_reports(
     }
 
 
+# BULK IMPORT PPOB (data historis)
+
+async def _run_ppob_import(loket_shifts: list, kasir_reports: list, source: str, current_user: dict) -> dict:
+    user = await db.users.find_one({'id': current_user['sub']}, {'_id': 0})
+    if user['role_id'] not in [1, 2, 8]:  # Owner, Manager, IT Developer
+        raise HTTPException(status_code=403, detail='Tidak memiliki izin untuk import data')
+    
+    try:
+        summary = await import_ppob_records(db, loket_shifts, kasir_reports, current_user['sub'])
+    except HTTPException as e:
+        if e.status_code >= 500 and isinstance(e.detail, dict):
+            # Partially written: keep the audit trail of what was stored
+            await log_activity(
+                current_user['sub'],
+                'IMPORT_PPOB_HISTORY_PARTIAL',
+                f"Partial import ({source}): {e.detail['loket_shifts_imported']} loket shifts & {e.detail['kasir_reports_imported']} kasir reports stored",
+                related_type='ppob_import',
+                metadata={k: v for k, v in e.detail.items() if k != 'import_refs'},
+                critical=True
+            )
+        raise
+    
+    await log_activity(
+        current_user['sub'],
+        'IMPORT_PPOB_HISTORY',
+        f"Imported {summary['loket_shifts_imported']} loket shifts & {summary['kasir_reports_imported']} kasir reports ({source})",
+        related_type='ppob_import',
+        metadata={k: v for k, v in summary.items() if k != 'import_refs'},
+        critical=True
+    )
+    
+    return {'message': 'Import data PPOB berhasil', **summary}
+
+
+@api_router.post('/ppob/import', response_model=dict)
+async def import_ppob_history(
+    import_data: PPOBBulkImportRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Bulk import laporan shift loket & kasir PPOB historis (JSON).
+    Reports + jurnal ditulis dengan insert_many per chunk, tanpa notifikasi.
+    """
+    return await _run_ppob_import(import_data.loket_shifts, import_data.kasir_reports, 'json', current_user)
+
+
+@api_router.post('/ppob/import/csv', response_model=dict)
+async def import_ppob_history_csv(
+    record_type: str = Form(...),  # loket_shift | kasir_report
+    file: UploadFile = File(...),
+    current_user: dict = Depends(get_current_user)
+):
+    """Bulk import PPOB dari CSV - kolom list (channels, setoran_loket, topup_saldo) berisi JSON array"""
+    models_by_type = {'loket_shift': PPOBLoketShiftImport, 'kasir_report': PPOBKasirReportCreate}
+    if record_type not in models_by_type:
+        raise HTTPException(status_code=400, detail='record_type harus loket_shift atau kasir_report')
+    
+    # Malformed rows are reported by parse_ppob_csv as 400 with the row index
+    try:
+        text = (await file.read()).decode('utf-8-sig')
+    except UnicodeDecodeError as e:
+        raise HTTPException(status_code=400, detail=f'CSV tidak valid: {str(e)}')
+    records = parse_ppob_csv(text)
+    
+    valid, errors = validate_ppob_records(records, models_by_type[record_type])
+    if errors:
+        raise HTTPException(status_code=422, detail={'message': f'{len(errors)} baris tidak valid', 'errors': errors[:50]})
+    
+    if record_type == 'loket_shift':
+        return await _run_ppob_import(valid, [], 'csv', current_user)
+    return await _run_ppob_import([], valid, 'csv', current_user)
+
+
 # MENU 3: AKUNTING PPOB ENDPOINTS
 
 @api_router.get('/ppob/accounting/journal', response_model=dict)
@@ -3132,23 +3728,40 @@ async def get_ppob_ledger(
 ):
     """Get PPOB ledger per account"""
     query = {}
+    closing = None
     
     if start_date and end_date:
         query['tanggal'] = {
             '$gte': start_date,
             '$lte': end_date
         }
+    else:
+        # Start from the latest tutup buku checkpoint, not the beginning of the journal
+        closing = await get_latest_ppob_closing(db)
+        query = open_period_query(closing)
+    
+    if account_name:
+        query['$or'] = [{'debit_account': account_name}, {'kredit_account': account_name}]
     
     all_entries = await db.ppob_journal_entries.find(query, {'_id': 0}).sort('tanggal', 1).to_list(length=10000)
     
-    # Group by account
+    # Group by account, seeded with checkpoint balances (only the requested account)
     ledger = {}
+    for acc in (closing or {}).get('accounts', []):
+        if account_name and acc['account_name'] != account_name:
+            continue
+        ledger[acc['account_name']] = {
+            'account_name': acc['account_name'],
+            'transactions': [],
+            'opening_balance': acc['balance'],
+            'balance': acc['balance']
+        }
     
     for entry in all_entries:
         # Debit side
         debit_acc = entry['debit_account']
         if debit_acc not in ledger:
-            ledger[debit_acc] = {'account_name': debit_acc, 'transactions': [], 'balance': 0.0}
+            ledger[debit_acc] = {'account_name': debit_acc, 'transactions': [], 'opening_balance': 0.0, 'balance': 0.0}
         ledger[debit_acc]['transactions'].append({
             'tanggal': entry['tanggal'],
             'description': entry['description'],
@@ -3161,7 +3774,7 @@ async def get_ppob_ledger(
         # Kredit side
         kredit_acc = entry['kredit_account']
         if kredit_acc not in ledger:
-            ledger[kredit_acc] = {'account_name': kredit_acc, 'transactions': [], 'balance': 0.0}
+            ledger[kredit_acc] = {'account_name': kredit_acc, 'transactions': [], 'opening_balance': 0.0, 'balance': 0.0}
         ledger[kredit_acc]['transactions'].append({
             'tanggal': entry['tanggal'],
             'description': entry['description'],
@@ -3177,7 +3790,8 @@ async def get_ppob_ledger(
     
     return {
         'ledger': list(ledger.values()),
-        'accounts': list(ledger.keys())
+        'accounts': list(ledger.keys()),
+        'checkpoint_period': closing['period'] if closing else None
     }
 
 
@@ -3186,37 +3800,25 @@ async def get_ppob_account_balances(
     current_user: dict = Depends(get_current_user)
 ):
     """Get all PPOB account balances (saldo realtime)"""
-    # Get all journal entries
-    all_entries = await db.ppob_journal_entries.find({}, {'_id': 0}).to_list(length=10000)
-    
-    balances = {}
-    
-    for entry in all_entries:
-        # Debit increases balance
-        debit_acc = entry['debit_account']
-        if debit_acc not in balances:
-            balances[debit_acc] = 0.0
-        balances[debit_acc] += entry['debit_amount']
-        
-        # Kredit decreases balance
-        kredit_acc = entry['kredit_account']
-        if kredit_acc not in balances:
-            balances[kredit_acc] = 0.0
-        balances[kredit_acc] -= entry['kredit_amount']
+    # Checkpoint balances + entries posted after the latest tutup buku
+    closing = await get_latest_ppob_closing(db)
+    totals = await aggregate_ppob_account_totals(db, open_period_query(closing))
+    balances = merge_ppob_account_totals(closing, totals)
     
     # Format output
     account_balances = [
         {
             'account_name': acc,
-            'balance': bal,
+            'balance': values['balance'],
             'last_updated': utc_now().isoformat()
         }
-        for acc, bal in balances.items()
+        for acc, values in balances.items()
     ]
     
     return {
         'balances': account_balances,
-        'total_accounts': len(account_balances)
+        'total_accounts': len(account_balances),
+        'checkpoint_period': closing['period'] if closing else None
     }
 
 
@@ -3228,27 +3830,23 @@ async def get_ppob_profit_loss(
 ):
     """Get PPOB profit & loss statement"""
     query = {}
+    closing = None
     
     if start_date and end_date:
         query['tanggal'] = {
             '$gte': start_date,
             '$lte': end_date
         }
+    else:
+        # All-time P&L: reuse checkpoint totals and only scan the open period
+        closing = await get_latest_ppob_closing(db)
+        query = open_period_query(closing)
     
-    entries = await db.ppob_journal_entries.find(query, {'_id': 0}).to_list(length=10000)
-    
-    # Calculate revenue and expenses
-    revenue = 0.0
-    expenses = 0.0
+    totals = merge_ppob_account_totals(closing, await aggregate_ppob_account_totals(db, query))
     
-    for entry in entries:
-        # Revenue accounts (Kredit)
-        if 'Pendapatan' in entry['kredit_account']:
-            revenue += entry['kredit_amount']
-        
-        # Expense accounts (Debit)
-        if 'Biaya' in entry['debit_account']:
-            expenses += entry['debit_amount']
+    # Revenue accounts (Kredit) and expense accounts (Debit)
+    revenue = sum(acc['kredit_total'] for name, acc in totals.items() if 'Pendapatan' in name)
+    expenses = sum(acc['debit_total'] for name, acc in totals.items() if 'Biaya' in name)
     
     net_profit = revenue - expenses
     profit_margin = (net_profit / revenue * 100) if revenue > 0 else 0
@@ -3265,6 +3863,82 @@ async def get_ppob_profit_loss(
     }
 
 
+@api_router.get('/ppob/accounting/closings', response_model=dict)
+async def get_ppob_period_closings(
+    current_user: dict = Depends(get_current_user)
+):
+    """Get PPOB tutup buku history (balance checkpoints)"""
+    closings = await db.ppob_period_closings.find(
+        {}, {'_id': 0, 'accounts': 0}
+    ).sort('period_end', -1).to_list(length=120)
+    
+    return {
+        'closings': closings,
+        'count': len(closings),
+        'latest_period': closings[0]['period'] if closings else None
+    }
+
+
+@api_router.post('/ppob/accounting/close-period', response_model=dict)
+async def close_ppob_accounting_period(
+    year: int = Body(...),
+    month: int = Body(...),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Tutup buku PPOB per bulan:
+    - Simpan saldo per akun sebagai checkpoint
+    - Kunci periode dari posting jurnal baru
+    """
+    user = await db.users.find_one({'id': current_user['sub']}, {'_id': 0})
+    if user['role_id'] not in [1, 2, 3, 8]:  # Owner, Manager, Finance, IT Developer
+        raise HTTPException(status_code=403, detail='Tidak memiliki izin untuk tutup buku')
+    
+    closing = await close_ppob_period(db, year, month, current_user['sub'])
+    
+    await log_activity(
+        current_user['sub'],
+        'CLOSE_PPOB_PERIOD',
+        f"Tutup buku PPOB periode {closing['period']}",
+        related_type='ppob_period_closing',
+        related_id=closing['id'],
+        metadata={'period': closing['period'], 'entries_in_period': closing['entries_in_period']},
+        critical=True
+    )
+    
+    return {
+        'message': f"Periode {closing['period']} berhasil ditutup",
+        'period': closing['period'],
+        'period_end': closing['period_end'],
+        'accounts': closing['accounts'],
+        'entries_in_period': closing['entries_in_period']
+    }
+
+
+@api_router.delete('/ppob/accounting/close-period/{period}', response_model=dict)
+async def reopen_ppob_accounting_period(
+    period: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Reopen the latest closed PPOB period - Owner only"""
+    user = await db.users.find_one({'id': current_user['sub']}, {'_id': 0})
+    if user['role_id'] != ROLE_OWNER:
+        raise HTTPException(status_code=403, detail='Hanya Owner yang dapat membuka kembali periode')
+    
+    closing = await reopen_ppob_period(db, period)
+    
+    await log_activity(
+        current_user['sub'],
+        'REOPEN_PPOB_PERIOD',
+        f"Membuka kembali periode PPOB {period}",
+        related_type='ppob_period_closing',
+        related_id=closing['id'],
+        critical=True
+    )
+    
+    return {'message': f'Periode {period} berhasil dibuka kembali'}
+
+
 # 3. EXECUTIVE SUMMARY REPORT ENDPOINT
 
 @api_router.get('/reports/executive-summary', response_model=dict)
@@ -3700,7 +4374,7 @@ async def export_report(
                 summary_data['period_start'] = datetime.fromisoformat(summary_data['period_start'])
             if isinstance(summary_data.get('period_end'), str):
                 summary_data['period_end'] = datetime.fromisoformat(summary_data['period_end'])
-            buffer = report_generator.generate_executive_summary_pdf(summary_data)
+            buffer = report_generator.generate_executive_summary_pdf(summary_data, await settings_service.get_timezone())
             filename = f"executive_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
             media_type = "application/pdf"
         else:  # Excel
@@ -3906,7 +4580,7 @@ async def create_income(
     
     income_dict = income_data.model_dump()
     income_dict['id'] = generate_id()
-    income_dict['income_code'] = generate_code('INC', 10)
+    income_dict['income_code'] = await sequence_allocator.next_code('INC')
     income_dict['business_id'] = business_id
     income_dict['created_by'] = current_user['sub']
     income_dict['created_at'] = utc_now()
@@ -3921,7 +4595,7 @@ async def create_income(
     # AUTO-CREATE TRANSACTION for accounting sync
     transaction = {
         'id': generate_id(),
-        'transaction_code': generate_code('TXN', 12),
+        'transaction_code': await sequence_allocator.next_code('TXN'),
         'business_id': business_id,
         'transaction_type': 'income',
         'category': income_dict['category'].value if hasattr(income_dict['category'], 'value') else income_dict['category'],
@@ -4006,7 +4680,8 @@ async def delete_income(
         'DELETE_INCOME',
         f"Deleted income entry {income_id}",
         related_type='income',
-        related_id=income_id
+        related_id=income_id,
+        critical=True
     )
     
     return {'message': 'Data pemasukan berhasil dihapus'}
@@ -4032,7 +4707,7 @@ async def create_expense(
     
     expense_dict = expense_data.model_dump()
     expense_dict['id'] = generate_id()
-    expense_dict['expense_code'] = generate_code('EXP', 10)
+    expense_dict['expense_code'] = await sequence_allocator.next_code('EXP')
     expense_dict['business_id'] = business_id
     expense_dict['created_by'] = current_user['sub']
     expense_dict['created_at'] = utc_now()
@@ -4047,7 +4722,7 @@ async def create_expense(
     # AUTO-CREATE TRANSACTION for accounting sync
     transaction = {
         'id': generate_id(),
-        'transaction_code': generate_code('TXN', 12),
+        'transaction_code': await sequence_allocator.next_code('TXN'),
         'business_id': business_id,
         'transaction_type': 'expense',
         'category': expense_dict['category'].value if hasattr(expense_dict['category'], 'value') else expense_dict['category'],
@@ -4132,7 +4807,8 @@ async def delete_expense(
         'DELETE_EXPENSE',
         f"Deleted expense entry {expense_id}",
         related_type='expense',
-        related_id=expense_id
+        related_id=expense_id,
+        critical=True
     )
     
     return {'message': 'Data pengeluaran berhasil dihapus'}
@@ -4267,12 +4943,36 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=['*'],
     allow_headers=['*'],
+    expose_headers=['X-DB-Calls', 'X-DB-Time'],
 )
 
 # Gzip compression middleware for faster response (60-80% bandwidth reduction)
 app.add_middleware(GZipMiddleware, minimum_size=1000)
 
+# Unhandled exceptions -> activity_logs (level=error) + error_groups
+app.add_middleware(ErrorCaptureMiddleware, writer=background_writer)
+
+# Per-request MongoDB call count/time -> X-DB-Calls / X-DB-Time headers
+app.add_middleware(DbStatsMiddleware)
+
+# Per-route latency/throughput/status metrics (outermost, so it times everything)
+app.add_middleware(MetricsMiddleware, registry=metrics)
+
+
+retention_task: Optional[asyncio.Task] = None
+
+
+@app.on_event('startup')
+async def start_background_writer():
+    global retention_task
+    background_writer.start()
+    retention_task = asyncio.create_task(run_retention_loop(db))
+
 
 @app.on_event('shutdown')
 async def shutdown_db_client():
+    if retention_task:
+        retention_task.cancel()
+    await background_writer.stop()
+    shutdown_report_executor()
     client.close()
@@ -0,0 +1,154 @@
+"""
+Background Writer
+Deferred, batched writes for side effects that don't need to block the
+request (notifications, activity logs, order events). Writes go into a
+bounded in-memory queue and are flushed per collection with one bulk_write
+when the batch is full or the flush interval passes
+"""
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from typing import List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import InsertOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL_SECONDS = float(os.environ.get('WRITER_FLUSH_INTERVAL_MS', 200)) / 1000
+MAX_BATCH_SIZE = int(os.environ.get('WRITER_MAX_BATCH_SIZE', 500))
+MAX_QUEUE_SIZE = int(os.environ.get('WRITER_MAX_QUEUE_SIZE', 10000))
+SHUTDOWN_TIMEOUT_SECONDS = 10
+
+
+class BackgroundWriter:
+    def __init__(
+        self,
+        flush_interval: float = FLUSH_INTERVAL_SECONDS,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_queue_size: int = MAX_QUEUE_SIZE
+    ):
+        self.flush_interval = flush_interval
+        self.max_batch_size = max_batch_size
+        self.max_queue_size = max_queue_size
+        self.db: Optional[AsyncIOMotorDatabase] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pending = set()
+        self.written = 0
+        self.failed = 0
+        self.overflowed = 0
+        self.flushes = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def bind(self, db: AsyncIOMotorDatabase) -> None:
+        self.db = db
+
+    def start(self) -> None:
+        """Start the flush loop (call from app startup)"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = SHUTDOWN_TIMEOUT_SECONDS) -> None:
+        """Flush everything still queued, then stop (call from app shutdown)"""
+        if self.running:
+            await self._queue.put(None)
+            try:
+                await asyncio.wait_for(self._task, timeout)
+            except asyncio.TimeoutError:
+                logger.error(f'Background writer did not drain within {timeout}s, {self._queue.qsize()} write(s) lost')
+            self._task = None
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+
+    def insert(self, collection: str, doc: dict) -> None:
+        """Queue an insert; the caller's dict is copied so Mongo's _id never leaks back"""
+        self.enqueue(collection, InsertOne(doc.copy()))
+
+    def insert_many(self, collection: str, docs: List[dict]) -> None:
+        for doc in docs:
+            self.insert(collection, doc)
+
+    def enqueue(self, collection: str, operation) -> None:
+        """Queue any pymongo bulk operation (InsertOne, UpdateOne, ...) without waiting"""
+        if self.running:
+            try:
+                self._queue.put_nowait((collection, operation))
+                return
+            except asyncio.QueueFull:
+                # Never drop writes: overflow is written directly
+                self.overflowed += 1
+        # Not started (scripts, tests) or queue full: write right away in the background
+        task = asyncio.get_running_loop().create_task(self._write({collection: [operation]}))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def put(self, collection: str, doc: dict) -> None:
+        """Queue an insert, waiting for room when the queue is full (backpressure)"""
+        if self.running:
+            await self._queue.put((collection, InsertOne(doc.copy())))
+        else:
+            await self._write({collection: [InsertOne(doc.copy())]})
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch: List[Tuple[str, object]] = [item]
+
+            # Collect whatever arrives within the flush window
+            deadline = asyncio.get_running_loop().time() + self.flush_interval
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            grouped = defaultdict(list)
+            for collection, operation in batch:
+                grouped[collection].append(operation)
+            await self._write(grouped)
+            self.flushes += 1
+
+    async def _write(self, grouped: dict) -> None:
+        for collection, operations in grouped.items():
+            try:
+                result = await self.db[collection].bulk_write(operations, ordered=False)
+                self.written += result.inserted_count + result.modified_count + result.upserted_count
+            except BulkWriteError as e:
+                self.failed += len(e.details.get('writeErrors', []))
+                logger.error(f"Background write to {collection} partially failed: {e.details.get('writeErrors', [])[:3]}")
+            except PyMongoError as e:
+                self.failed += len(operations)
+                logger.error(f"Background write to {collection} failed: {str(e)}")
+
+    def stats(self) -> dict:
+        return {
+            'running': self.running,
+            'queued': self._queue.qsize() if self._queue else 0,
+            'max_queue_size': self.max_queue_size,
+            'flushes': self.flushes,
+            'written': self.written,
+            'failed': self.failed,
+            'overflowed': self.overflowed
+        }
+
+
+# Create singleton instance
+background_writer = BackgroundWriter()
@@ -0,0 +1,81 @@
+"""
+In-process Response Cache
+Namespaced TTL cache with a version counter per namespace: writes bump the
+version (e.g. every order write invalidates 'orders'), so cached reads are
+never served across a write in this process. The TTL bounds staleness
+between processes
+"""
+import time
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+DEFAULT_TTL_SECONDS = 30
+
+# Namespaces
+ORDERS_CACHE = 'orders'
+
+
+class VersionedCache:
+    def __init__(self):
+        self._versions: Dict[str, int] = {}
+        self._entries: Dict[Tuple[str, Hashable], Tuple[int, float, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def version(self, namespace: str) -> int:
+        return self._versions.get(namespace, 0)
+
+    def get(self, namespace: str, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get((namespace, key))
+        if entry:
+            version, expires_at, value = entry
+            if version == self.version(namespace) and expires_at > time.monotonic():
+                self.hits += 1
+                return value
+            del self._entries[(namespace, key)]
+        self.misses += 1
+        return None
+
+    def set(
+        self,
+        namespace: str,
+        key: Hashable,
+        value: Any,
+        ttl: float = DEFAULT_TTL_SECONDS,
+        version: Optional[int] = None
+    ) -> bool:
+        """
+        Store a value computed under `version` (read before the query started).
+        Skipped when a write bumped the version meanwhile, so a result computed
+        from pre-write data is never stored under the post-write version.
+        """
+        current = self.version(namespace)
+        if version is not None and version != current:
+            return False
+        self._entries[(namespace, key)] = (current, time.monotonic() + ttl, value)
+        return True
+
+    def invalidate(self, namespace: str) -> None:
+        """Bump the namespace version and drop its entries"""
+        self._versions[namespace] = self.version(namespace) + 1
+        for cache_key in [k for k in self._entries if k[0] == namespace]:
+            del self._entries[cache_key]
+
+    def clear(self) -> int:
+        """Drop everything; returns the number of entries removed"""
+        removed = len(self._entries)
+        for namespace in list(self._versions):
+            self._versions[namespace] += 1
+        self._entries.clear()
+        return removed
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'versions': dict(self._versions)
+        }
+
+
+# Create singleton instance
+app_cache = VersionedCache()
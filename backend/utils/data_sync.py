@@ -6,7 +6,8 @@ from datetime import datetime, date
 from typing import Optional
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
-from utils.helpers import generate_id, generate_code, utc_now
+from utils.helpers import generate_id, utc_now
+from utils.sequences import sequence_allocator
 
 
 async def auto_create_transaction_from_order(
@@ -34,7 +35,7 @@ async def auto_create_transaction_from_order(
     # Create revenue transaction
     transaction = {
         'id': generate_id(),
-        'transaction_number': generate_code('TRX'),
+        'transaction_number': await sequence_allocator.next_code('TRX'),
         'business_id': order['business_id'],
         'transaction_type': 'revenue',
         'category': business.get('category', 'General') if business else 'General',
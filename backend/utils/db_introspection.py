@@ -0,0 +1,139 @@
+"""
+Database Introspection (developer tools)
+Collection statistics from metadata instead of scans: estimated document
+counts, $collStats storage sizes and $indexStats usage counters, gathered
+concurrently for all collections. Explain-plan summaries for ad-hoc queries
+"""
+import asyncio
+from typing import List
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import PyMongoError
+
+# Server-side time limit for ad-hoc developer queries
+DEFAULT_QUERY_TIME_MS = 5000
+MAX_QUERY_TIME_MS = 30000
+
+
+def clamp_max_time_ms(max_time_ms: int) -> int:
+    """1ms..MAX_QUERY_TIME_MS, so an ad-hoc query cannot pin the primary"""
+    return max(1, min(max_time_ms, MAX_QUERY_TIME_MS))
+
+
+async def _storage_stats(collection) -> dict:
+    docs = await collection.aggregate([{'$collStats': {'storageStats': {}}}]).to_list(None)
+    return docs[0].get('storageStats', {}) if docs else {}
+
+
+async def _index_usage(collection) -> dict:
+    """index name -> {ops, since} (counters reset on mongod restart)"""
+    docs = await collection.aggregate([{'$indexStats': {}}]).to_list(None)
+    usage = {}
+    for doc in docs:
+        accesses = doc.get('accesses', {})
+        since = accesses.get('since')
+        usage[doc['name']] = {
+            'ops': accesses.get('ops', 0),
+            'since': since.isoformat() if hasattr(since, 'isoformat') else since
+        }
+    return usage
+
+
+async def collection_info(db: AsyncIOMotorDatabase, name: str) -> dict:
+    collection = db[name]
+    count, storage, usage, indexes = await asyncio.gather(
+        collection.estimated_document_count(),
+        _storage_stats(collection),
+        _index_usage(collection),
+        collection.index_information(),
+        return_exceptions=True
+    )
+
+    info = {'name': name, 'count': count if isinstance(count, int) else None}
+    errors = [str(result) for result in (count, storage, usage, indexes) if isinstance(result, Exception)]
+    if errors:
+        info['errors'] = errors  # e.g. views or missing clusterMonitor privileges
+    storage = storage if isinstance(storage, dict) else {}
+    usage = usage if isinstance(usage, dict) else {}
+    indexes = indexes if isinstance(indexes, dict) else {}
+
+    index_sizes = storage.get('indexSizes', {})
+    info.update({
+        'size_bytes': storage.get('size'),
+        'storage_size_bytes': storage.get('storageSize'),
+        'avg_obj_size_bytes': storage.get('avgObjSize'),
+        'total_index_size_bytes': storage.get('totalIndexSize'),
+        'indexes': [
+            {
+                'name': index_name,
+                'key': [[field, direction] for field, direction in spec.get('key', [])],
+                'unique': spec.get('unique', False),
+                'size_bytes': index_sizes.get(index_name),
+                'ops': usage.get(index_name, {}).get('ops'),
+                'since': usage.get(index_name, {}).get('since')
+            }
+            for index_name, spec in indexes.items()
+        ]
+    })
+    # Never used since the counters started (the _id index is always kept)
+    info['unused_indexes'] = [
+        index['name'] for index in info['indexes']
+        if index['ops'] == 0 and index['name'] != '_id_'
+    ]
+    return info
+
+
+async def get_collections_info(db: AsyncIOMotorDatabase) -> List[dict]:
+    """Stats for every collection, queried concurrently"""
+    names = sorted(name for name in await db.list_collection_names() if not name.startswith('system.'))
+    results = await asyncio.gather(*(collection_info(db, name) for name in names), return_exceptions=True)
+    return [
+        result if not isinstance(result, Exception) else {'name': name, 'count': None, 'errors': [str(result)]}
+        for name, result in zip(names, results)
+    ]
+
+
+def _plan_stages(plan: dict):
+    """Walk a (classic or SBE) plan tree depth-first"""
+    if not isinstance(plan, dict):
+        return
+    plan = plan.get('queryPlan', plan)
+    yield plan
+    for child_key in ('inputStage', 'outerStage', 'innerStage'):
+        if child_key in plan:
+            yield from _plan_stages(plan[child_key])
+    for child in plan.get('inputStages', []):
+        yield from _plan_stages(child)
+
+
+def summarize_explain(explain: dict) -> dict:
+    """The fields that tell whether a query used an index"""
+    winning_plan = explain.get('queryPlanner', {}).get('winningPlan', {})
+    execution = explain.get('executionStats', {})
+    stages = list(_plan_stages(winning_plan))
+    return {
+        'winning_plan': winning_plan,
+        'stages': [stage.get('stage') for stage in stages],
+        'indexes_used': [stage['indexName'] for stage in stages if stage.get('indexName')],
+        'collscan': any(stage.get('stage') == 'COLLSCAN' for stage in stages),
+        'n_returned': execution.get('nReturned'),
+        'keys_examined': execution.get('totalKeysExamined'),
+        'docs_examined': execution.get('totalDocsExamined'),
+        'execution_time_ms': execution.get('executionTimeMillis'),
+        'rejected_plans': len(explain.get('queryPlanner', {}).get('rejectedPlans', []))
+    }
+
+
+async def explain_find(
+    db: AsyncIOMotorDatabase,
+    collection: str,
+    query: dict,
+    limit: int,
+    max_time_ms: int
+) -> dict:
+    """Run the find under explain (executionStats) with the same limit and time guard"""
+    explain = await db.command({
+        'explain': {'find': collection, 'filter': query, 'limit': limit, 'maxTimeMS': max_time_ms},
+        'verbosity': 'executionStats'
+    })
+    return summarize_explain(explain)
@@ -0,0 +1,207 @@
+"""
+MongoDB Command Monitoring
+A pymongo CommandListener times every command. Per-request totals live in
+a context variable (Motor copies the context into its executor threads),
+so each response gets X-DB-Calls / X-DB-Time headers. Commands slower
+than SLOW_QUERY_MS are logged with their collection, query shape and
+originating route
+"""
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from pymongo import monitoring
+
+from utils.error_tracking import route_template
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 100))
+MAX_SLOW_QUERIES = 200
+MAX_SHAPE_DEPTH = 4
+
+# Handshake/auth/session chatter, not application queries
+IGNORED_COMMANDS = {
+    'hello', 'ismaster', 'isMaster', 'ping', 'buildinfo', 'buildInfo', 'saslStart',
+    'saslContinue', 'authenticate', 'getnonce', 'endSessions', 'killCursors'
+}
+
+# Command name -> field holding the query/pipeline worth showing
+SHAPE_FIELDS = {
+    'find': 'filter',
+    'aggregate': 'pipeline',
+    'count': 'query',
+    'distinct': 'query',
+    'findAndModify': 'query',
+    'delete': 'deletes',
+    'update': 'updates',
+}
+
+
+class RequestDbStats:
+    __slots__ = ('scope', 'calls', 'total_ms', '_lock')
+
+    def __init__(self, scope: Optional[dict] = None):
+        self.scope = scope
+        self.calls = 0
+        self.total_ms = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, duration_ms: float) -> None:
+        with self._lock:
+            self.calls += 1
+            self.total_ms += duration_ms
+
+    @property
+    def route(self) -> Optional[str]:
+        if not self.scope:
+            return None
+        return f"{self.scope.get('method', '')} {route_template(self.scope)}"
+
+
+_request_stats: ContextVar[Optional[RequestDbStats]] = ContextVar('request_db_stats', default=None)
+
+
+def query_shape(value: Any, depth: int = 0) -> Any:
+    """Keep keys and operators, replace literal values with '?'"""
+    if depth > MAX_SHAPE_DEPTH:
+        return '...'
+    if isinstance(value, dict):
+        return {key: query_shape(item, depth + 1) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        # Pipelines/update lists: shape every element; value lists ($in) collapse
+        if value and all(isinstance(item, dict) for item in value):
+            return [query_shape(item, depth + 1) for item in value[:10]]
+        return ['?']
+    return '?'
+
+
+def command_collection(command_name: str, command: dict) -> Optional[str]:
+    target = command.get(command_name)
+    if command_name == 'getMore':
+        target = command.get('collection')
+    return target if isinstance(target, str) else None
+
+
+def command_shape(command_name: str, command: dict) -> Any:
+    field = SHAPE_FIELDS.get(command_name)
+    if not field:
+        return None
+    value = command.get(field)
+    if command_name in ('update', 'delete') and isinstance(value, list) and value:
+        value = value[0].get('q')  # First statement's filter
+    return query_shape(value)
+
+
+class DbCommandListener(monitoring.CommandListener):
+    def __init__(self, slow_query_ms: float = SLOW_QUERY_MS):
+        self.slow_query_ms = slow_query_ms
+        self._started: Dict[int, tuple] = {}
+        self.command_stats = defaultdict(lambda: [0, 0.0])  # (collection, command) -> [count, total_ms]
+        self.slow_queries = deque(maxlen=MAX_SLOW_QUERIES)
+        # Events arrive on Motor's executor threads; guards command_stats and slow_queries
+        self._lock = threading.Lock()
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        # Keep the command itself; its shape is only computed if it turns out slow
+        self._started[event.request_id] = (event.command, event.database_name, _request_stats.get())
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finish(event, failed=False)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed: bool) -> None:
+        started = self._started.pop(event.request_id, None)
+        if started is None:
+            return
+        command, database_name, request_stats = started
+        duration_ms = event.duration_micros / 1000
+        collection = command_collection(event.command_name, command)
+
+        with self._lock:
+            stat = self.command_stats[(collection, event.command_name)]
+            stat[0] += 1
+            stat[1] += duration_ms
+        if request_stats is not None:
+            request_stats.add(duration_ms)
+
+        if duration_ms >= self.slow_query_ms:
+            entry = {
+                'at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'duration_ms': round(duration_ms, 1),
+                'command': event.command_name,
+                'collection': f'{database_name}.{collection}',
+                'shape': command_shape(event.command_name, command),
+                'route': request_stats.route if request_stats else None,
+                'failed': failed
+            }
+            with self._lock:
+                self.slow_queries.append(entry)
+            logger.warning(
+                f"Slow query {entry['duration_ms']}ms {entry['command']} {entry['collection']} "
+                f"shape={entry['shape']} route={entry['route']}"
+            )
+
+    def stats(self, top: int = 20) -> dict:
+        with self._lock:
+            command_stats = [(key, tuple(stat)) for key, stat in self.command_stats.items()]
+            slow_queries = list(self.slow_queries)
+        commands = sorted(
+            (
+                {
+                    'collection': collection,
+                    'command': command_name,
+                    'count': count,
+                    'total_ms': round(total_ms, 1),
+                    'avg_ms': round(total_ms / count, 2)
+                }
+                for (collection, command_name), (count, total_ms) in command_stats if count
+            ),
+            key=lambda c: c['total_ms'],
+            reverse=True
+        )
+        return {
+            'slow_query_ms': self.slow_query_ms,
+            'top_commands': commands[:top],
+            'slow_queries': slow_queries[::-1]
+        }
+
+
+class DbStatsMiddleware:
+    """Pure ASGI middleware: per-request DB accounting exposed as response headers"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestDbStats(scope)
+        token = _request_stats.set(stats)
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                headers = list(message.get('headers', []))
+                headers.append((b'x-db-calls', str(stats.calls).encode()))
+                headers.append((b'x-db-time', f'{stats.total_ms:.1f}'.encode()))
+                message = {**message, 'headers': headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+
+
+# Create singleton instance
+db_listener = DbCommandListener()
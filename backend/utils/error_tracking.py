@@ -0,0 +1,133 @@
+"""
+Error Tracking
+Activity log entries carry a `level` (info/warning/error) so errors are an
+indexed equality lookup. Unhandled exceptions are captured by an ASGI
+middleware, logged with route and latency, and grouped in error_groups by
+a traceback fingerprint
+"""
+import hashlib
+import logging
+import time
+import traceback
+from typing import Optional
+
+from pymongo import UpdateOne
+
+from utils.helpers import generate_id, utc_now
+
+logger = logging.getLogger(__name__)
+
+LEVEL_INFO = 'info'
+LEVEL_WARNING = 'warning'
+LEVEL_ERROR = 'error'
+LOG_LEVELS = [LEVEL_INFO, LEVEL_WARNING, LEVEL_ERROR]
+
+SERVER_ERROR_ACTION = 'server_error'
+MAX_TRACEBACK_CHARS = 8000
+
+
+def route_template(scope: dict) -> str:
+    """'/api/orders/{order_id}' rather than the raw path, so ids don't split groups"""
+    route = scope.get('route')
+    return getattr(route, 'path', None) or scope.get('path', '')
+
+
+def fingerprint_exception(exc: BaseException) -> str:
+    """
+    Stable hash of exception type + call stack (file and function, no line
+    numbers), so the same bug groups together across deploys
+    """
+    frames = traceback.extract_tb(exc.__traceback__)
+    parts = [type(exc).__module__ + '.' + type(exc).__qualname__]
+    parts.extend(f'{frame.filename.rsplit("/", 1)[-1]}:{frame.name}' for frame in frames)
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()[:16]
+
+
+def build_error_records(
+    exc: BaseException,
+    method: str,
+    route: str,
+    path: str,
+    latency_ms: float,
+    user_id: Optional[str] = None
+) -> tuple:
+    """(activity log entry, error_groups upsert) for one captured exception"""
+    fingerprint = fingerprint_exception(exc)
+    exception_type = type(exc).__name__
+    message = str(exc)[:500]
+    now = utc_now().isoformat()
+
+    log_entry = {
+        'id': generate_id(),
+        'user_id': user_id or 'system',
+        'action': SERVER_ERROR_ACTION,
+        'level': LEVEL_ERROR,
+        'description': f'{method} {route}: {exception_type}: {message}',
+        'ip_address': '0.0.0.0',
+        'related_type': 'error_group',
+        'related_id': fingerprint,
+        'metadata': {
+            'method': method,
+            'route': route,
+            'path': path,
+            'status_code': 500,
+            'latency_ms': round(latency_ms, 1),
+            'exception_type': exception_type,
+            'fingerprint': fingerprint
+        },
+        'created_at': now
+    }
+
+    group_update = UpdateOne(
+        {'_id': fingerprint},
+        {
+            '$inc': {'count': 1},
+            '$set': {
+                'last_seen': now,
+                'last_message': message,
+                'last_route': f'{method} {route}',
+                'last_latency_ms': round(latency_ms, 1)
+            },
+            '$setOnInsert': {
+                'fingerprint': fingerprint,
+                'exception_type': exception_type,
+                'first_seen': now,
+                'traceback': ''.join(traceback.format_exception(type(exc), exc, exc.__traceback__))[-MAX_TRACEBACK_CHARS:]
+            },
+            '$addToSet': {'routes': f'{method} {route}'}
+        },
+        upsert=True
+    )
+    return log_entry, group_update
+
+
+class ErrorCaptureMiddleware:
+    """
+    Pure ASGI middleware: records unhandled exceptions, then re-raises so
+    the normal 500 response is still produced. Writes go through the
+    background writer and never delay the response.
+    """
+
+    def __init__(self, app, writer):
+        self.app = app
+        self.writer = writer
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        except Exception as exc:
+            latency_ms = (time.perf_counter() - started) * 1000
+            try:
+                log_entry, group_update = build_error_records(
+                    exc, scope.get('method', ''), route_template(scope), scope.get('path', ''), latency_ms
+                )
+                self.writer.insert('activity_logs', log_entry)
+                self.writer.enqueue('error_groups', group_update)
+            except Exception as e:
+                logger.error(f'Error capture failed: {str(e)}')
+            raise
@@ -1,15 +1,37 @@
 from datetime import datetime, timezone
+import os
+import threading
+import time
 import uuid
-import random
-import string
+
+_id_lock = threading.Lock()
+_last_id_ms = 0
+_last_id_seq = 0
 
 def generate_id() -> str:
-    return str(uuid.uuid4())
+    """
+    Time-ordered UUID (version 7 layout): 48-bit unix ms timestamp, 12-bit
+    per-ms sequence, 62 random bits. Same 36-char format as uuid4, but new
+    ids sort after older ones, so inserts land at the right edge of the
+    `id` index and sorting by id follows creation order.
+    """
+    global _last_id_ms, _last_id_seq
+    with _id_lock:
+        ms = time.time_ns() // 1_000_000
+        if ms > _last_id_ms:
+            _last_id_ms = ms
+            _last_id_seq = int.from_bytes(os.urandom(2), 'big') & 0x3FF  # leave room to count up
+        else:
+            # Same ms (or clock went back): keep ids monotonic
+            _last_id_seq += 1
+            if _last_id_seq > 0xFFF:
+                _last_id_ms += 1
+                _last_id_seq = 0
+        ms, seq = _last_id_ms, _last_id_seq
 
-def generate_code(prefix: str, length: int = 10) -> str:
-    timestamp = datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')
-    random_str = ''.join(random.choices(string.digits, k=length - len(timestamp)))
-    return f'{prefix}{timestamp}{random_str}'
+    rand_b = int.from_bytes(os.urandom(8), 'big') & ((1 << 62) - 1)
+    value = (ms & ((1 << 48) - 1)) << 80 | 0x7 << 76 | seq << 64 | 0b10 << 62 | rand_b
+    return str(uuid.UUID(int=value))
 
 def utc_now() -> datetime:
     return datetime.now(timezone.utc)
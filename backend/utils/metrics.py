@@ -0,0 +1,205 @@
+"""
+Request Metrics
+Per-route request counts, status codes and latency histograms kept in
+plain in-process counters (one event loop, no locks). Exposed in
+Prometheus text format at /metrics and summarized in /dev/health
+"""
+import time
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+
+from utils.error_tracking import route_template
+
+# Latency histogram upper bounds, seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+WINDOW_SECONDS = 60
+UNMATCHED_ROUTE = '<unmatched>'
+
+
+class RouteStats:
+    __slots__ = ('count', 'errors', 'total_seconds', 'buckets', 'statuses')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # Last slot is +Inf
+        self.statuses: Dict[int, int] = defaultdict(int)
+
+    def observe(self, status: int, seconds: float) -> None:
+        self.count += 1
+        self.total_seconds += seconds
+        self.statuses[status] += 1
+        if status >= 500:
+            self.errors += 1
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+
+def histogram_quantile(q: float, buckets: List[int]) -> Optional[float]:
+    """Estimate a quantile (seconds) from bucket counts, interpolating inside the bucket"""
+    total = sum(buckets)
+    if not total:
+        return None
+    rank = q * total
+    cumulative = 0
+    for i, count in enumerate(buckets):
+        if cumulative + count >= rank and count:
+            lower = LATENCY_BUCKETS[i - 1] if i > 0 else 0.0
+            if i >= len(LATENCY_BUCKETS):
+                return LATENCY_BUCKETS[-1]  # Beyond the last bound: report the bound
+            return lower + (LATENCY_BUCKETS[i] - lower) * (rank - cumulative) / count
+        cumulative += count
+    return LATENCY_BUCKETS[-1]
+
+
+def _label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.started_at = time.time()
+        self.in_flight = 0
+        self.routes: Dict[Tuple[str, str], RouteStats] = {}
+        # Ring of per-second (second, requests, errors) for the rolling window
+        self._window: List[List[int]] = [[0, 0, 0] for _ in range(WINDOW_SECONDS)]
+
+    def observe(self, method: str, route: str, status: int, seconds: float) -> None:
+        stats = self.routes.get((method, route))
+        if stats is None:
+            stats = self.routes[(method, route)] = RouteStats()
+        stats.observe(status, seconds)
+
+        now = int(time.time())
+        slot = self._window[now % WINDOW_SECONDS]
+        if slot[0] != now:
+            slot[0], slot[1], slot[2] = now, 0, 0
+        slot[1] += 1
+        if status >= 500:
+            slot[2] += 1
+
+    def _window_totals(self) -> Tuple[int, int]:
+        cutoff = int(time.time()) - WINDOW_SECONDS
+        requests = errors = 0
+        for second, count, error_count in self._window:
+            if second > cutoff:
+                requests += count
+                errors += error_count
+        return requests, errors
+
+    def uptime_seconds(self) -> float:
+        return time.time() - self.started_at
+
+    def summary(self, slowest: int = 10) -> dict:
+        """Numbers for /dev/health"""
+        buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        total = errors = 0
+        for stats in self.routes.values():
+            total += stats.count
+            errors += stats.errors
+            for i, count in enumerate(stats.buckets):
+                buckets[i] += count
+        window_requests, window_errors = self._window_totals()
+
+        def ms(q, b):
+            value = histogram_quantile(q, b)
+            return round(value * 1000, 1) if value is not None else None
+
+        routes = sorted(
+            (
+                {
+                    'route': f'{method} {route}',
+                    'count': stats.count,
+                    'errors': stats.errors,
+                    'avg_ms': round(stats.total_seconds / stats.count * 1000, 1),
+                    'p95_ms': ms(0.95, stats.buckets)
+                }
+                for (method, route), stats in self.routes.items() if stats.count
+            ),
+            key=lambda r: r['p95_ms'] or 0,
+            reverse=True
+        )
+
+        uptime = self.uptime_seconds()
+        return {
+            'uptime_seconds': round(uptime),
+            'uptime': str(timedelta(seconds=int(uptime))),
+            'requests_total': total,
+            'requests_per_min': window_requests,
+            'requests_per_sec': round(window_requests / WINDOW_SECONDS, 2),
+            'error_rate': round(window_errors / window_requests * 100, 2) if window_requests else 0.0,
+            'error_rate_total': round(errors / total * 100, 2) if total else 0.0,
+            'in_flight': self.in_flight,
+            'latency_ms': {'p50': ms(0.5, buckets), 'p95': ms(0.95, buckets), 'p99': ms(0.99, buckets)},
+            'slowest_routes': routes[:slowest]
+        }
+
+    def render_prometheus(self) -> str:
+        lines = [
+            '# HELP process_uptime_seconds Seconds since the process started',
+            '# TYPE process_uptime_seconds gauge',
+            f'process_uptime_seconds {self.uptime_seconds():.3f}',
+            '# HELP http_requests_in_flight Requests currently being served',
+            '# TYPE http_requests_in_flight gauge',
+            f'http_requests_in_flight {self.in_flight}',
+            '# HELP http_requests_total Requests by route and status code',
+            '# TYPE http_requests_total counter',
+        ]
+        for (method, route), stats in self.routes.items():
+            for status, count in sorted(stats.statuses.items()):
+                lines.append(f'http_requests_total{{method="{method}",route="{_label(route)}",status="{status}"}} {count}')
+
+        lines += [
+            '# HELP http_request_duration_seconds Request latency by route',
+            '# TYPE http_request_duration_seconds histogram',
+        ]
+        for (method, route), stats in self.routes.items():
+            labels = f'method="{method}",route="{_label(route)}"'
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, stats.buckets):
+                cumulative += count
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {stats.count}')
+            lines.append(f'http_request_duration_seconds_sum{{{labels}}} {stats.total_seconds:.6f}')
+            lines.append(f'http_request_duration_seconds_count{{{labels}}} {stats.count}')
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: times every HTTP request against its route template"""
+
+    def __init__(self, app, registry: MetricsRegistry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        self.registry.in_flight += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.registry.in_flight -= 1
+            # Unmatched paths (404 probes) share one series to bound cardinality
+            route = route_template(scope) if scope.get('route') else UNMATCHED_ROUTE
+            self.registry.observe(scope.get('method', ''), route, status_code, time.perf_counter() - started)
+
+
+# Create singleton instance
+metrics = MetricsRegistry()
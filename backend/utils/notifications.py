@@ -0,0 +1,356 @@
+"""
+Notification Inbox
+Personal notifications carry their own is_read flag. Broadcasts
+(user_id='broadcast_manager', visible to every user) are shared documents
+numbered by a global sequence (seq): each reader's state is a read-all
+watermark on that sequence plus notification_reads markers for broadcasts
+read one by one above it.
+
+Unread badges come from notification_counters without counting:
+- per user: {unread, broadcast_seq_read, broadcast_read_count, version}
+- one global 'broadcast_seq' document handing out seqs
+unread badge = unread + (latest stored seq - broadcast_seq_read - broadcast_read_count)
+Using the latest stored seq (not the last one handed out) keeps broadcasts
+still queued in the background writer out of the badge until they land.
+The counters are recounted from the documents on first read, when they
+stop adding up, and every REBUILD_INTERVAL.
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument, UpdateMany, UpdateOne
+
+from utils.helpers import generate_id, utc_now
+
+BROADCAST_MANAGER = 'broadcast_manager'
+BROADCAST_SEQ_ID = 'broadcast_seq'
+MAX_INBOX_SIZE = 100
+REBUILD_ATTEMPTS = 3
+REBUILD_INTERVAL = timedelta(minutes=15)
+
+
+def build_notification(
+    user_id: str,
+    title: str,
+    message: str,
+    type: str = 'info',
+    related_type: Optional[str] = None,
+    related_id: Optional[str] = None,
+    created_at: Optional[str] = None
+) -> dict:
+    return {
+        'id': generate_id(),
+        'user_id': user_id,
+        'title': title,
+        'message': message,
+        'type': type,
+        'related_id': related_id,
+        'related_type': related_type,
+        'is_read': False,
+        'created_at': created_at or utc_now().isoformat()
+    }
+
+
+def _counter_inc(key: str, **fields) -> UpdateOne:
+    """Upserted $inc; every change bumps version so rebuilds can compare-and-set"""
+    return UpdateOne({'_id': key}, {'$inc': {**fields, 'version': 1}}, upsert=True)
+
+
+async def _reserve_broadcast_seq(db: AsyncIOMotorDatabase, count: int) -> int:
+    """Reserve count consecutive broadcast seqs; returns the first one"""
+    counter = await db.notification_counters.find_one_and_update(
+        {'_id': BROADCAST_SEQ_ID},
+        {'$inc': {'seq': count, 'version': 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return counter['seq'] - count + 1
+
+
+async def send_notifications(db: AsyncIOMotorDatabase, docs: List[dict], writer=None) -> None:
+    """
+    Store notifications and bump unread counters. Broadcasts get their seq
+    now (one counter update per call); personal counters and the documents
+    are queued with a background writer, otherwise written now. No
+    recipient lookup either way.
+    """
+    if not docs:
+        return
+
+    broadcasts = sum(1 for doc in docs if doc['user_id'] == BROADCAST_MANAGER)
+    if broadcasts:
+        seq = await _reserve_broadcast_seq(db, broadcasts)
+        stamped = []
+        for doc in docs:
+            if doc['user_id'] == BROADCAST_MANAGER:
+                doc = {**doc, 'seq': seq}
+                seq += 1
+            stamped.append(doc)
+        docs = stamped
+
+    per_user = Counter(doc['user_id'] for doc in docs if doc['user_id'] != BROADCAST_MANAGER)
+    counter_ops = [_counter_inc(user_id, unread=n) for user_id, n in per_user.items()]
+
+    # Notifications are queued first so they are flushed before the counters
+    if writer is not None:
+        writer.insert_many('notifications', docs)
+        for op in counter_ops:
+            writer.enqueue('notification_counters', op)
+    else:
+        await db.notifications.insert_many([doc.copy() for doc in docs])
+        if counter_ops:
+            await db.notification_counters.bulk_write(counter_ops, ordered=False)
+
+
+async def _latest_broadcast_seq(db: AsyncIOMotorDatabase) -> int:
+    """Highest seq actually stored; seqs reserved but still queued are not counted yet"""
+    latest = await db.notifications.find_one(
+        {'user_id': BROADCAST_MANAGER, 'seq': {'$exists': True}},
+        {'_id': 0, 'seq': 1},
+        sort=[('seq', -1)]
+    )
+    return latest['seq'] if latest else 0
+
+
+async def _counter_docs(db: AsyncIOMotorDatabase, user_id: str) -> tuple:
+    """(user state or None, latest stored broadcast seq), two indexed lookups"""
+    state = await db.notification_counters.find_one({'_id': user_id})
+    return state, await _latest_broadcast_seq(db)
+
+
+def _broadcasts_unread(state: dict, broadcast_seq: int) -> int:
+    return broadcast_seq - state.get('broadcast_seq_read', 0) - state.get('broadcast_read_count', 0)
+
+
+def _unread(state: dict, broadcast_seq: int) -> int:
+    return max(state.get('unread', 0), 0) + max(_broadcasts_unread(state, broadcast_seq), 0)
+
+
+def _needs_rebuild(state: Optional[dict], broadcast_seq: int) -> bool:
+    """Never counted, stale, or the increments no longer add up"""
+    if state is None or 'rebuilt_at' not in state:
+        return True
+    if state.get('unread', 0) < 0 or _broadcasts_unread(state, broadcast_seq) < 0:
+        return True
+    return datetime.fromisoformat(state['rebuilt_at']) < utc_now() - REBUILD_INTERVAL
+
+
+async def _broadcast_read_ids(db: AsyncIOMotorDatabase, user_id: str, seq_read: int) -> List[str]:
+    """Broadcasts read one by one above the read-all watermark"""
+    markers = await db.notification_reads.find(
+        {'user_id': user_id, 'notification_seq': {'$gt': seq_read}},
+        {'_id': 0, 'notification_id': 1}
+    ).to_list(None)
+    return [m['notification_id'] for m in markers]
+
+
+async def rebuild_unread_count(db: AsyncIOMotorDatabase, user: dict) -> dict:
+    """
+    Recount one user's unread notifications from the source documents.
+    Gaps below the latest stored seq (a broadcast lost with a failed write)
+    are folded into broadcast_read_count so the badge matches the inbox.
+    Compare-and-set on version: an increment landing during the recount
+    makes the write miss, and the recount is retried.
+    """
+    state = None
+    for _ in range(REBUILD_ATTEMPTS):
+        state, broadcast_seq = await _counter_docs(db, user['id'])
+        version = (state or {}).get('version')
+        seq_read = (state or {}).get('broadcast_seq_read', 0)
+
+        unread = await db.notifications.count_documents({'user_id': user['id'], 'is_read': False})
+        read_ids = await _broadcast_read_ids(db, user['id'], seq_read)
+        unread_broadcasts = await db.notifications.count_documents({
+            'user_id': BROADCAST_MANAGER,
+            'seq': {'$gt': seq_read, '$lte': broadcast_seq},
+            'id': {'$nin': read_ids}
+        })
+
+        fields = {
+            'unread': unread,
+            'broadcast_seq_read': seq_read,
+            'broadcast_read_count': max(broadcast_seq - seq_read, 0) - unread_broadcasts,
+            'rebuilt_at': utc_now().isoformat()
+        }
+        if state is None:
+            result = await db.notification_counters.update_one(
+                {'_id': user['id']},
+                {'$setOnInsert': {**fields, 'version': 0}},
+                upsert=True
+            )
+            written = result.upserted_id is not None
+        else:
+            result = await db.notification_counters.update_one(
+                {'_id': user['id'], 'version': version},
+                {'$set': fields, '$inc': {'version': 1}}
+            )
+            written = result.modified_count == 1
+        if written:
+            return {**fields, 'unread_total': _unread(fields, broadcast_seq)}
+    # Still racing with writes: the stored counter stays as is
+    state, broadcast_seq = await _counter_docs(db, user['id'])
+    return {**(state or {}), 'unread_total': _unread(state or {}, broadcast_seq)}
+
+
+async def get_unread_count(db: AsyncIOMotorDatabase, user: dict) -> int:
+    state, broadcast_seq = await _counter_docs(db, user['id'])
+    if _needs_rebuild(state, broadcast_seq):
+        return (await rebuild_unread_count(db, user))['unread_total']
+    return _unread(state, broadcast_seq)
+
+
+async def get_inbox(
+    db: AsyncIOMotorDatabase,
+    user: dict,
+    unread_only: bool = False,
+    limit: int = MAX_INBOX_SIZE
+) -> List[dict]:
+    """Personal + broadcast notifications, newest first, with per-user is_read"""
+    limit = max(1, min(limit, MAX_INBOX_SIZE))
+    state = await db.notification_counters.find_one({'_id': user['id']}) or {}
+    seq_read = state.get('broadcast_seq_read', 0)
+    read_ids = set(await _broadcast_read_ids(db, user['id'], seq_read))
+
+    if unread_only:
+        query = {'$or': [
+            {'user_id': user['id'], 'is_read': False},
+            {'user_id': BROADCAST_MANAGER, 'seq': {'$gt': seq_read}, 'id': {'$nin': list(read_ids)}}
+        ]}
+    else:
+        query = {'user_id': {'$in': [user['id'], BROADCAST_MANAGER]}}
+
+    notifications = await db.notifications.find(query, {'_id': 0}).sort('created_at', -1).limit(limit).to_list(limit)
+
+    for notif in notifications:
+        if notif['user_id'] == BROADCAST_MANAGER:
+            notif['is_read'] = notif.get('seq', 0) <= seq_read or notif['id'] in read_ids
+    return notifications
+
+
+async def mark_read(db: AsyncIOMotorDatabase, user: dict, notif_id: str) -> bool:
+    """Mark one notification read for this user; False when it isn't in their inbox"""
+    notif = await db.notifications.find_one(
+        {'id': notif_id, 'user_id': {'$in': [user['id'], BROADCAST_MANAGER]}},
+        {'_id': 0, 'id': 1, 'user_id': 1, 'seq': 1}
+    )
+    if not notif:
+        return False
+
+    now = utc_now().isoformat()
+    if notif['user_id'] != BROADCAST_MANAGER:
+        result = await db.notifications.update_one(
+            {'id': notif_id, 'is_read': False},
+            {'$set': {'is_read': True, 'read_at': now}}
+        )
+        if result.modified_count:
+            await db.notification_counters.bulk_write([_counter_inc(user['id'], unread=-1)])
+        return True
+
+    seq = notif.get('seq', 0)
+    state = await db.notification_counters.find_one({'_id': user['id']}) or {}
+    if seq <= state.get('broadcast_seq_read', 0):
+        return True  # Covered by an earlier read-all
+
+    # Only the request that creates the marker counts the read, and only while
+    # no read-all has moved the watermark past it in the meantime
+    result = await db.notification_reads.update_one(
+        {'user_id': user['id'], 'notification_id': notif_id},
+        {'$setOnInsert': {'notification_seq': seq, 'read_at': now}},
+        upsert=True
+    )
+    if result.upserted_id is not None:
+        await db.notification_counters.update_one(
+            {'_id': user['id'], '$or': [
+                {'broadcast_seq_read': {'$lt': seq}},
+                {'broadcast_seq_read': {'$exists': False}}
+            ]},
+            {'$inc': {'broadcast_read_count': 1, 'version': 1}}
+        )
+    return True
+
+
+async def mark_all_read(db: AsyncIOMotorDatabase, user: dict) -> int:
+    """
+    One update for personal notifications, one watermark for broadcasts.
+    The watermark is the latest stored broadcast seq, so broadcasts still
+    queued stay unread when they land; markers at or below it are dropped.
+    """
+    now = utc_now().isoformat()
+    result = await db.notifications.update_many(
+        {'user_id': user['id'], 'is_read': False},
+        {'$set': {'is_read': True, 'read_at': now}}
+    )
+    # Decrement by what was actually marked, so notifications arriving meanwhile stay counted
+    if result.modified_count:
+        await db.notification_counters.bulk_write([_counter_inc(user['id'], unread=-result.modified_count)])
+
+    latest_seq = await _latest_broadcast_seq(db)
+    for _ in range(REBUILD_ATTEMPTS):
+        state = await db.notification_counters.find_one({'_id': user['id']})
+        if state is None:
+            # Never counted: the first get_unread_count rebuilds from this watermark
+            await db.notification_counters.update_one(
+                {'_id': user['id']},
+                {'$max': {'broadcast_seq_read': latest_seq}, '$inc': {'version': 1}},
+                upsert=True
+            )
+            break
+        seq_read = max(state.get('broadcast_seq_read', 0), latest_seq)
+        # Markers above the watermark stay counted; compare-and-set against mark_read
+        still_read = await db.notification_reads.count_documents(
+            {'user_id': user['id'], 'notification_seq': {'$gt': seq_read}}
+        )
+        written = await db.notification_counters.update_one(
+            {'_id': user['id'], 'version': state.get('version')},
+            {'$set': {'broadcast_seq_read': seq_read, 'broadcast_read_count': still_read}, '$inc': {'version': 1}}
+        )
+        if written.modified_count:
+            break
+    else:
+        # Still racing: drop the counted state so the next read recounts
+        await db.notification_counters.update_one({'_id': user['id']}, {'$unset': {'rebuilt_at': ''}})
+
+    state = await db.notification_counters.find_one({'_id': user['id']}, {'broadcast_seq_read': 1}) or {}
+    await db.notification_reads.delete_many(
+        {'user_id': user['id'], 'notification_seq': {'$lte': state.get('broadcast_seq_read', 0)}}
+    )
+    return result.modified_count
+
+
+async def backfill_broadcast_seq(db: AsyncIOMotorDatabase) -> int:
+    """
+    Number broadcasts stored before seqs existed, oldest first, and copy the
+    seq onto their read markers. The counter already counted them, so on a
+    fresh sequence they take 1..n; otherwise a new range is reserved.
+    Every user's badge is recounted on its next read.
+    """
+    legacy = await db.notifications.find(
+        {'user_id': BROADCAST_MANAGER, 'seq': {'$exists': False}},
+        {'_id': 0, 'id': 1}
+    ).sort('created_at', 1).to_list(None)
+    if not legacy:
+        return 0
+
+    if await _latest_broadcast_seq(db):
+        first = await _reserve_broadcast_seq(db, len(legacy))
+    else:
+        first = 1
+        await db.notification_counters.update_one(
+            {'_id': BROADCAST_SEQ_ID},
+            {'$max': {'seq': len(legacy)}, '$inc': {'version': 1}},
+            upsert=True
+        )
+
+    notif_ops, marker_ops = [], []
+    for seq, notif in enumerate(legacy, start=first):
+        notif_ops.append(UpdateOne({'id': notif['id']}, {'$set': {'seq': seq}}))
+        marker_ops.append(UpdateMany({'notification_id': notif['id']}, {'$set': {'notification_seq': seq}}))
+    await db.notifications.bulk_write(notif_ops, ordered=False)
+    await db.notification_reads.bulk_write(marker_ops, ordered=False)
+    await db.notification_counters.update_many(
+        {'_id': {'$ne': BROADCAST_SEQ_ID}},
+        {'$unset': {'rebuilt_at': '', 'broadcast_read_at': ''}}
+    )
+    return len(legacy)
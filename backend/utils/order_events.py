@@ -0,0 +1,71 @@
+"""
+Order Event Log
+Append-only timeline per order (status changes, notes, progress, assignment)
+so the order document itself stays compact
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from utils.helpers import generate_id, utc_now
+from utils.pagination import fetch_keyset_page
+
+# Event types
+ORDER_CREATED = 'created'
+ORDER_STATUS_CHANGED = 'status_changed'
+ORDER_PROGRESS_UPDATED = 'progress_updated'
+ORDER_STEP_UPDATED = 'step_updated'
+ORDER_ASSIGNED = 'assigned'
+ORDER_PAYMENT_RECEIVED = 'payment_received'
+ORDER_NOTE_ADDED = 'note_added'
+
+
+def build_order_event(
+    order_id: str,
+    event_type: str,
+    actor: Optional[dict] = None,
+    payload: Optional[Dict[str, Any]] = None
+) -> dict:
+    """Build an order event; actor is the acting user document (id + display name kept)"""
+    return {
+        'id': generate_id(),
+        'order_id': order_id,
+        'ts': utc_now().isoformat(),
+        'actor': {
+            'id': actor.get('id'),
+            'name': actor.get('full_name') or actor.get('username')
+        } if actor else None,
+        'type': event_type,
+        'payload': payload or {}
+    }
+
+
+def token_actor(current_user: dict) -> dict:
+    """Actor from the JWT payload when the user document isn't loaded"""
+    return {'id': current_user.get('sub'), 'username': current_user.get('username')}
+
+
+async def record_order_event(
+    db: AsyncIOMotorDatabase,
+    order_id: str,
+    event_type: str,
+    actor: Optional[dict] = None,
+    payload: Optional[Dict[str, Any]] = None
+) -> dict:
+    event = build_order_event(order_id, event_type, actor, payload)
+    await db.order_events.insert_one(event.copy())
+    return event
+
+
+async def get_order_events(
+    db: AsyncIOMotorDatabase,
+    order_id: str,
+    after: Optional[str] = None,
+    limit: int = 50,
+    event_type: Optional[str] = None
+) -> Tuple[List[dict], Optional[str]]:
+    """Newest-first page of an order's timeline (keyset on ts, id)"""
+    query = {'order_id': order_id}
+    if event_type:
+        query['type'] = event_type
+    return await fetch_keyset_page(db.order_events, query, limit, after, sort_field='ts')
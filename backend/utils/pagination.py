@@ -0,0 +1,73 @@
+"""
+Keyset (cursor) Pagination Utilities
+Pages are sorted by (<time field> desc, id desc); the opaque `after` token
+encodes the last (time, id) seen so every page is one index seek
+"""
+import base64
+import json
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+
+MAX_PAGE_SIZE = 500
+
+
+def keyset_sort(sort_field: str = 'created_at') -> list:
+    return [(sort_field, -1), ('id', -1)]
+
+
+def encode_cursor(doc: dict, sort_field: str = 'created_at') -> str:
+    """Encode the sort key of the last document on a page"""
+    value = doc.get(sort_field)
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    raw = json.dumps([value, doc['id']], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token: str) -> Tuple[str, str]:
+    """Decode an `after` token back to (time, id)"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        value, doc_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(value, str) or not isinstance(doc_id, str):
+            raise ValueError
+        return value, doc_id
+    except (ValueError, TypeError, json.JSONDecodeError):
+        raise HTTPException(status_code=400, detail='Cursor tidak valid')
+
+
+def keyset_query(query: dict, after: Optional[str], sort_field: str = 'created_at') -> dict:
+    """Restrict query to documents strictly after the cursor in keyset order"""
+    if not after:
+        return query
+
+    value, doc_id = decode_cursor(after)
+    seek = {'$or': [
+        {sort_field: {'$lt': value}},
+        {sort_field: value, 'id': {'$lt': doc_id}}
+    ]}
+    return {'$and': [query, seek]} if query else seek
+
+
+async def fetch_keyset_page(
+    collection,
+    query: dict,
+    limit: int,
+    after: Optional[str] = None,
+    projection: Optional[dict] = None,
+    sort_field: str = 'created_at'
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    Fetch one page plus a look-ahead document.
+    Returns (items, next_cursor); next_cursor is None on the last page.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    docs = await collection.find(
+        keyset_query(query, after, sort_field), projection or {'_id': 0}
+    ).sort(keyset_sort(sort_field)).limit(limit + 1).to_list(limit + 1)
+
+    if len(docs) > limit:
+        docs = docs[:limit]
+        return docs, encode_cursor(docs[-1], sort_field)
+    return docs, None
@@ -0,0 +1,280 @@
+"""
+PPOB Accounting Utilities
+Double-entry journal builders for loket shift / kasir reports and
+period closing (tutup buku) with per-account balance checkpoints
+"""
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from utils.helpers import generate_id, utc_now
+
+
+def build_ppob_journal_entry(
+    tanggal,
+    description: str,
+    debit_account: str,
+    kredit_account: str,
+    amount: float,
+    reference_type: str,
+    reference_id: str,
+    user_id: str
+) -> dict:
+    """Build a double-entry journal document for PPOB"""
+    return {
+        'id': generate_id(),
+        'tanggal': tanggal.isoformat() if isinstance(tanggal, datetime) else tanggal,
+        'description': description,
+        'debit_account': debit_account,
+        'debit_amount': amount,
+        'kredit_account': kredit_account,
+        'kredit_amount': amount,
+        'reference_type': reference_type,
+        'reference_id': reference_id,
+        'created_at': utc_now().isoformat(),
+        'created_by': user_id
+    }
+
+
+def build_ppob_loket_shift(report_data, user_id: str) -> tuple:
+    """
+    Build laporan shift loket document and its journal entries:
+    - Debit: Piutang Setoran Loket
+    - Kredit: Pendapatan PPOB
+    """
+    total_penjualan = 0.0
+    total_sisa_setoran = 0.0
+
+    for channel in report_data.channels:
+        # Auto-calculate per channel
+        channel.sisa_setoran = channel.total_penjualan
+        channel.saldo_akhir = channel.saldo_awal + channel.saldo_inject - channel.total_penjualan
+
+        total_penjualan += channel.total_penjualan
+        total_sisa_setoran += channel.sisa_setoran
+
+    doc = report_data.model_dump(exclude={'import_ref'})
+    doc['id'] = generate_id()
+    doc['total_penjualan'] = total_penjualan
+    doc['total_sisa_setoran'] = total_sisa_setoran
+    doc['status_setoran'] = 'Belum Disetor'
+    doc['created_by'] = user_id
+    doc['tanggal'] = doc['tanggal'].isoformat() if isinstance(doc['tanggal'], datetime) else doc['tanggal']
+    doc['created_at'] = utc_now().isoformat()
+
+    journal_entries = [
+        build_ppob_journal_entry(
+            tanggal=report_data.tanggal,
+            description=f"Penjualan PPOB Shift {report_data.shift} - {report_data.nama_petugas}",
+            debit_account="Piutang Setoran Loket",
+            kredit_account="Pendapatan PPOB",
+            amount=total_penjualan,
+            reference_type="loket_shift",
+            reference_id=doc['id'],
+            user_id=user_id
+        )
+    ]
+
+    return doc, journal_entries
+
+
+def build_ppob_kasir_report(report_data, user_id: str) -> tuple:
+    """
+    Build laporan kasir document and its journal entries:
+    1. Setoran Loket: Debit Kas, Kredit Piutang
+    2. Setoran Loket Luar: Debit Kas, Kredit Pendapatan PPOB Loket Luar
+    3. Admin: Debit Kas, Kredit Pendapatan Admin
+    4. Topup Saldo: Debit Modal PPOB, Kredit Kas
+    5-6. Kas Kecil pengeluaran & penerimaan
+    """
+    total_setoran_loket = sum(s.amount for s in report_data.setoran_loket)
+    total_topup = sum(t.amount for t in report_data.topup_saldo)
+    saldo_kas_kecil = report_data.penerimaan_kas_kecil - report_data.pengurangan_kas_kecil
+
+    doc = report_data.model_dump()
+    doc['id'] = generate_id()
+    doc['total_setoran_loket'] = total_setoran_loket
+    doc['total_topup'] = total_topup
+    doc['saldo_kas_kecil'] = saldo_kas_kecil
+    doc['created_by'] = user_id
+    doc['tanggal'] = doc['tanggal'].isoformat() if isinstance(doc['tanggal'], datetime) else doc['tanggal']
+    doc['created_at'] = utc_now().isoformat()
+
+    postings = [
+        (total_setoran_loket, "Penerimaan Setoran Loket PPOB", "Kas", "Piutang Setoran Loket"),
+        (report_data.setoran_loket_luar, "Setoran Loket Luar PPOB", "Kas", "Pendapatan PPOB Loket Luar"),
+        (report_data.penerimaan_admin, "Penerimaan Admin PPOB", "Kas", "Pendapatan Admin"),
+        (total_topup, f"Topup Saldo PPOB - {len(report_data.topup_saldo)} channel(s)", "Modal Saldo PPOB", "Kas"),
+        (report_data.pengurangan_kas_kecil, "Pengeluaran Kas Kecil", "Biaya Operasional", "Kas Kecil"),
+        (report_data.penerimaan_kas_kecil, "Penerimaan Kas Kecil", "Kas Kecil", "Kas"),
+    ]
+
+    journal_entries = [
+        build_ppob_journal_entry(
+            tanggal=report_data.tanggal,
+            description=description,
+            debit_account=debit_account,
+            kredit_account=kredit_account,
+            amount=amount,
+            reference_type="kasir_report",
+            reference_id=doc['id'],
+            user_id=user_id
+        )
+        for amount, description, debit_account, kredit_account in postings
+        if amount > 0
+    ]
+
+    # Loket shifts settled (status_setoran → Lunas) by this report
+    settled_shift_ids: List[str] = [s.loket_report_id for s in report_data.setoran_loket] if total_setoran_loket > 0 else []
+
+    return doc, journal_entries, settled_shift_ids
+
+
+def ppob_period_bounds(year: int, month: int) -> tuple:
+    """
+    Return (period_key, period_start, period_end) for a closing month.
+    period_end is the first instant of the next month, so closed entries
+    are exactly those with tanggal < period_end.
+    """
+    if month < 1 or month > 12:
+        raise HTTPException(status_code=400, detail='Bulan harus antara 1-12')
+
+    next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+    period_start = datetime(year, month, 1).isoformat()
+    period_end = datetime(next_year, next_month, 1).isoformat()
+    return f'{year:04d}-{month:02d}', period_start, period_end
+
+
+async def get_latest_ppob_closing(db: AsyncIOMotorDatabase) -> Optional[dict]:
+    """Get the most recent PPOB period closing (checkpoint)"""
+    closings = await db.ppob_period_closings.find(
+        {}, {'_id': 0}
+    ).sort('period_end', -1).limit(1).to_list(1)
+    return closings[0] if closings else None
+
+
+def open_period_query(closing: Optional[dict]) -> dict:
+    """Journal query that only matches entries after the checkpoint"""
+    if not closing:
+        return {}
+    return {'tanggal': {'$gte': closing['period_end']}}
+
+
+async def ensure_ppob_period_open(db: AsyncIOMotorDatabase, tanggal) -> None:
+    """Reject postings dated inside an already closed period"""
+    tanggal_str = tanggal.isoformat() if isinstance(tanggal, datetime) else str(tanggal)
+    closing = await get_latest_ppob_closing(db)
+    if closing and tanggal_str < closing['period_end']:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Periode {tanggal_str[:7]} sudah ditutup (tutup buku s/d {closing['period']})"
+        )
+
+
+async def aggregate_ppob_account_totals(db: AsyncIOMotorDatabase, query: dict) -> Dict[str, dict]:
+    """
+    Sum debit and kredit amounts per account for journal entries matching query.
+    Both sides are grouped server-side in a single aggregation round-trip.
+    """
+    pipeline = [
+        {'$match': query},
+        {'$facet': {
+            'debit': [
+                {'$group': {'_id': '$debit_account', 'total': {'$sum': '$debit_amount'}, 'count': {'$sum': 1}}}
+            ],
+            'kredit': [
+                {'$group': {'_id': '$kredit_account', 'total': {'$sum': '$kredit_amount'}, 'count': {'$sum': 1}}}
+            ]
+        }}
+    ]
+    result = await db.ppob_journal_entries.aggregate(pipeline).to_list(1)
+
+    totals = {}
+    if not result:
+        return totals
+
+    for side in ['debit', 'kredit']:
+        for row in result[0][side]:
+            acc = totals.setdefault(row['_id'], {'debit_total': 0.0, 'kredit_total': 0.0, 'entry_count': 0})
+            acc[f'{side}_total'] += row['total']
+            acc['entry_count'] += row['count']
+
+    return totals
+
+
+def merge_ppob_account_totals(closing: Optional[dict], totals: Dict[str, dict]) -> Dict[str, dict]:
+    """Add open-period totals on top of the checkpoint balances"""
+    merged = {}
+
+    for acc in (closing or {}).get('accounts', []):
+        merged[acc['account_name']] = {
+            'debit_total': acc['debit_total'],
+            'kredit_total': acc['kredit_total'],
+            'entry_count': acc.get('entry_count', 0)
+        }
+
+    for name, acc in totals.items():
+        target = merged.setdefault(name, {'debit_total': 0.0, 'kredit_total': 0.0, 'entry_count': 0})
+        target['debit_total'] += acc['debit_total']
+        target['kredit_total'] += acc['kredit_total']
+        target['entry_count'] += acc['entry_count']
+
+    for acc in merged.values():
+        acc['balance'] = acc['debit_total'] - acc['kredit_total']
+
+    return merged
+
+
+async def close_ppob_period(db: AsyncIOMotorDatabase, year: int, month: int, user_id: str) -> dict:
+    """
+    Close a PPOB period: write cumulative per-account balances up to the end
+    of the month. Only entries since the previous checkpoint are scanned.
+    """
+    period, period_start, period_end = ppob_period_bounds(year, month)
+
+    if period_end > utc_now().replace(tzinfo=None).isoformat():
+        raise HTTPException(status_code=400, detail='Periode yang belum berakhir tidak bisa ditutup')
+
+    latest = await get_latest_ppob_closing(db)
+    if latest and period_end <= latest['period_end']:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Periode {period} sudah termasuk dalam tutup buku s/d {latest['period']}"
+        )
+
+    query = {'tanggal': {'$lt': period_end}}
+    if latest:
+        query['tanggal']['$gte'] = latest['period_end']
+
+    totals = await aggregate_ppob_account_totals(db, query)
+    merged = merge_ppob_account_totals(latest, totals)
+
+    closing = {
+        'id': generate_id(),
+        'period': period,
+        'period_start': period_start,
+        'period_end': period_end,
+        'previous_period': latest['period'] if latest else None,
+        'accounts': [
+            {'account_name': name, **values}
+            for name, values in sorted(merged.items())
+        ],
+        'entries_in_period': sum(acc['entry_count'] for acc in totals.values()) // 2,
+        'closed_by': user_id,
+        'closed_at': utc_now().isoformat()
+    }
+
+    await db.ppob_period_closings.insert_one(closing.copy())
+    return closing
+
+
+async def reopen_ppob_period(db: AsyncIOMotorDatabase, period: str) -> dict:
+    """Reopen the latest closed period by removing its checkpoint"""
+    latest = await get_latest_ppob_closing(db)
+    if not latest or latest['period'] != period:
+        raise HTTPException(status_code=400, detail='Hanya periode tutup buku terakhir yang bisa dibuka kembali')
+
+    await db.ppob_period_closings.delete_one({'id': latest['id']})
+    return latest
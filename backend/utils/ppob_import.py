@@ -0,0 +1,184 @@
+"""
+PPOB Bulk Import Utilities
+Replay historical loket shift & kasir reports (onboarding outlet baru)
+without per-record HTTP calls or notifications.
+Chunked inserts are not one transaction: every imported document carries
+import_batch_id, and a write failure reports what was already stored
+"""
+import csv
+import io
+import json
+from typing import List, Tuple
+
+from fastapi import HTTPException
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from utils.helpers import generate_id
+from utils.ppob_accounting import (
+    build_ppob_loket_shift, build_ppob_kasir_report, get_latest_ppob_closing
+)
+from utils.ppob_saldo import update_channel_saldo_index
+from utils.ppob_setoran import rebuild_setoran_counters
+
+IMPORT_CHUNK_SIZE = 1000
+
+# CSV columns that carry nested lists, encoded as JSON arrays
+CSV_LIST_FIELDS = ('channels', 'setoran_loket', 'topup_saldo')
+
+
+def _csv_error(index: int, error: str) -> HTTPException:
+    return HTTPException(
+        status_code=400,
+        detail={'message': f'CSV tidak valid di baris {index}', 'index': index, 'error': error}
+    )
+
+
+def parse_ppob_csv(text: str) -> List[dict]:
+    """
+    Parse CSV text into raw records; list columns hold JSON arrays.
+    Malformed rows raise 400 with the row index (same numbering as
+    validate_ppob_records)
+    """
+    records = []
+    try:
+        for row in csv.DictReader(io.StringIO(text)):
+            record = {key: value for key, value in row.items() if key and value not in (None, '')}
+            for field in CSV_LIST_FIELDS:
+                if field in record:
+                    try:
+                        record[field] = json.loads(record[field])
+                    except json.JSONDecodeError as e:
+                        raise _csv_error(len(records), f'kolom {field} bukan JSON yang valid: {e.msg}')
+            records.append(record)
+    except csv.Error as e:
+        raise _csv_error(len(records), str(e))
+    return records
+
+
+def validate_ppob_records(records: List[dict], model) -> Tuple[list, list]:
+    """Validate raw records in bulk, collecting errors per row index"""
+    valid = []
+    errors = []
+    for index, record in enumerate(records):
+        try:
+            valid.append(model.model_validate(record))
+        except ValidationError as e:
+            errors.append({'index': index, 'errors': e.errors(include_url=False, include_context=False)})
+    return valid, errors
+
+
+async def _insert_chunked(collection, docs: List[dict], chunk_size: int, summary: dict, key: str) -> None:
+    """Insert in chunks, counting into summary[key] as chunks land (also on failure)"""
+    for start in range(0, len(docs), chunk_size):
+        try:
+            result = await collection.insert_many(docs[start:start + chunk_size], ordered=False)
+        except BulkWriteError as e:
+            summary[key] += e.details.get('nInserted', 0)
+            raise
+        summary[key] += len(result.inserted_ids)
+
+
+async def import_ppob_records(
+    db: AsyncIOMotorDatabase,
+    loket_shifts: list,
+    kasir_reports: list,
+    user_id: str,
+    chunk_size: int = IMPORT_CHUNK_SIZE
+) -> dict:
+    """
+    Bulk import validated PPOB records:
+    - Build reports + journal entries in memory (same rules as the single endpoints)
+    - Write with chunked insert_many, no notifications
+    - Kasir setoran may reference loket shifts in the same batch via import_ref
+    - A write failure raises with the partial summary and import_batch_id, so
+      the stored part can be found (and removed) before retrying
+    """
+    closing = await get_latest_ppob_closing(db)
+    if closing:
+        locked = [
+            {'type': record_type, 'index': index, 'tanggal': report.tanggal.isoformat()}
+            for record_type, reports in [('loket_shift', loket_shifts), ('kasir_report', kasir_reports)]
+            for index, report in enumerate(reports)
+            if report.tanggal.isoformat() < closing['period_end']
+        ]
+        if locked:
+            raise HTTPException(
+                status_code=400,
+                detail={
+                    'message': f"{len(locked)} record berada di periode yang sudah ditutup (s/d {closing['period']})",
+                    'records': locked[:50]
+                }
+            )
+
+    shift_docs = []
+    kasir_docs = []
+    journal_entries = []
+    settled_shift_ids = []
+    ref_map = {}
+    batch_id = generate_id()
+
+    for report in loket_shifts:
+        doc, entries = build_ppob_loket_shift(report, user_id)
+        doc['imported'] = True
+        doc['import_batch_id'] = batch_id
+        if getattr(report, 'import_ref', None):
+            if report.import_ref in ref_map:
+                raise HTTPException(status_code=400, detail=f'import_ref duplikat: {report.import_ref}')
+            ref_map[report.import_ref] = doc['id']
+        shift_docs.append(doc)
+        journal_entries.extend(entries)
+
+    for report in kasir_reports:
+        for setoran in report.setoran_loket:
+            setoran.loket_report_id = ref_map.get(setoran.loket_report_id, setoran.loket_report_id)
+        doc, entries, settled = build_ppob_kasir_report(report, user_id)
+        doc['imported'] = True
+        doc['import_batch_id'] = batch_id
+        kasir_docs.append(doc)
+        journal_entries.extend(entries)
+        settled_shift_ids.extend(settled)
+
+    for entry in journal_entries:
+        entry['import_batch_id'] = batch_id
+
+    summary = {
+        'import_batch_id': batch_id,
+        'loket_shifts_imported': 0,
+        'kasir_reports_imported': 0,
+        'journal_entries_created': 0,
+        'shifts_settled': 0,
+        'import_refs': ref_map
+    }
+    try:
+        # Shifts first so same-batch setoran can settle them
+        await _insert_chunked(db.ppob_loket_shifts, shift_docs, chunk_size, summary, 'loket_shifts_imported')
+        await _insert_chunked(db.ppob_kasir_reports, kasir_docs, chunk_size, summary, 'kasir_reports_imported')
+        await _insert_chunked(db.ppob_journal_entries, journal_entries, chunk_size, summary, 'journal_entries_created')
+        await update_channel_saldo_index(db, shift_docs)
+
+        for start in range(0, len(settled_shift_ids), chunk_size):
+            result = await db.ppob_loket_shifts.update_many(
+                {'id': {'$in': settled_shift_ids[start:start + chunk_size]}},
+                {'$set': {'status_setoran': 'Lunas'}}
+            )
+            summary['shifts_settled'] += result.modified_count
+
+        # Recount outstanding setoran for the businesses touched by this import
+        business_ids = {doc['business_id'] for doc in shift_docs}
+        if settled_shift_ids:
+            async for doc in db.ppob_loket_shifts.find({'id': {'$in': settled_shift_ids}}, {'_id': 0, 'business_id': 1}):
+                business_ids.add(doc['business_id'])
+        await rebuild_setoran_counters(db, list(business_ids))
+    except PyMongoError as e:
+        raise HTTPException(
+            status_code=500,
+            detail={
+                'message': f'Import terhenti, sebagian data sudah tersimpan (import_batch_id {batch_id})',
+                'error': str(e),
+                **summary
+            }
+        )
+
+    return summary
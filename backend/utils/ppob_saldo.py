@@ -0,0 +1,108 @@
+"""
+PPOB Channel Saldo Chaining
+Maintains the latest saldo_akhir per (business_id, channel_name) so the
+next shift's saldo_awal can be pre-filled without scanning ppob_loket_shifts
+"""
+from typing import List
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from utils.helpers import utc_now
+
+# Selisih saldo di bawah nilai ini dianggap pembulatan
+SALDO_GAP_TOLERANCE = 1.0
+
+
+def _latest_channel_saldo(shift_docs: List[dict]) -> dict:
+    """Pick the newest (tanggal, shift) saldo per business/channel from shift documents"""
+    latest = {}
+    for doc in shift_docs:
+        for channel in doc.get('channels', []):
+            key = (doc['business_id'], channel['channel_name'])
+            candidate = {
+                'business_id': doc['business_id'],
+                'channel_name': channel['channel_name'],
+                'saldo_akhir': channel['saldo_akhir'],
+                'tanggal': doc['tanggal'],
+                'shift': doc['shift'],
+                'nama_petugas': doc.get('nama_petugas'),
+                'report_id': doc['id']
+            }
+            current = latest.get(key)
+            if not current or (candidate['tanggal'], candidate['shift']) >= (current['tanggal'], current['shift']):
+                latest[key] = candidate
+    return latest
+
+
+async def update_channel_saldo_index(db: AsyncIOMotorDatabase, shift_docs: List[dict]) -> None:
+    """
+    Upsert the latest saldo per channel in one bulk_write.
+    The update pipeline only replaces the stored saldo when the incoming shift
+    is not older than it, so back-dated and imported shifts are safe.
+    """
+    operations = []
+    for (business_id, channel_name), saldo in _latest_channel_saldo(shift_docs).items():
+        saldo['updated_at'] = utc_now().isoformat()
+        is_newer = {'$or': [
+            {'$lt': ['$tanggal', saldo['tanggal']]},
+            {'$and': [{'$eq': ['$tanggal', saldo['tanggal']]}, {'$lte': ['$shift', saldo['shift']]}]}
+        ]}
+        operations.append(UpdateOne(
+            {'business_id': business_id, 'channel_name': channel_name},
+            [{'$replaceRoot': {'newRoot': {'$cond': [
+                is_newer,
+                {'$mergeObjects': ['$$ROOT', {'$literal': saldo}]},
+                '$$ROOT'
+            ]}}}],
+            upsert=True
+        ))
+
+    if operations:
+        await db.ppob_channel_saldo.bulk_write(operations, ordered=False)
+
+
+async def get_channel_saldo(db: AsyncIOMotorDatabase, business_id: str) -> List[dict]:
+    """Latest saldo per channel for a business"""
+    return await db.ppob_channel_saldo.find(
+        {'business_id': business_id}, {'_id': 0}
+    ).sort('channel_name', 1).to_list(length=100)
+
+
+def find_channel_saldo_gaps(previous: List[dict], shift_doc: dict) -> List[dict]:
+    """
+    Compare a new shift against the previous saldo per channel:
+    - saldo_awal that doesn't match the previous saldo_akhir
+    - channels from the previous shift that are missing in this one
+    Back-dated shifts are not checked.
+    """
+    previous_by_channel = {
+        p['channel_name']: p for p in previous
+        if (p['tanggal'], p['shift']) < (shift_doc['tanggal'], shift_doc['shift'])
+    }
+
+    gaps = []
+    reported = set()
+    for channel in shift_doc.get('channels', []):
+        reported.add(channel['channel_name'])
+        prev = previous_by_channel.get(channel['channel_name'])
+        if prev and abs(channel['saldo_awal'] - prev['saldo_akhir']) > SALDO_GAP_TOLERANCE:
+            gaps.append({
+                'channel_name': channel['channel_name'],
+                'type': 'saldo_mismatch',
+                'expected_saldo_awal': prev['saldo_akhir'],
+                'saldo_awal': channel['saldo_awal'],
+                'selisih': channel['saldo_awal'] - prev['saldo_akhir'],
+                'previous_report_id': prev['report_id']
+            })
+
+    for name, prev in previous_by_channel.items():
+        if name not in reported:
+            gaps.append({
+                'channel_name': name,
+                'type': 'channel_missing',
+                'expected_saldo_awal': prev['saldo_akhir'],
+                'previous_report_id': prev['report_id']
+            })
+
+    return gaps
@@ -0,0 +1,134 @@
+"""
+PPOB Outstanding Setoran (Piutang Setoran Loket)
+Per-business counters of shifts still 'Belum Disetor', maintained on
+shift create and kasir settlement so the kasir queue never needs a count scan
+"""
+from typing import List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from utils.helpers import generate_id, utc_now
+
+STATUS_BELUM_DISETOR = 'Belum Disetor'
+STATUS_LUNAS = 'Lunas'
+
+
+async def _inc_setoran_counters(db: AsyncIOMotorDatabase, deltas: dict) -> None:
+    """Apply {business_id: (count_delta, total_delta)} in one bulk_write"""
+    operations = [
+        UpdateOne(
+            {'business_id': business_id},
+            {
+                '$inc': {'outstanding_count': count, 'outstanding_total': total},
+                '$set': {'updated_at': utc_now().isoformat()}
+            },
+            upsert=True
+        )
+        for business_id, (count, total) in deltas.items()
+        if count or total
+    ]
+    if operations:
+        await db.ppob_setoran_counters.bulk_write(operations, ordered=False)
+
+
+async def add_outstanding_setoran(db: AsyncIOMotorDatabase, shift_docs: List[dict]) -> None:
+    """Count newly created 'Belum Disetor' shifts"""
+    deltas = {}
+    for doc in shift_docs:
+        if doc.get('status_setoran') != STATUS_BELUM_DISETOR:
+            continue
+        count, total = deltas.get(doc['business_id'], (0, 0.0))
+        deltas[doc['business_id']] = (count + 1, total + doc.get('total_sisa_setoran', 0.0))
+    await _inc_setoran_counters(db, deltas)
+
+
+async def settle_loket_shifts(db: AsyncIOMotorDatabase, shift_ids: List[str]) -> List[dict]:
+    """
+    Mark shifts Lunas and decrement the counters: one update_many, then one
+    find for the shifts this call settled (tagged with its settlement_id).
+    Only shifts that actually transition from 'Belum Disetor' are counted,
+    so re-submitting the same setoran never double-decrements.
+    """
+    shift_ids = list(dict.fromkeys(shift_ids))
+    if not shift_ids:
+        return []
+
+    settlement_id = generate_id()
+    result = await db.ppob_loket_shifts.update_many(
+        {'id': {'$in': shift_ids}, 'status_setoran': STATUS_BELUM_DISETOR},
+        {'$set': {
+            'status_setoran': STATUS_LUNAS,
+            'settled_at': utc_now().isoformat(),
+            'settlement_id': settlement_id
+        }}
+    )
+    if not result.modified_count:
+        return []
+
+    settled = await db.ppob_loket_shifts.find(
+        {'id': {'$in': shift_ids}, 'settlement_id': settlement_id},
+        {'_id': 0, 'id': 1, 'business_id': 1, 'total_sisa_setoran': 1}
+    ).to_list(length=len(shift_ids))
+
+    deltas = {}
+    for doc in settled:
+        count, total = deltas.get(doc['business_id'], (0, 0.0))
+        deltas[doc['business_id']] = (count - 1, total - doc.get('total_sisa_setoran', 0.0))
+    await _inc_setoran_counters(db, deltas)
+
+    return settled
+
+
+async def rebuild_setoran_counters(db: AsyncIOMotorDatabase, business_ids: Optional[List[str]] = None) -> None:
+    """Recompute counters from the partial index (after bulk imports or to fix drift)"""
+    match = {'status_setoran': STATUS_BELUM_DISETOR}
+    if business_ids is not None:
+        match['business_id'] = {'$in': business_ids}
+
+    pipeline = [
+        {'$match': match},
+        {'$group': {'_id': '$business_id', 'count': {'$sum': 1}, 'total': {'$sum': '$total_sisa_setoran'}}}
+    ]
+    results = {r['_id']: r async for r in db.ppob_loket_shifts.aggregate(pipeline)}
+
+    if business_ids is None:
+        business_ids = list(results.keys()) + await db.ppob_setoran_counters.distinct('business_id')
+
+    operations = [
+        UpdateOne(
+            {'business_id': business_id},
+            {'$set': {
+                'outstanding_count': results.get(business_id, {}).get('count', 0),
+                'outstanding_total': results.get(business_id, {}).get('total', 0.0),
+                'updated_at': utc_now().isoformat()
+            }},
+            upsert=True
+        )
+        for business_id in set(business_ids)
+    ]
+    if operations:
+        await db.ppob_setoran_counters.bulk_write(operations, ordered=False)
+
+
+async def get_setoran_counters(db: AsyncIOMotorDatabase, business_id: Optional[str] = None) -> List[dict]:
+    """Outstanding setoran counters, one document per business"""
+    query = {'business_id': business_id} if business_id else {}
+    return await db.ppob_setoran_counters.find(query, {'_id': 0}).to_list(length=1000)
+
+
+async def get_outstanding_setoran_queue(
+    db: AsyncIOMotorDatabase,
+    business_id: Optional[str] = None,
+    limit: int = 100
+) -> List[dict]:
+    """Oldest-first queue of shifts still owing cash (served by the partial index)"""
+    query = {'status_setoran': STATUS_BELUM_DISETOR}
+    if business_id:
+        query['business_id'] = business_id
+
+    return await db.ppob_loket_shifts.find(
+        query,
+        {'_id': 0, 'id': 1, 'business_id': 1, 'tanggal': 1, 'shift': 1, 'nama_petugas': 1,
+         'total_penjualan': 1, 'total_sisa_setoran': 1, 'created_at': 1}
+    ).sort('tanggal', 1).limit(limit).to_list(length=limit)
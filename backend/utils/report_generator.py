@@ -11,16 +11,39 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph,
 from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
 from io import BytesIO
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from xml.sax.saxutils import escape
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 import xlsxwriter
-from typing import Dict, List, Any
+from typing import AsyncIterator, Dict, List, Any, Optional, Tuple
+import asyncio
+import io
 import os
+import zipfile
+
+DEFAULT_TIMEZONE = 'Asia/Jakarta'
+
+
+def resolve_timezone(timezone_name: Optional[str]) -> ZoneInfo:
+    """Timezone for report timestamps (the 'timezone' setting); unknown names fall back to the default"""
+    try:
+        return ZoneInfo(timezone_name or DEFAULT_TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo(DEFAULT_TIMEZONE)
+
 
 class ReportGenerator:
-    """Professional report generator for GELIS system"""
+    """
+    Professional report generator for GELIS system.
+    Shared by all requests, so it holds no per-request state: the
+    timezone is passed into each generate call
+    """
     
     def __init__(self):
         self.styles = getSampleStyleSheet()
         self._setup_custom_styles()
+        self._setup_table_styles()
     
     def _setup_custom_styles(self):
         """Setup custom paragraph styles"""
@@ -54,7 +77,34 @@ class ReportGenerator:
             spaceAfter=6
         ))
     
-    def _add_header(self, elements: List, title: str, report_date: datetime):
+    def _setup_table_styles(self):
+        """Setup table styles shared by every loket shift document"""
+        self.ppob_info_style = TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f3f4f6')),
+            ('LEFTPADDING', (0, 0), (-1, -1), 10),
+        ])
+        
+        self.ppob_channel_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3b82f6')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+            ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 9),
+            ('FONTSIZE', (0, 1), (-1, -1), 8),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -2), [colors.white, colors.HexColor('#f9fafb')]),
+            ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#dbeafe')),
+            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+        ])
+        
+        self.ppob_channel_col_widths = [1.5*inch, 1.2*inch, 1.2*inch, 1.1*inch, 1.2*inch, 1.2*inch]
+    
+    def _add_header(self, elements: List, title: str, report_date: datetime, tz: ZoneInfo):
         """Add professional header to report"""
         # Company name
         company_name = Paragraph(
@@ -69,7 +119,11 @@ class ReportGenerator:
         elements.append(report_title)
         
         # Report date
-        date_str = report_date.strftime("%d %B %Y, %H:%M WIB")
+        if report_date.tzinfo:
+            report_date = report_date.astimezone(tz)
+        else:
+            report_date = report_date.replace(tzinfo=tz)
+        date_str = report_date.strftime("%d %B %Y, %H:%M %Z")
         report_date_p = Paragraph(
             f"<i>Tanggal Laporan: {date_str}</i>",
             self.styles['HeaderInfo']
@@ -77,7 +131,7 @@ class ReportGenerator:
         elements.append(report_date_p)
         elements.append(Spacer(1, 0.3 * inch))
     
-    def _add_footer(self, canvas, doc):
+    def _add_footer(self, canvas, doc, tz: ZoneInfo):
         """Add footer to each page"""
         canvas.saveState()
         canvas.setFont('Helvetica', 8)
@@ -89,13 +143,14 @@ class ReportGenerator:
         canvas.drawRightString(7.5 * inch, 0.5 * inch, text)
         
         # Generated timestamp
-        timestamp = datetime.now().strftime("%d/%m/%Y %H:%M")
+        timestamp = datetime.now(tz).strftime("%d/%m/%Y %H:%M %Z")
         canvas.drawString(1 * inch, 0.5 * inch, f"Generated: {timestamp}")
         
         canvas.restoreState()
     
-    def generate_executive_summary_pdf(self, data: Dict[str, Any]) -> BytesIO:
+    def generate_executive_summary_pdf(self, data: Dict[str, Any], timezone_name: Optional[str] = None) -> BytesIO:
         """Generate Executive Summary Report in PDF format"""
+        tz = resolve_timezone(timezone_name)
         buffer = BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=0.5*inch, bottomMargin=0.75*inch)
         elements = []
@@ -104,7 +159,8 @@ class ReportGenerator:
         self._add_header(
             elements,
             "LAPORAN RINGKASAN EKSEKUTIF",
-            data.get('report_generated_at', datetime.now())
+            data.get('report_generated_at', datetime.now()),
+            tz
         )
         
         # Period info
@@ -198,7 +254,7 @@ class ReportGenerator:
         if data.get('alerts'):
             elements.append(Paragraph("PERINGATAN & PERHATIAN", self.styles['CustomSubtitle']))
             for alert in data['alerts'][:5]:  # Max 5 alerts
-                alert_p = Paragraph(f"⚠️ {alert}", self.styles['Normal'])
+                alert_p = Paragraph(f"⚠️ {escape(str(alert))}", self.styles['Normal'])
                 elements.append(alert_p)
                 elements.append(Spacer(1, 0.1 * inch))
         
@@ -207,17 +263,19 @@ class ReportGenerator:
             elements.append(Spacer(1, 0.2 * inch))
             elements.append(Paragraph("REKOMENDASI", self.styles['CustomSubtitle']))
             for rec in data['recommendations'][:5]:  # Max 5 recommendations
-                rec_p = Paragraph(f"💡 {rec}", self.styles['Normal'])
+                rec_p = Paragraph(f"💡 {escape(str(rec))}", self.styles['Normal'])
                 elements.append(rec_p)
                 elements.append(Spacer(1, 0.1 * inch))
         
         # Build PDF
-        doc.build(elements, onFirstPage=self._add_footer, onLaterPages=self._add_footer)
+        footer = partial(self._add_footer, tz=tz)
+        doc.build(elements, onFirstPage=footer, onLaterPages=footer)
         buffer.seek(0)
         return buffer
     
-    def generate_ppob_shift_pdf(self, data: Dict[str, Any]) -> BytesIO:
+    def generate_ppob_shift_pdf(self, data: Dict[str, Any], timezone_name: Optional[str] = None) -> BytesIO:
         """Generate PPOB Shift Report in PDF format"""
+        tz = resolve_timezone(timezone_name)
         buffer = BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=0.5*inch, bottomMargin=0.75*inch)
         elements = []
@@ -226,7 +284,8 @@ class ReportGenerator:
         self._add_header(
             elements,
             "LAPORAN SHIFT PPOB",
-            data.get('created_at', datetime.now())
+            data.get('created_at', datetime.now()),
+            tz
         )
         
         # Shift Info
@@ -289,7 +348,128 @@ class ReportGenerator:
         elements.append(breakdown_table)
         
         # Build PDF
-        doc.build(elements, onFirstPage=self._add_footer, onLaterPages=self._add_footer)
+        footer = partial(self._add_footer, tz=tz)
+        doc.build(elements, onFirstPage=footer, onLaterPages=footer)
+        buffer.seek(0)
+        return buffer
+    
+    def generate_ppob_loket_shift_pdf(self, shift: Dict[str, Any], timezone_name: Optional[str] = None) -> BytesIO:
+        """Generate PPOB Loket Shift Report (per channel) in PDF format"""
+        tz = resolve_timezone(timezone_name)
+        buffer = BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=0.5*inch, bottomMargin=0.75*inch)
+        elements = []
+        
+        tanggal = _to_datetime(shift.get('tanggal'))
+        self._add_header(elements, "LAPORAN SHIFT LOKET PPOB", _to_datetime(shift.get('created_at')), tz)
+        
+        shift_info = [
+            ['Tanggal', tanggal.strftime('%d %B %Y')],
+            ['Shift', f"Shift {shift.get('shift', 1)}"],
+            ['Petugas', shift.get('nama_petugas', '-')],
+            ['Status Setoran', shift.get('status_setoran', '-')],
+        ]
+        info_table = Table(shift_info, colWidths=[2*inch, 3*inch])
+        info_table.setStyle(self.ppob_info_style)
+        elements.append(info_table)
+        elements.append(Spacer(1, 0.3 * inch))
+        
+        elements.append(Paragraph("SALDO PER CHANNEL", self.styles['CustomSubtitle']))
+        
+        channel_data = [['Channel', 'Saldo Awal', 'Penjualan', 'Inject', 'Sisa Setoran', 'Saldo Akhir']]
+        for channel in shift.get('channels', []):
+            channel_data.append([
+                channel['channel_name'],
+                f"Rp {channel.get('saldo_awal', 0):,.0f}",
+                f"Rp {channel.get('total_penjualan', 0):,.0f}",
+                f"Rp {channel.get('saldo_inject', 0):,.0f}",
+                f"Rp {channel.get('sisa_setoran', 0):,.0f}",
+                f"Rp {channel.get('saldo_akhir', 0):,.0f}",
+            ])
+        channel_data.append([
+            'TOTAL', '',
+            f"Rp {shift.get('total_penjualan', 0):,.0f}",
+            '',
+            f"Rp {shift.get('total_sisa_setoran', 0):,.0f}",
+            '',
+        ])
+        
+        channel_table = Table(channel_data, colWidths=self.ppob_channel_col_widths)
+        channel_table.setStyle(self.ppob_channel_style)
+        elements.append(channel_table)
+        
+        if shift.get('catatan'):
+            elements.append(Spacer(1, 0.2 * inch))
+            # Free text: escape so '<' / '&' can't break ReportLab markup
+            elements.append(Paragraph(f"<i>Catatan: {escape(shift['catatan'])}</i>", self.styles['HeaderInfo']))
+        
+        footer = partial(self._add_footer, tz=tz)
+        doc.build(elements, onFirstPage=footer, onLaterPages=footer)
+        buffer.seek(0)
+        return buffer
+    
+    def generate_ppob_loket_shifts_excel(self, shifts: List[Dict[str, Any]]) -> BytesIO:
+        """Generate one workbook for many loket shifts, one sheet per day"""
+        buffer = BytesIO()
+        workbook = xlsxwriter.Workbook(buffer, {'in_memory': True})
+        
+        # Formats are created once per workbook and shared by all sheets
+        header_format = workbook.add_format({
+            'bold': True,
+            'font_size': 14,
+            'bg_color': '#1e40af',
+            'font_color': 'white',
+            'align': 'center'
+        })
+        subheader_format = workbook.add_format({
+            'bold': True,
+            'bg_color': '#3b82f6',
+            'font_color': 'white'
+        })
+        money_format = workbook.add_format({'num_format': '#,##0', 'align': 'right'})
+        total_format = workbook.add_format({'bold': True, 'bg_color': '#dbeafe', 'num_format': '#,##0'})
+        
+        by_day: Dict[str, List[Dict[str, Any]]] = {}
+        for shift in shifts:
+            by_day.setdefault(_to_datetime(shift.get('tanggal')).strftime('%Y-%m-%d'), []).append(shift)
+        
+        headers = ['Channel', 'Saldo Awal', 'Penjualan', 'Inject', 'Sisa Setoran', 'Saldo Akhir']
+        for day, day_shifts in sorted(by_day.items()):
+            worksheet = workbook.add_worksheet(day)
+            worksheet.set_column('A:A', 20)
+            worksheet.set_column('B:F', 15)
+            
+            row = 0
+            worksheet.merge_range(row, 0, row, 5, f'LAPORAN SHIFT LOKET PPOB - {day}', header_format)
+            row += 2
+            
+            for shift in sorted(day_shifts, key=lambda s: s.get('shift', 0)):
+                worksheet.write(row, 0, f"Shift {shift.get('shift', 1)} - {shift.get('nama_petugas', '-')}", subheader_format)
+                worksheet.write(row, 1, shift.get('status_setoran', '-'))
+                row += 1
+                
+                for col, header in enumerate(headers):
+                    worksheet.write(row, col, header, subheader_format)
+                row += 1
+                
+                for channel in shift.get('channels', []):
+                    worksheet.write(row, 0, channel['channel_name'])
+                    worksheet.write(row, 1, channel.get('saldo_awal', 0), money_format)
+                    worksheet.write(row, 2, channel.get('total_penjualan', 0), money_format)
+                    worksheet.write(row, 3, channel.get('saldo_inject', 0), money_format)
+                    worksheet.write(row, 4, channel.get('sisa_setoran', 0), money_format)
+                    worksheet.write(row, 5, channel.get('saldo_akhir', 0), money_format)
+                    row += 1
+                
+                worksheet.write(row, 0, 'TOTAL', total_format)
+                worksheet.write(row, 2, shift.get('total_penjualan', 0), total_format)
+                worksheet.write(row, 4, shift.get('total_sisa_setoran', 0), total_format)
+                row += 2
+        
+        if not by_day:
+            workbook.add_worksheet('Kosong')
+        
+        workbook.close()
         buffer.seek(0)
         return buffer
     
@@ -451,5 +631,104 @@ class ReportGenerator:
         return buffer
 
 
-# Create singleton instance
+def _to_datetime(value) -> datetime:
+    """Stored dates are ISO strings; the generators expect datetime"""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return datetime.now()
+
+
+def ppob_loket_shift_filename(shift: Dict[str, Any]) -> str:
+    """Archive entry name: <tanggal>_shift<n>_<petugas>.pdf"""
+    petugas = ''.join(c if c.isalnum() else '_' for c in shift.get('nama_petugas', 'petugas'))
+    return f"{_to_datetime(shift.get('tanggal')).strftime('%Y%m%d')}_shift{shift.get('shift', 1)}_{petugas}_{shift['id'][-8:]}.pdf"
+
+
+# Create singleton instance (one per process, so worker processes reuse styles)
 report_generator = ReportGenerator()
+
+
+# ============= BATCH RENDERING (worker processes) =============
+
+REPORT_WORKERS = int(os.environ.get('REPORT_WORKERS', os.cpu_count() or 2))
+
+_report_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_report_executor() -> ProcessPoolExecutor:
+    """Shared process pool for CPU-bound PDF/Excel rendering"""
+    global _report_executor
+    if _report_executor is None:
+        _report_executor = ProcessPoolExecutor(max_workers=REPORT_WORKERS)
+    return _report_executor
+
+
+def shutdown_report_executor():
+    global _report_executor
+    if _report_executor is not None:
+        _report_executor.shutdown(wait=False, cancel_futures=True)
+        _report_executor = None
+
+
+def render_ppob_loket_shift_pdfs(shifts: List[Dict[str, Any]], timezone_name: Optional[str] = None) -> List[Tuple[str, bytes]]:
+    """Render a chunk of loket shifts to (filename, pdf bytes); runs in a worker process"""
+    return [
+        (ppob_loket_shift_filename(shift), report_generator.generate_ppob_loket_shift_pdf(shift, timezone_name).getvalue())
+        for shift in shifts
+    ]
+
+
+class _ZipSink(io.RawIOBase):
+    """Unseekable sink for ZipFile; drain() hands out what was written so far"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._buffer.extend(data)
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+async def stream_ppob_loket_shift_zip(
+    shifts: List[Dict[str, Any]],
+    chunk_size: int,
+    timezone_name: Optional[str] = None,
+    executor: Optional[ProcessPoolExecutor] = None
+) -> AsyncIterator[bytes]:
+    """
+    ZIP of one PDF per shift, produced incrementally: chunks render in
+    worker processes and each finished chunk is written to the archive
+    and yielded, so only in-flight chunks are held in memory
+    """
+    loop = asyncio.get_running_loop()
+    executor = executor or get_report_executor()
+    futures = [
+        loop.run_in_executor(executor, render_ppob_loket_shift_pdfs, shifts[i:i + chunk_size], timezone_name)
+        for i in range(0, len(shifts), chunk_size)
+    ]
+    sink = _ZipSink()
+    try:
+        with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for future in asyncio.as_completed(futures):
+                for filename, content in await future:
+                    archive.writestr(filename, content)
+                yield sink.drain()
+        yield sink.drain()  # Central directory
+    finally:
+        for future in futures:
+            future.cancel()  # Client went away: drop chunks not started yet
+
+
+def render_ppob_loket_shifts_excel(shifts: List[Dict[str, Any]]) -> bytes:
+    """Render the combined loket shift workbook; runs in a worker process"""
+    return report_generator.generate_ppob_loket_shifts_excel(shifts).getvalue()
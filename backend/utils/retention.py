@@ -0,0 +1,139 @@
+"""
+Activity Log Retention
+Enforces the data_retention_days setting: expired activity logs are moved
+in batches into monthly archive collections (activity_logs_archive_YYYY_MM,
+zstd block compression) and removed from the hot collection
+"""
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Optional, Set
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import BulkWriteError, CollectionInvalid, OperationFailure
+
+from utils.helpers import utc_now
+from utils.settings_service import settings_service
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETENTION_DAYS = 365
+PURGE_BATCH_SIZE = 1000
+PURGE_INTERVAL_SECONDS = 6 * 60 * 60
+ARCHIVE_PREFIX = 'activity_logs_archive_'
+
+DUPLICATE_KEY_ERROR = 11000
+
+_archive_collections: Set[str] = set()
+
+
+async def get_retention_days() -> int:
+    days = await settings_service.get_int('data_retention_days', DEFAULT_RETENTION_DAYS)
+    return max(days, 1)
+
+
+def archive_collection_name(created_at: str) -> str:
+    """'2025-03-14T...' -> activity_logs_archive_2025_03"""
+    return f"{ARCHIVE_PREFIX}{created_at[:4]}_{created_at[5:7]}"
+
+
+async def _ensure_archive_collection(db: AsyncIOMotorDatabase, name: str) -> None:
+    """Create a monthly archive with zstd block compression (falls back to the server default)"""
+    if name in _archive_collections:
+        return
+    try:
+        await db.create_collection(
+            name,
+            storageEngine={'wiredTiger': {'configString': 'block_compressor=zstd'}}
+        )
+    except CollectionInvalid:
+        pass  # Already exists
+    except OperationFailure as e:
+        logger.warning(f'zstd archive collection not available ({str(e)}), using default compression')
+        try:
+            await db.create_collection(name)
+        except CollectionInvalid:
+            pass
+    await db[name].create_index('id', unique=True)
+    _archive_collections.add(name)
+
+
+async def _archive_batch(db: AsyncIOMotorDatabase, docs: list) -> None:
+    by_month = {}
+    for doc in docs:
+        by_month.setdefault(archive_collection_name(doc.get('created_at') or '0000-00'), []).append(doc)
+
+    for name, month_docs in by_month.items():
+        await _ensure_archive_collection(db, name)
+        try:
+            await db[name].insert_many(month_docs, ordered=False)
+        except BulkWriteError as e:
+            # Re-running after an interrupted purge: already archived rows are fine
+            if any(err.get('code') != DUPLICATE_KEY_ERROR for err in e.details.get('writeErrors', [])):
+                raise
+
+
+async def purge_activity_logs(
+    db: AsyncIOMotorDatabase,
+    retention_days: Optional[int] = None,
+    archive: bool = True,
+    dry_run: bool = False,
+    batch_size: int = PURGE_BATCH_SIZE
+) -> dict:
+    """
+    Move activity logs older than the retention window out of the hot collection.
+    Works in batches (oldest first) so it never holds a large result set;
+    safe to re-run or to run from several workers.
+    """
+    if retention_days is None:
+        retention_days = await get_retention_days()
+    cutoff = (utc_now() - timedelta(days=retention_days)).isoformat()
+    query = {'created_at': {'$lt': cutoff}}
+
+    if dry_run:
+        return {
+            'retention_days': retention_days,
+            'cutoff': cutoff,
+            'eligible': await db.activity_logs.count_documents(query),
+            'dry_run': True
+        }
+
+    purged = 0
+    archives = set()
+    while True:
+        docs = await db.activity_logs.find(query).sort('created_at', 1).limit(batch_size).to_list(batch_size)
+        if not docs:
+            break
+
+        if archive:
+            await _archive_batch(db, docs)
+            archives.update(archive_collection_name(doc.get('created_at') or '0000-00') for doc in docs)
+
+        result = await db.activity_logs.delete_many({'_id': {'$in': [doc['_id'] for doc in docs]}})
+        purged += result.deleted_count
+
+        if len(docs) < batch_size:
+            break
+        await asyncio.sleep(0)  # Let request handlers run between batches
+
+    return {
+        'retention_days': retention_days,
+        'cutoff': cutoff,
+        'purged': purged,
+        'archived_to': sorted(archives),
+        'dry_run': False
+    }
+
+
+async def run_retention_loop(db: AsyncIOMotorDatabase, interval: float = PURGE_INTERVAL_SECONDS) -> None:
+    """Periodic purge task (started on app startup)"""
+    while True:
+        try:
+            summary = await purge_activity_logs(db)
+            if summary['purged']:
+                logger.info(f"Activity log retention: purged {summary['purged']} entries older than {summary['cutoff']}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f'Activity log retention failed: {str(e)}')
+        await asyncio.sleep(interval)
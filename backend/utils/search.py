@@ -0,0 +1,113 @@
+"""
+Order Search Utilities
+Orders carry a maintained prefix-token field (search_tokens) built from
+customer name, phone, email and order number, so as-you-type lookups are
+a multikey index match instead of a regex scan
+"""
+import re
+from typing import List, Optional
+
+from fastapi import HTTPException
+
+MIN_TOKEN_LENGTH = 2
+MAX_TOKEN_LENGTH = 20
+MAX_SEARCH_TERMS = 5
+# Newest matches scored per query; keeps the score sort small and bounded
+MAX_SEARCH_CANDIDATES = 1000
+
+# Order fields the search tokens are built from
+SEARCH_SOURCE_FIELDS = ('customer_name', 'customer_phone', 'customer_email', 'order_number')
+
+# Internal fields, never returned to clients
+SEARCH_FIELDS_EXCLUDED = {'_id': 0, 'search_tokens': 0, 'search_words': 0}
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+
+def _words(text: Optional[str]) -> List[str]:
+    return _WORD_RE.findall((text or '').lower())
+
+
+def _phone_words(phone: Optional[str]) -> List[str]:
+    """Digits-only phone plus its 0.../62... twin so both spellings match"""
+    digits = ''.join(c for c in (phone or '') if c.isdigit())
+    if not digits:
+        return []
+    if digits.startswith('62'):
+        return [digits, '0' + digits[2:]]
+    if digits.startswith('0'):
+        return [digits, '62' + digits[1:]]
+    return [digits]
+
+
+def _order_number_words(order_number: Optional[str]) -> List[str]:
+    """ORD20250101... is searchable with or without its prefix"""
+    words = _words(order_number)
+    if order_number:
+        digits = ''.join(c for c in order_number if c.isdigit())
+        if digits:
+            words.append(digits)
+    return words
+
+
+def build_order_search_fields(order: dict) -> dict:
+    """Build search_words (whole words, for ranking) and search_tokens (prefixes, for matching)"""
+    words = set(_words(order.get('customer_name')))
+    words.update(_words(order.get('customer_email')))
+    words.update(_phone_words(order.get('customer_phone')))
+    words.update(_order_number_words(order.get('order_number')))
+
+    tokens = set()
+    for word in words:
+        word = word[:MAX_TOKEN_LENGTH]
+        for end in range(MIN_TOKEN_LENGTH, len(word) + 1):
+            tokens.add(word[:end])
+
+    return {
+        'search_words': sorted(w[:MAX_TOKEN_LENGTH] for w in words),
+        'search_tokens': sorted(tokens)
+    }
+
+
+def search_fields_for_update(order: dict, update: dict) -> dict:
+    """Fresh search fields when an update touches a source field, else {}"""
+    if not any(field in update for field in SEARCH_SOURCE_FIELDS):
+        return {}
+    return build_order_search_fields({**order, **update})
+
+
+def parse_search_terms(q: str) -> List[str]:
+    """Normalize a query the same way tokens are built"""
+    # A phone number typed with separators ("+62 812-3456") is one term
+    compact = re.sub(r'[\s+\-().]', '', q or '')
+    words = [compact] if compact.isdigit() else _words(q)
+
+    terms = []
+    for term in words:
+        term = term[:MAX_TOKEN_LENGTH]
+        if len(term) >= MIN_TOKEN_LENGTH and term not in terms:
+            terms.append(term)
+
+    if not terms:
+        raise HTTPException(status_code=400, detail=f'Kata kunci minimal {MIN_TOKEN_LENGTH} karakter')
+    return terms[:MAX_SEARCH_TERMS]
+
+
+def build_order_search_pipeline(terms: List[str], filters: dict, skip: int, limit: int) -> List[dict]:
+    """
+    Every term must prefix-match; results rank by how many terms are whole
+    words (exact name/phone/number hits first), then newest first.
+    Only the newest MAX_SEARCH_CANDIDATES matches (read in index order from
+    (search_tokens, created_at)) are scored, so a short common prefix never
+    turns into a blocking in-memory sort of every match.
+    """
+    return [
+        {'$match': {**filters, 'search_tokens': {'$all': terms}}},
+        {'$sort': {'created_at': -1}},
+        {'$limit': MAX_SEARCH_CANDIDATES},
+        {'$addFields': {'search_score': {'$size': {'$setIntersection': ['$search_words', {'$literal': terms}]}}}},
+        {'$sort': {'search_score': -1, 'created_at': -1}},
+        {'$skip': skip},
+        {'$limit': limit},
+        {'$project': SEARCH_FIELDS_EXCLUDED}
+    ]
@@ -0,0 +1,69 @@
+"""
+Sequence Allocator
+Collision-free document codes (ORD/TXN/JE/...) of the form
+<PREFIX><YYYYMMDD><6-digit sequence>. Each worker leases a block of
+numbers from the `counters` collection with one atomic $inc and hands
+them out locally, so most codes cost no round-trip
+"""
+import asyncio
+from typing import Dict, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+
+from utils.helpers import utc_now
+
+DEFAULT_BLOCK_SIZE = 50
+SEQUENCE_DIGITS = 6
+
+
+class SequenceAllocator:
+    def __init__(self, block_size: int = DEFAULT_BLOCK_SIZE):
+        self.block_size = block_size
+        self.db: Optional[AsyncIOMotorDatabase] = None
+        self._blocks: Dict[str, Tuple[int, int]] = {}  # name -> (next, last)
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def bind(self, db: AsyncIOMotorDatabase) -> None:
+        self.db = db
+
+    async def _lease_block(self, name: str) -> Tuple[int, int]:
+        counter = await self.db.counters.find_one_and_update(
+            {'_id': name},
+            {'$inc': {'value': self.block_size}, '$set': {'updated_at': utc_now().isoformat()}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        last = counter['value']
+        return last - self.block_size + 1, last
+
+    async def next_value(self, name: str) -> int:
+        """Next number of a named sequence (unique across workers, increasing per worker)"""
+        lock = self._locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            next_value, last = self._blocks.get(name, (1, 0))
+            if next_value > last:
+                next_value, last = await self._lease_block(name)
+            self._blocks[name] = (next_value + 1, last)
+            return next_value
+
+    def _evict_past_days(self, prefix: str, day: str) -> None:
+        """Drop leased blocks of earlier days; their sequences are never used again"""
+        stale = [
+            name for name, lock in self._locks.items()
+            if name.startswith(f'{prefix}-') and name != f'{prefix}-{day}' and not lock.locked()
+        ]
+        for name in stale:
+            self._blocks.pop(name, None)
+            del self._locks[name]
+
+    async def next_code(self, prefix: str) -> str:
+        """e.g. ORD20250115000042; the sequence restarts every (UTC) day"""
+        day = utc_now().strftime('%Y%m%d')
+        self._evict_past_days(prefix, day)
+        value = await self.next_value(f'{prefix}-{day}')
+        return f'{prefix}{day}{value:0{SEQUENCE_DIGITS}d}'
+
+
+# Create singleton instance
+sequence_allocator = SequenceAllocator()
@@ -0,0 +1,158 @@
+"""
+Settings Service
+All settings are loaded once into memory and served from there. Every
+write bumps a version stamp (counters/_id='settings_version'); readers
+compare it at most every few seconds and reload only when it moved, so
+all workers converge without a query per lookup
+"""
+import asyncio
+import time
+from typing import Any, Dict, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from utils.auth import ACCESS_TOKEN_EXPIRE_MINUTES
+from utils.helpers import utc_now
+
+VERSION_ID = 'settings_version'
+CHECK_INTERVAL_SECONDS = 5
+
+SETTINGS_DEFAULTS = {
+    'company_name': 'PT. GELIS Indonesia',
+    'company_address': 'Jl. Contoh No. 123, Jakarta Selatan',
+    'company_phone': '021-12345678',
+    'company_email': 'info@gelis.com',
+    'company_website': 'https://gelis.com',
+    'timezone': 'Asia/Jakarta',
+    'language': 'id',
+    'currency': 'IDR',
+    'date_format': 'DD/MM/YYYY',
+    'time_format': '24h',
+    'email_notifications': True,
+    'whatsapp_notifications': False,
+    'push_notifications': True,
+    'is_mock_data': True,
+    'data_retention_days': 365,
+    'auto_backup': False,
+    'backup_frequency': 'daily',
+    'session_timeout': ACCESS_TOKEN_EXPIRE_MINUTES,  # env default until a setting is stored
+    'password_expiry_days': 90,
+    'max_login_attempts': 5,
+    'two_factor_auth': False,
+}
+
+
+class SettingsService:
+    def __init__(self, check_interval: float = CHECK_INTERVAL_SECONDS):
+        self.check_interval = check_interval
+        self.db: Optional[AsyncIOMotorDatabase] = None
+        self._docs: Dict[str, dict] = {}
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+        self.reloads = 0
+
+    def bind(self, db: AsyncIOMotorDatabase) -> None:
+        self.db = db
+        self._version = None
+        self._checked_at = 0.0
+
+    async def _current_version(self) -> int:
+        doc = await self.db.counters.find_one({'_id': VERSION_ID})
+        return doc['value'] if doc else 0
+
+    async def _ensure_fresh(self) -> None:
+        if self._version is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return
+        async with self._lock:
+            if self._version is not None and time.monotonic() - self._checked_at < self.check_interval:
+                return
+            # Version first: a write racing the reload is picked up on the next check
+            version = await self._current_version()
+            if version != self._version:
+                docs = await self.db.settings.find({}, {'_id': 0}).to_list(length=None)
+                self._docs = {doc['setting_key']: doc for doc in docs}
+                self._version = version
+                self.reloads += 1
+            self._checked_at = time.monotonic()
+
+    async def get_document(self, key: str) -> Optional[dict]:
+        """Stored setting document (setting_key, setting_value, updated_by, ...)"""
+        await self._ensure_fresh()
+        doc = self._docs.get(key)
+        return dict(doc) if doc else None
+
+    async def get(self, key: str, default: Any = None) -> Any:
+        await self._ensure_fresh()
+        if key in self._docs:
+            return self._docs[key].get('setting_value')
+        return SETTINGS_DEFAULTS.get(key, default)
+
+    async def get_int(self, key: str, default: int = 0) -> int:
+        try:
+            return int(await self.get(key, default))
+        except (TypeError, ValueError):
+            return SETTINGS_DEFAULTS.get(key, default)
+
+    async def get_bool(self, key: str, default: bool = False) -> bool:
+        value = await self.get(key, default)
+        if isinstance(value, str):
+            return value.strip().lower() in ('1', 'true', 'yes', 'on')
+        return bool(value)
+
+    async def get_str(self, key: str, default: str = '') -> str:
+        value = await self.get(key, default)
+        return default if value is None else str(value)
+
+    async def get_timezone(self) -> str:
+        """IANA timezone name for report/display timestamps"""
+        name = await self.get_str('timezone', SETTINGS_DEFAULTS['timezone'])
+        try:
+            ZoneInfo(name)
+        except (ZoneInfoNotFoundError, ValueError):
+            return SETTINGS_DEFAULTS['timezone']
+        return name
+
+    async def get_session_timeout(self) -> int:
+        """Access token lifetime in minutes (stored setting, else ACCESS_TOKEN_EXPIRE_MINUTES)"""
+        return max(await self.get_int('session_timeout', SETTINGS_DEFAULTS['session_timeout']), 1)
+
+    async def all(self) -> dict:
+        """Stored values merged over SETTINGS_DEFAULTS"""
+        await self._ensure_fresh()
+        values = dict(SETTINGS_DEFAULTS)
+        values.update({key: doc.get('setting_value') for key, doc in self._docs.items()})
+        return values
+
+    async def set_many(self, values: Dict[str, Any], updated_by: Optional[str] = None) -> int:
+        """One bulk_write for all keys, then bump the version stamp"""
+        if not values:
+            return 0
+        now = utc_now().isoformat()
+        fields = {'updated_at': now}
+        if updated_by:
+            fields['updated_by'] = updated_by
+
+        result = await self.db.settings.bulk_write([
+            UpdateOne({'setting_key': key}, {'$set': {'setting_value': value, **fields}}, upsert=True)
+            for key, value in values.items()
+        ], ordered=False)
+        await self.db.counters.update_one(
+            {'_id': VERSION_ID},
+            {'$inc': {'value': 1}, '$set': {'updated_at': now}},
+            upsert=True
+        )
+        self._checked_at = 0.0  # This worker reloads on its next read
+        return result.modified_count + result.upserted_count
+
+    async def set(self, key: str, value: Any, updated_by: Optional[str] = None) -> None:
+        await self.set_many({key: value}, updated_by)
+
+    def stats(self) -> dict:
+        return {'version': self._version, 'keys': len(self._docs), 'reloads': self.reloads}
+
+
+# Create singleton instance
+settings_service = SettingsService()
@@ -0,0 +1,128 @@
+"""
+Technical Progress Utilities
+Per-step atomic updates, server-side overall progress and the compact
+progress summary denormalised onto orders for list views
+"""
+from typing import Dict, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+
+from utils.helpers import utc_now
+
+
+def calculate_overall_progress(steps: List[dict]) -> float:
+    """Weighted progress: completed steps count fully, in-progress steps count half"""
+    overall_progress = 0.0
+    for step in steps or []:
+        weight = step.get('step_weight', 0)
+        if step.get('status') == 'completed':
+            overall_progress += weight
+        elif step.get('status') == 'in_progress':
+            overall_progress += weight * 0.5
+    return overall_progress
+
+
+# Same formula as calculate_overall_progress, evaluated inside an update pipeline
+OVERALL_PROGRESS_EXPR = {'$sum': {'$map': {
+    'input': {'$ifNull': ['$steps', []]},
+    'as': 'step',
+    'in': {'$switch': {
+        'branches': [
+            {'case': {'$eq': ['$$step.status', 'completed']},
+             'then': {'$ifNull': ['$$step.step_weight', 0]}},
+            {'case': {'$eq': ['$$step.status', 'in_progress']},
+             'then': {'$multiply': [{'$ifNull': ['$$step.step_weight', 0]}, 0.5]}},
+        ],
+        'default': 0
+    }}
+}}}
+
+SUMMARY_PROJECTION = {
+    '_id': 0, 'id': 1, 'order_id': 1, 'overall_progress': 1, 'updated_at': 1, 'version': 1,
+    'steps.step_name': 1, 'steps.status': 1, 'steps.step_weight': 1
+}
+
+
+def build_progress_summary(progress: dict) -> dict:
+    """Compact progress stored on the order (no notes/photos)"""
+    steps = progress.get('steps') or []
+
+    return {
+        'id': progress.get('id'),
+        'overall_progress': calculate_overall_progress(steps),
+        'steps': [
+            {'step_name': s.get('step_name'), 'status': s.get('status'), 'step_weight': s.get('step_weight', 0)}
+            for s in steps
+        ],
+        'updated_at': progress.get('updated_at'),
+        'version': progress.get('version', 0)
+    }
+
+
+def newer_summary_filter(order_id: str, summary: dict) -> dict:
+    """
+    Order filter that only matches while the stored summary is older, so a
+    summary computed before a concurrent step update can't overwrite the newer one
+    """
+    return {'id': order_id, '$or': [
+        {'technical_progress.version': {'$lt': summary['version']}},
+        {'technical_progress.version': {'$exists': False}}
+    ]}
+
+
+async def update_progress_step(
+    db: AsyncIOMotorDatabase,
+    order_id: str,
+    step_name: str,
+    new_status: str,
+    notes: Optional[str] = None,
+    photos: Optional[List[str]] = None
+) -> Optional[dict]:
+    """
+    Update a single step in place with arrayFilters, then recompute
+    overall_progress server-side. Concurrent updates to different steps
+    never overwrite each other. Returns the compact progress or None if
+    the step does not exist. Every step update bumps `version`, which orders
+    the denormalised summaries (see newer_summary_filter).
+    """
+    now = utc_now().isoformat()
+    set_fields = {'steps.$[s].status': new_status, 'updated_at': now}
+    array_filters = [{'s.step_name': step_name}]
+
+    if notes:
+        set_fields['steps.$[s].notes'] = notes
+    if photos:
+        set_fields['steps.$[s].photos'] = photos
+    if new_status == 'in_progress':
+        # Only the first start is recorded
+        set_fields['steps.$[t].started_at'] = now
+        array_filters.append({'t.step_name': step_name, 't.started_at': None})
+    elif new_status == 'completed':
+        set_fields['steps.$[s].completed_at'] = now
+
+    result = await db.technical_progress.update_one(
+        {'order_id': order_id, 'steps.step_name': step_name},
+        {'$set': set_fields, '$inc': {'version': 1}},
+        array_filters=array_filters
+    )
+    if result.matched_count == 0:
+        return None
+
+    return await db.technical_progress.find_one_and_update(
+        {'order_id': order_id},
+        [{'$set': {'overall_progress': OVERALL_PROGRESS_EXPR}}],
+        projection=SUMMARY_PROJECTION,
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def get_progress_by_order_ids(db: AsyncIOMotorDatabase, order_ids: List[str]) -> Dict[str, dict]:
+    """Load progress summaries for many orders in one $in query, keyed by order_id"""
+    if not order_ids:
+        return {}
+
+    progress_map = {}
+    async for progress in db.technical_progress.find({'order_id': {'$in': order_ids}}, SUMMARY_PROJECTION):
+        progress_map[progress['order_id']] = build_progress_summary(progress)
+    return progress_map
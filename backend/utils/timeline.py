@@ -0,0 +1,67 @@
+"""
+Entity Audit Timeline
+Merges everything recorded about one entity (related_type, related_id) —
+activity logs, notifications and, for orders, order events — into one
+newest-first stream paginated by a shared (time, id) keyset cursor
+"""
+import heapq
+from typing import List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from utils.pagination import MAX_PAGE_SIZE, encode_cursor, keyset_query, keyset_sort
+
+
+def _timeline_sources(related_type: str, related_id: str) -> list:
+    """(source name, collection, query, time field) per source"""
+    sources = [
+        ('activity_log', 'activity_logs', {'related_type': related_type, 'related_id': related_id}, 'created_at'),
+        ('notification', 'notifications', {'related_type': related_type, 'related_id': related_id}, 'created_at'),
+    ]
+    if related_type == 'order':
+        sources.append(('order_event', 'order_events', {'order_id': related_id}, 'ts'))
+    return sources
+
+
+def _to_timeline_item(source: str, doc: dict, time_field: str) -> dict:
+    return {
+        'source': source,
+        'id': doc['id'],
+        'created_at': doc.get(time_field),
+        'type': doc.get('action') or doc.get('type'),
+        'description': doc.get('description') or doc.get('message') or doc.get('title'),
+        'user_id': doc.get('user_id') or (doc.get('actor') or {}).get('id'),
+        'data': doc
+    }
+
+
+async def get_entity_timeline(
+    db: AsyncIOMotorDatabase,
+    related_type: str,
+    related_id: str,
+    after: Optional[str] = None,
+    limit: int = 50
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    Each source is read with the same keyset predicate and limit+1 rows
+    (one index range scan each); the sorted streams are then merged
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    streams = []
+    for source, collection, query, time_field in _timeline_sources(related_type, related_id):
+        docs = await db[collection].find(
+            keyset_query(query, after, time_field), {'_id': 0}
+        ).sort(keyset_sort(time_field)).limit(limit + 1).to_list(limit + 1)
+        streams.append([_to_timeline_item(source, doc, time_field) for doc in docs])
+
+    merged = list(heapq.merge(
+        *streams,
+        key=lambda item: (item['created_at'] or '', item['id']),
+        reverse=True
+    ))
+
+    if len(merged) > limit:
+        items = merged[:limit]
+        return items, encode_cursor(items[-1])
+    return merged, None
@@ -0,0 +1,53 @@
+"""
+Multi-document Write Helper
+Commit related writes (e.g. an order and its payment transaction) together
+in one MongoDB transaction; on deployments without transactions
+(standalone mongod) the writes are issued concurrently instead
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorClientSession
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+SessionWrite = Callable[[Optional[AsyncIOMotorClientSession]], Awaitable]
+
+# IllegalOperation: "Transaction numbers are only allowed on a replica set member or mongos"
+TRANSACTIONS_UNSUPPORTED_CODE = 20
+
+_transactions_supported: Optional[bool] = None
+
+
+async def commit_together(client: AsyncIOMotorClient, writes: List[SessionWrite]) -> None:
+    """
+    Run writes atomically. Each write is a callable taking the session
+    (or None in fallback mode), e.g. lambda s: db.orders.insert_one(doc, session=s).
+    with_transaction retries TransientTransactionError and
+    UnknownTransactionCommitResult, so a write may run more than once.
+    """
+    global _transactions_supported
+
+    if len(writes) == 1:
+        await writes[0](None)
+        return
+
+    async def run_writes(session: AsyncIOMotorClientSession) -> None:
+        for write in writes:
+            await write(session)
+
+    if _transactions_supported is not False:
+        try:
+            async with await client.start_session() as session:
+                await session.with_transaction(run_writes)
+            _transactions_supported = True
+            return
+        except OperationFailure as e:
+            if e.code != TRANSACTIONS_UNSUPPORTED_CODE:
+                raise
+            _transactions_supported = False
+            logger.warning('MongoDB transactions not supported here, falling back to concurrent writes')
+
+    await asyncio.gather(*(write(None) for write in writes))
@@ -0,0 +1,10 @@
+"""
+Shared pytest setup for the backend unit tests: make `backend/` importable
+the same way server.py sees it (utils.*, models)
+"""
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent / 'backend'
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
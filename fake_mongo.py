@@ -0,0 +1,770 @@
+"""
+In-memory stand-in for the Motor API used by the backend unit tests.
+Covers the query/update/aggregation subset the utils modules issue:
+filters ($and/$or/$in/$nin/$gt.../$exists/$all), update operators and
+update pipelines ($set/$replaceRoot with expressions), upserts, unique
+indexes, bulk_write, aggregate ($match/$group/$facet/$sort/...) and
+sessions with transaction rollback. Anything else raises
+NotImplementedError so a test never passes on silently ignored syntax.
+"""
+import asyncio
+import copy
+import functools
+import itertools
+from datetime import datetime
+from types import SimpleNamespace
+
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+
+MISSING = object()
+_ids = itertools.count(1)
+
+
+# Values and comparison
+
+def _rank(value):
+    if value is MISSING or value is None:
+        return 1
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, str):
+        return 3
+    if isinstance(value, dict):
+        return 4
+    if isinstance(value, list):
+        return 5
+    if isinstance(value, datetime):
+        return 9
+    return 10
+
+
+def compare(a, b) -> int:
+    ra, rb = _rank(a), _rank(b)
+    if ra != rb:
+        return -1 if ra < rb else 1
+    if ra == 1:
+        return 0
+    if ra == 4:
+        a, b = list(a.items()), list(b.items())
+    return (a > b) - (a < b)
+
+
+def get_path(doc, path: str):
+    value = doc
+    for part in path.split('.'):
+        if isinstance(value, dict):
+            value = value.get(part, MISSING)
+        elif isinstance(value, list) and part.isdigit():
+            value = value[int(part)] if int(part) < len(value) else MISSING
+        elif isinstance(value, list):
+            # Field of every element, like a multikey path
+            values = [get_path(item, part) for item in value if isinstance(item, dict)]
+            value = [v for v in values if v is not MISSING] or MISSING
+        else:
+            return MISSING
+    return value
+
+
+def set_path(doc, path: str, value) -> None:
+    if '$' in path:
+        raise NotImplementedError(f'positional update path {path}')
+    *parents, last = path.split('.')
+    for part in parents:
+        doc = doc.setdefault(part, {})
+    doc[last] = value
+
+
+def unset_path(doc, path: str) -> None:
+    *parents, last = path.split('.')
+    for part in parents:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(last, None)
+
+
+# Query matching
+
+def _candidates(value):
+    """A field matches if the value or (for arrays) any element matches"""
+    if isinstance(value, list):
+        return [value] + value
+    return [value]
+
+
+def _match_operator(value, op, arg) -> bool:
+    if op == '$eq':
+        return any(compare(v, arg) == 0 for v in _candidates(value)) if value is not MISSING else arg is None
+    if op == '$ne':
+        return not _match_operator(value, '$eq', arg)
+    if op in ('$gt', '$gte', '$lt', '$lte'):
+        for v in _candidates(value):
+            if v is MISSING or _rank(v) != _rank(arg):
+                continue
+            c = compare(v, arg)
+            if {'$gt': c > 0, '$gte': c >= 0, '$lt': c < 0, '$lte': c <= 0}[op]:
+                return True
+        return False
+    if op == '$in':
+        return any(_match_operator(value, '$eq', item) for item in arg)
+    if op == '$nin':
+        return not _match_operator(value, '$in', arg)
+    if op == '$exists':
+        return (value is not MISSING) == bool(arg)
+    if op == '$all':
+        return all(_match_operator(value, '$eq', item) for item in arg)
+    if op == '$type':
+        types = {'string': str, 'number': (int, float), 'object': dict, 'array': list, 'bool': bool}
+        return value is not MISSING and isinstance(value, types[arg])
+    if op == '$not':
+        return not _match_condition(value, arg)
+    raise NotImplementedError(f'query operator {op}')
+
+
+def _match_condition(value, condition) -> bool:
+    if isinstance(condition, dict) and condition and all(k.startswith('$') for k in condition):
+        return all(_match_operator(value, op, arg) for op, arg in condition.items())
+    return _match_operator(value, '$eq', condition)
+
+
+def matches(doc, query) -> bool:
+    for key, condition in (query or {}).items():
+        if key == '$and':
+            if not all(matches(doc, q) for q in condition):
+                return False
+        elif key == '$or':
+            if not any(matches(doc, q) for q in condition):
+                return False
+        elif key == '$nor':
+            if any(matches(doc, q) for q in condition):
+                return False
+        elif key.startswith('$'):
+            raise NotImplementedError(f'query operator {key}')
+        elif not _match_condition(get_path(doc, key), condition):
+            return False
+    return True
+
+
+# Projection
+
+def _include(source, paths):
+    result = {}
+    for head, rest in paths.items():
+        if head not in source:
+            continue
+        value = source[head]
+        if not rest:
+            result[head] = copy.deepcopy(value)
+        elif isinstance(value, dict):
+            result[head] = _include(value, rest)
+        elif isinstance(value, list):
+            result[head] = [_include(item, rest) for item in value if isinstance(item, dict)]
+    return result
+
+
+def project(doc, projection):
+    if not projection:
+        return copy.deepcopy(doc)
+    fields = {k: v for k, v in projection.items() if k != '_id'}
+    if any(fields.values()):
+        tree = {}
+        for path in (k for k, v in fields.items() if v):
+            node = tree
+            for part in path.split('.'):
+                node = node.setdefault(part, {})
+        result = _include(doc, tree)
+        if projection.get('_id', 1) and '_id' in doc:
+            result['_id'] = doc['_id']
+        return result
+    result = copy.deepcopy(doc)
+    for path, include in projection.items():
+        if not include:
+            unset_path(result, path)
+    return result
+
+
+# Aggregation expressions
+
+def evaluate(expr, root, variables=None):
+    variables = {'ROOT': root, 'CURRENT': root, **(variables or {})}
+    if isinstance(expr, str) and expr.startswith('$$'):
+        name, _, path = expr[2:].partition('.')
+        value = variables[name]
+        value = get_path(value, path) if path else value
+        return None if value is MISSING else value
+    if isinstance(expr, str) and expr.startswith('$'):
+        value = get_path(root, expr[1:])
+        return None if value is MISSING else value
+    if isinstance(expr, list):
+        return [evaluate(item, root, variables) for item in expr]
+    if not isinstance(expr, dict):
+        return expr
+    if not any(k.startswith('$') for k in expr):
+        return {k: evaluate(v, root, variables) for k, v in expr.items()}
+
+    (op, arg), = expr.items()
+    ev = functools.partial(evaluate, root=root, variables=variables)
+    args = arg if isinstance(arg, list) else [arg]
+    if op == '$literal':
+        return copy.deepcopy(arg)
+    if op == '$cond':
+        if isinstance(arg, dict):
+            arg = [arg['if'], arg['then'], arg['else']]
+        return ev(arg[1]) if ev(arg[0]) else ev(arg[2])
+    if op == '$ifNull':
+        value = ev(arg[0])
+        return ev(arg[1]) if value is None else value
+    if op == '$switch':
+        for branch in arg['branches']:
+            if ev(branch['case']):
+                return ev(branch['then'])
+        return ev(arg['default'])
+    if op == '$and':
+        return all(ev(a) for a in args)
+    if op == '$or':
+        return any(ev(a) for a in args)
+    if op == '$not':
+        return not ev(args[0])
+    if op in ('$eq', '$ne', '$gt', '$gte', '$lt', '$lte'):
+        c = compare(ev(arg[0]), ev(arg[1]))
+        return {'$eq': c == 0, '$ne': c != 0, '$gt': c > 0, '$gte': c >= 0, '$lt': c < 0, '$lte': c <= 0}[op]
+    if op == '$in':
+        return any(compare(ev(arg[0]), item) == 0 for item in ev(arg[1]))
+    if op == '$sum':
+        values = ev(arg) if not isinstance(arg, list) else [ev(a) for a in arg]
+        values = values if isinstance(values, list) else [values]
+        return sum(v for v in values if isinstance(v, (int, float)) and not isinstance(v, bool))
+    if op in ('$add', '$multiply'):
+        values = [ev(a) for a in args]
+        return sum(values) if op == '$add' else functools.reduce(lambda x, y: x * y, values, 1)
+    if op == '$subtract':
+        return ev(arg[0]) - ev(arg[1])
+    if op in ('$max', '$min'):
+        values = [v for v in (ev(a) for a in args) if v is not None]
+        if not values:
+            return None
+        return functools.reduce(lambda x, y: x if (compare(x, y) >= 0) == (op == '$max') else y, values)
+    if op == '$size':
+        return len(ev(arg))
+    if op == '$map':
+        return [
+            ev(arg['in'], variables={**variables, arg.get('as', 'this'): item})
+            for item in (ev(arg['input']) or [])
+        ]
+    if op == '$setIntersection':
+        first, *others = [ev(a) for a in args]
+        return [v for v in dict.fromkeys(first) if all(v in other for other in others)]
+    if op == '$mergeObjects':
+        merged = {}
+        for value in (ev(a) for a in args):
+            merged.update(value or {})
+        return merged
+    if op == '$concat':
+        return ''.join(ev(a) for a in args)
+    raise NotImplementedError(f'expression operator {op}')
+
+
+# Updates
+
+def apply_update(doc, update, is_insert: bool) -> dict:
+    """Return the updated document (operators or pipeline)"""
+    if isinstance(update, list):
+        for stage in update:
+            (name, spec), = stage.items()
+            if name in ('$set', '$addFields'):
+                values = {field: evaluate(expr, doc) for field, expr in spec.items()}
+                doc = copy.deepcopy(doc)
+                for field, value in values.items():
+                    set_path(doc, field, value)
+            elif name in ('$replaceRoot', '$replaceWith'):
+                new_root = evaluate(spec['newRoot'] if name == '$replaceRoot' else spec, doc)
+                if '_id' in doc:
+                    new_root = {'_id': doc['_id'], **new_root}
+                doc = new_root
+            elif name in ('$unset', '$project'):
+                doc = copy.deepcopy(doc)
+                for field in ([spec] if isinstance(spec, str) else spec):
+                    unset_path(doc, field)
+            else:
+                raise NotImplementedError(f'update pipeline stage {name}')
+        return doc
+
+    doc = copy.deepcopy(doc)
+    for op, fields in update.items():
+        if op == '$setOnInsert' and not is_insert:
+            continue
+        for path, value in fields.items():
+            current = get_path(doc, path)
+            if op in ('$set', '$setOnInsert'):
+                set_path(doc, path, copy.deepcopy(value))
+            elif op == '$unset':
+                unset_path(doc, path)
+            elif op == '$inc':
+                set_path(doc, path, (0 if current is MISSING else current) + value)
+            elif op == '$mul':
+                set_path(doc, path, (0 if current is MISSING else current) * value)
+            elif op in ('$min', '$max'):
+                if current is MISSING or (compare(value, current) < 0) == (op == '$min') and compare(value, current):
+                    set_path(doc, path, value)
+            elif op in ('$push', '$addToSet'):
+                items = value['$each'] if isinstance(value, dict) and '$each' in value else [value]
+                array = [] if current is MISSING else list(current)
+                for item in items:
+                    if op == '$push' or item not in array:
+                        array.append(copy.deepcopy(item))
+                set_path(doc, path, array)
+            elif op == '$pull':
+                if current is not MISSING:
+                    set_path(doc, path, [item for item in current if not _match_condition(item, value)])
+            else:
+                raise NotImplementedError(f'update operator {op}')
+    return doc
+
+
+def _upsert_seed(query) -> dict:
+    """Equality fields of the filter become the fields of an upserted document"""
+    seed = {}
+    for key, condition in query.items():
+        if key == '$and':
+            for part in condition:
+                seed.update(_upsert_seed(part))
+        elif key.startswith('$'):
+            continue
+        elif isinstance(condition, dict) and any(k.startswith('$') for k in condition):
+            if '$eq' in condition:
+                set_path(seed, key, condition['$eq'])
+        else:
+            set_path(seed, key, copy.deepcopy(condition))
+    return seed
+
+
+# Cursors and collections
+
+def _sort_docs(docs, keys):
+    def cmp(a, b):
+        for field, direction in keys:
+            c = compare(get_path(a, field), get_path(b, field))
+            if c:
+                return c * (1 if direction > 0 else -1)
+        return 0
+    return sorted(docs, key=functools.cmp_to_key(cmp))
+
+
+def _sort_keys(key_or_list, direction=None):
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction or 1)]
+    if isinstance(key_or_list, dict):
+        return list(key_or_list.items())
+    return list(key_or_list)
+
+
+class FakeCursor:
+    def __init__(self, docs, projection=None):
+        self._docs = docs
+        self._projection = projection
+        self._sort = None
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key_or_list, direction=None):
+        self._sort = _sort_keys(key_or_list, direction)
+        return self
+
+    def skip(self, n):
+        self._skip = n
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    def max_time_ms(self, ms):
+        return self
+
+    def _results(self):
+        docs = _sort_docs(self._docs, self._sort) if self._sort else list(self._docs)
+        docs = docs[self._skip:]
+        if self._limit:
+            docs = docs[:self._limit]
+        return [project(doc, self._projection) for doc in docs]
+
+    async def to_list(self, length=None):
+        results = self._results()
+        return results if length is None else results[:length]
+
+    def __aiter__(self):
+        self._iter = iter(self._results())
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+def _group_key(spec, doc):
+    return evaluate(spec, doc)
+
+
+def _run_pipeline(docs, pipeline):
+    docs = [copy.deepcopy(d) for d in docs]
+    for stage in pipeline:
+        (name, spec), = stage.items()
+        if name == '$match':
+            docs = [d for d in docs if matches(d, spec)]
+        elif name == '$sort':
+            docs = _sort_docs(docs, list(spec.items()))
+        elif name == '$limit':
+            docs = docs[:spec]
+        elif name == '$skip':
+            docs = docs[spec:]
+        elif name in ('$addFields', '$set'):
+            docs = [apply_update(d, [{'$set': spec}], False) for d in docs]
+        elif name == '$project':
+            if all(v in (0, 1, True, False) for v in spec.values()):
+                docs = [project(d, spec) for d in docs]
+            else:
+                docs = [
+                    {k: evaluate(v if not isinstance(v, (int, bool)) else f'${k}', d)
+                     for k, v in spec.items() if v not in (0, False)}
+                    for d in docs
+                ]
+        elif name == '$count':
+            docs = [{spec: len(docs)}] if docs else []
+        elif name == '$unwind':
+            path = (spec['path'] if isinstance(spec, dict) else spec)[1:]
+            docs = [
+                {**d, path: item}
+                for d in docs for item in (get_path(d, path) if isinstance(get_path(d, path), list) else [])
+            ]
+        elif name == '$facet':
+            docs = [{key: _run_pipeline(docs, sub) for key, sub in spec.items()}]
+        elif name == '$group':
+            groups = {}
+            for d in docs:
+                key = _group_key(spec['_id'], d)
+                marker = repr(key)
+                group = groups.setdefault(marker, {'_id': key, '_docs': []})
+                group['_docs'].append(d)
+            results = []
+            for group in groups.values():
+                result = {'_id': group['_id']}
+                for field, accumulator in spec.items():
+                    if field == '_id':
+                        continue
+                    (acc, expr), = accumulator.items()
+                    values = [evaluate(expr, d) for d in group['_docs']]
+                    if acc == '$sum':
+                        result[field] = sum(v for v in values if isinstance(v, (int, float)) and not isinstance(v, bool))
+                    elif acc == '$avg':
+                        numbers = [v for v in values if isinstance(v, (int, float))]
+                        result[field] = sum(numbers) / len(numbers) if numbers else None
+                    elif acc in ('$max', '$min'):
+                        present = [v for v in values if v is not None]
+                        result[field] = (max if acc == '$max' else min)(
+                            present, key=functools.cmp_to_key(compare)) if present else None
+                    elif acc == '$first':
+                        result[field] = values[0]
+                    elif acc == '$last':
+                        result[field] = values[-1]
+                    elif acc == '$push':
+                        result[field] = values
+                    elif acc == '$addToSet':
+                        result[field] = [v for i, v in enumerate(values) if v not in values[:i]]
+                    else:
+                        raise NotImplementedError(f'group accumulator {acc}')
+                results.append(result)
+            docs = results
+        else:
+            raise NotImplementedError(f'aggregation stage {name}')
+    return docs
+
+
+class FakeCollection:
+    def __init__(self, database, name):
+        self.database = database
+        self.name = name
+        self.docs = []
+        self.unique_indexes = []  # (keys, partialFilterExpression, sparse)
+        self.calls = []           # method names, for round-trip assertions
+
+    # Index handling
+
+    async def create_index(self, keys, unique=False, partialFilterExpression=None, sparse=False, **kwargs):
+        keys = _sort_keys(keys, 1)
+        if unique:
+            self.unique_indexes.append(([k for k, _ in keys], partialFilterExpression, sparse))
+        return '_'.join(f'{k}_{d}' for k, d in keys)
+
+    def _check_unique(self, doc, ignore=None):
+        if '_id' in doc and any(other is not ignore and other.get('_id') == doc['_id'] for other in self.docs):
+            raise DuplicateKeyError('E11000 duplicate key error (_id)', 11000)
+        for keys, partial, sparse in self.unique_indexes:
+            if partial and not matches(doc, partial):
+                continue
+            values = [get_path(doc, k) for k in keys]
+            if sparse and all(v is MISSING for v in values):
+                continue
+            for other in self.docs:
+                if other is ignore or (partial and not matches(other, partial)):
+                    continue
+                if [get_path(other, k) for k in keys] == values:
+                    raise DuplicateKeyError(f'E11000 duplicate key error ({", ".join(keys)})', 11000)
+
+    def _store(self, doc, ignore=None):
+        self._check_unique(doc, ignore)
+        if ignore is not None:
+            self.docs[self.docs.index(ignore)] = doc
+        else:
+            self.docs.append(doc)
+
+    # Reads
+
+    def find(self, filter=None, projection=None, session=None, **kwargs):
+        self.calls.append('find')
+        return FakeCursor([d for d in self.docs if matches(d, filter)], projection)
+
+    async def find_one(self, filter=None, projection=None, session=None, sort=None, **kwargs):
+        self.calls.append('find_one')
+        cursor = FakeCursor([d for d in self.docs if matches(d, filter)], projection)
+        if sort:
+            cursor.sort(sort)
+        docs = await cursor.limit(1).to_list(1)
+        return docs[0] if docs else None
+
+    async def count_documents(self, filter, session=None, **kwargs):
+        self.calls.append('count_documents')
+        return sum(1 for d in self.docs if matches(d, filter))
+
+    async def estimated_document_count(self, **kwargs):
+        return len(self.docs)
+
+    async def distinct(self, key, filter=None, session=None):
+        self.calls.append('distinct')
+        values = []
+        for doc in self.docs:
+            if matches(doc, filter):
+                value = get_path(doc, key)
+                for v in (value if isinstance(value, list) else [value]):
+                    if v is not MISSING and v not in values:
+                        values.append(v)
+        return values
+
+    def aggregate(self, pipeline, session=None, **kwargs):
+        self.calls.append('aggregate')
+        return FakeCursor(_run_pipeline(self.docs, pipeline))
+
+    # Writes
+
+    def _prepare(self, doc):
+        if '_id' not in doc:
+            doc['_id'] = f'oid-{next(_ids)}'  # pymongo also adds _id to the caller's dict
+        return copy.deepcopy(doc)
+
+    async def insert_one(self, doc, session=None, **kwargs):
+        self.calls.append('insert_one')
+        self._store(self._prepare(doc))
+        return SimpleNamespace(inserted_id=doc['_id'], acknowledged=True)
+
+    async def insert_many(self, docs, ordered=True, session=None, **kwargs):
+        self.calls.append('insert_many')
+        inserted, errors = [], []
+        for index, doc in enumerate(docs):
+            try:
+                self._store(self._prepare(doc))
+                inserted.append(doc['_id'])
+            except DuplicateKeyError as e:
+                errors.append({'index': index, 'code': 11000, 'errmsg': str(e)})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({'writeErrors': errors, 'nInserted': len(inserted), 'nUpserted': 0,
+                                  'nMatched': 0, 'nModified': 0, 'nRemoved': 0, 'upserted': []})
+        return SimpleNamespace(inserted_ids=inserted, acknowledged=True)
+
+    def _update(self, filter, update, upsert, multi):
+        matched = modified = 0
+        upserted_id = None
+        for doc in [d for d in self.docs if matches(d, filter)]:
+            matched += 1
+            new_doc = apply_update(doc, update, is_insert=False)
+            if new_doc != doc:
+                self._store(new_doc, ignore=doc)
+                modified += 1
+            if not multi:
+                break
+        if not matched and upsert:
+            new_doc = apply_update(_upsert_seed(filter), update, is_insert=True)
+            new_doc.setdefault('_id', f'oid-{next(_ids)}')
+            self._store(new_doc)
+            upserted_id = new_doc['_id']
+        return SimpleNamespace(matched_count=matched, modified_count=modified,
+                               upserted_id=upserted_id, acknowledged=True)
+
+    async def update_one(self, filter, update, upsert=False, session=None, array_filters=None, **kwargs):
+        self.calls.append('update_one')
+        if array_filters:
+            raise NotImplementedError('array_filters')
+        return self._update(filter, update, upsert, multi=False)
+
+    async def update_many(self, filter, update, upsert=False, session=None, **kwargs):
+        self.calls.append('update_many')
+        return self._update(filter, update, upsert, multi=True)
+
+    async def find_one_and_update(self, filter, update, projection=None, upsert=False,
+                                  return_document=False, sort=None, session=None, **kwargs):
+        self.calls.append('find_one_and_update')
+        candidates = [d for d in self.docs if matches(d, filter)]
+        if sort:
+            candidates = _sort_docs(candidates, _sort_keys(sort))
+        if candidates:
+            before = candidates[0]
+            after = apply_update(before, update, is_insert=False)
+            self._store(after, ignore=before)
+            return project(after if return_document else before, projection)
+        if not upsert:
+            return None
+        after = apply_update(_upsert_seed(filter), update, is_insert=True)
+        after.setdefault('_id', f'oid-{next(_ids)}')
+        self._store(after)
+        return project(after, projection) if return_document else None
+
+    async def delete_one(self, filter, session=None, **kwargs):
+        self.calls.append('delete_one')
+        for doc in self.docs:
+            if matches(doc, filter):
+                self.docs.remove(doc)
+                return SimpleNamespace(deleted_count=1)
+        return SimpleNamespace(deleted_count=0)
+
+    async def delete_many(self, filter, session=None, **kwargs):
+        self.calls.append('delete_many')
+        keep = [d for d in self.docs if not matches(d, filter)]
+        deleted = len(self.docs) - len(keep)
+        self.docs = keep
+        return SimpleNamespace(deleted_count=deleted)
+
+    async def bulk_write(self, requests, ordered=True, session=None, **kwargs):
+        self.calls.append('bulk_write')
+        counts = {'inserted': 0, 'matched': 0, 'modified': 0, 'upserted': 0, 'deleted': 0}
+        upserted_ids = {}
+        errors = []
+        for index, op in enumerate(requests):
+            try:
+                if isinstance(op, InsertOne):
+                    self._store(self._prepare(op._doc))
+                    counts['inserted'] += 1
+                elif isinstance(op, (UpdateOne, UpdateMany)):
+                    if getattr(op, '_array_filters', None):
+                        raise NotImplementedError('array_filters')
+                    result = self._update(op._filter, op._doc, op._upsert, multi=isinstance(op, UpdateMany))
+                    counts['matched'] += result.matched_count
+                    counts['modified'] += result.modified_count
+                    if result.upserted_id is not None:
+                        counts['upserted'] += 1
+                        upserted_ids[index] = result.upserted_id
+                elif isinstance(op, ReplaceOne):
+                    result = self._update(op._filter, [{'$replaceWith': {'$literal': op._doc}}], op._upsert, False)
+                    counts['matched'] += result.matched_count
+                    counts['modified'] += result.modified_count
+                elif isinstance(op, (DeleteOne, DeleteMany)):
+                    method = self.delete_many if isinstance(op, DeleteMany) else self.delete_one
+                    counts['deleted'] += (await method(op._filter)).deleted_count
+                else:
+                    raise NotImplementedError(f'bulk operation {type(op).__name__}')
+            except DuplicateKeyError as e:
+                errors.append({'index': index, 'code': 11000, 'errmsg': str(e)})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({'writeErrors': errors, 'nInserted': counts['inserted'],
+                                  'nUpserted': counts['upserted'], 'nMatched': counts['matched'],
+                                  'nModified': counts['modified'], 'nRemoved': counts['deleted'],
+                                  'upserted': []})
+        return SimpleNamespace(
+            inserted_count=counts['inserted'], matched_count=counts['matched'],
+            modified_count=counts['modified'], upserted_count=counts['upserted'],
+            deleted_count=counts['deleted'], upserted_ids=upserted_ids, acknowledged=True
+        )
+
+
+class FakeDatabase:
+    def __init__(self, client=None, name='test_db'):
+        self.client = client
+        self.name = name
+        self.collections = {}
+
+    def __getitem__(self, name):
+        if name not in self.collections:
+            self.collections[name] = FakeCollection(self, name)
+        return self.collections[name]
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self[name]
+
+    async def list_collection_names(self):
+        return list(self.collections)
+
+    async def create_collection(self, name, **kwargs):
+        return self[name]
+
+    def _snapshot(self):
+        return {name: copy.deepcopy(c.docs) for name, c in self.collections.items()}
+
+    def _restore(self, snapshot):
+        for name, collection in self.collections.items():
+            collection.docs = snapshot.get(name, [])
+
+
+class FakeSession:
+    def __init__(self, client):
+        self.client = client
+        self.transactions = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def with_transaction(self, callback, **kwargs):
+        """All-or-nothing across every database of the client, like a real transaction"""
+        if not self.client.transactions:
+            raise OperationFailure('Transaction numbers are only allowed on a replica set member or mongos', 20)
+        snapshots = {name: db._snapshot() for name, db in self.client.databases.items()}
+        try:
+            result = await callback(self)
+        except BaseException:
+            for name, snapshot in snapshots.items():
+                self.client.databases[name]._restore(snapshot)
+            raise
+        self.transactions += 1
+        return result
+
+
+class FakeClient:
+    def __init__(self, transactions: bool = True):
+        self.transactions = transactions
+        self.databases = {}
+        self.sessions = []
+
+    def __getitem__(self, name):
+        if name not in self.databases:
+            self.databases[name] = FakeDatabase(self, name)
+        return self.databases[name]
+
+    async def start_session(self):
+        session = FakeSession(self)
+        self.sessions.append(session)
+        return session
+
+
+def run(coro):
+    """asyncio.run shorthand for the synchronous pytest functions"""
+    return asyncio.run(coro)
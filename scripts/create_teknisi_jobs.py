@@ -13,6 +13,8 @@ import os
 from datetime import datetime, timezone, timedelta
 import random
 
+from utils.search import build_order_search_fields
+
 ROOT_DIR = Path('/app/backend')
 load_dotenv(ROOT_DIR / '.env')
 
@@ -92,6 +94,7 @@ async def create_teknisi_jobs():
             print(f"  ⚠️ Job {job_data['id']} already exists, skipping...")
             continue
         
+        job_data.update(build_order_search_fields(job_data))
         await db.orders.insert_one(job_data)
         jobs_created += 1
         print(f"  ✅ Created: {job_data['description']} | Status: {status}")
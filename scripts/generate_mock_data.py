@@ -14,7 +14,9 @@ from dotenv import load_dotenv
 
 sys.path.append('/app/backend')
 from utils.auth import get_password_hash
-from utils.helpers import generate_id, generate_code, utc_now
+from utils.helpers import generate_id, utc_now
+from utils.sequences import sequence_allocator
+from utils.search import build_order_search_fields
 
 load_dotenv('/app/backend/.env')
 
@@ -230,7 +232,7 @@ async def create_orders(db, businesses, users, customers):
         
         order_data = {
             'id': generate_id(),
-            'order_number': generate_code('ORD', 12),
+            'order_number': await sequence_allocator.next_code('ORD'),
             'business_id': business['id'],
             'customer_name': customer['name'],
             'customer_phone': customer['phone'],
@@ -253,6 +255,7 @@ async def create_orders(db, businesses, users, customers):
             'updated_at': created_at.isoformat()
         }
         
+        order_data.update(build_order_search_fields(order_data))
         await db.orders.insert_one(order_data)
         orders.append(order_data)
     
@@ -268,7 +271,7 @@ async def create_transactions(db, businesses, users, orders):
         if order['payment_status'] in ['paid', 'partial']:
             txn_data = {
                 'id': generate_id(),
-                'transaction_code': generate_code('TXN', 12),
+                'transaction_code': await sequence_allocator.next_code('TXN'),
                 'order_id': order['id'],
                 'business_id': order['business_id'],
                 'transaction_type': 'income',
@@ -305,7 +308,7 @@ async def create_transactions(db, businesses, users, orders):
         
         txn_data = {
             'id': generate_id(),
-            'transaction_code': generate_code('TXN', 12),
+            'transaction_code': await sequence_allocator.next_code('TXN'),
             'order_id': None,
             'business_id': business['id'],
             'transaction_type': 'expense',
@@ -541,6 +544,7 @@ async def main():
     
     client = AsyncIOMotorClient(MONGO_URL)
     db = client[DB_NAME]
+    sequence_allocator.bind(db)
     
     # Get owner user
     owner = await db.users.find_one({'role_id': 1}, {'_id': 0})
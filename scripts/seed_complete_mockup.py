@@ -16,7 +16,9 @@ from pathlib import Path
 import os
 
 # Import utils
-from utils.helpers import generate_id, generate_code, utc_now
+from utils.helpers import generate_id, utc_now
+from utils.sequences import sequence_allocator
+from utils.search import build_order_search_fields
 from utils.auth import get_password_hash
 
 ROOT_DIR = Path('/app/backend')
@@ -26,6 +28,7 @@ load_dotenv(ROOT_DIR / '.env')
 mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ.get('DB_NAME', 'gelis_db')]
+sequence_allocator.bind(db)
 
 # ==================== DATA CONSTANTS ====================
 
@@ -595,7 +598,7 @@ async def seed_orders(businesses, users):
             
             order = {
                 'id': generate_id(),
-                'order_number': generate_code('ORD'),
+                'order_number': await sequence_allocator.next_code('ORD'),
                 'business_id': business['id'],
                 'customer_name': customer_name,
                 'customer_phone': customer_phone,
@@ -621,6 +624,7 @@ async def seed_orders(businesses, users):
                 'updated_at': (order_date + timedelta(hours=random.randint(1, 48))).isoformat()
             }
             
+            order.update(build_order_search_fields(order))
             orders.append(order)
             order_count += 1
     
@@ -643,7 +647,7 @@ async def seed_transactions(businesses, orders, users):
             # Income transaction (follows same logic as server.py)
             trans = {
                 'id': generate_id(),
-                'transaction_code': generate_code('TXN'),
+                'transaction_code': await sequence_allocator.next_code('TXN'),
                 'business_id': business['id'],
                 'transaction_type': 'income',  # Changed to match server.py
                 'category': 'Order Payment',  # Consistent with auto-create in server.py
@@ -686,14 +690,14 @@ async def seed_transactions(businesses, orders, users):
             
             trans = {
                 'id': generate_id(),
-                'transaction_code': generate_code('TXN'),  # Consistent field name
+                'transaction_code': await sequence_allocator.next_code('TXN'),  # Consistent field name
                 'business_id': business['id'],
                 'transaction_type': 'expense',
                 'category': category,
                 'amount': amount,
                 'description': f"{category} - {business['name']}",
                 'payment_method': random.choice(['cash', 'transfer']),  # Lowercase for consistency
-                'reference_number': generate_code('EXP'),
+                'reference_number': await sequence_allocator.next_code('EXP'),
                 'order_id': None,  # No related order for expenses
                 'is_mock': True,
                 'created_by': finance_user['id'],
@@ -913,7 +917,7 @@ async def seed_csr_programs(businesses, users):
         
         program = {
             'id': generate_id(),
-            'program_code': generate_code('CSR'),
+            'program_code': await sequence_allocator.next_code('CSR'),
             'business_id': business['id'],
             'name': prog_data['name'],
             'description': prog_data['description'],
@@ -14,7 +14,8 @@ from pathlib import Path
 import os
 
 # Import utils
-from utils.helpers import generate_id, generate_code, utc_now
+from utils.helpers import generate_id, utc_now
+from utils.sequences import sequence_allocator
 
 ROOT_DIR = Path('/app/backend')
 load_dotenv(ROOT_DIR / '.env')
@@ -23,6 +24,7 @@ load_dotenv(ROOT_DIR / '.env')
 mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
+sequence_allocator.bind(db)
 
 # PPOB Products dengan harga realistic
 PPOB_PRODUCTS = {
@@ -180,7 +182,7 @@ async def seed_ppob_shift_reports():
             # Create accounting transaction (AKUMULASI PER SHIFT)
             transaction = {
                 'id': generate_id(),
-                'transaction_code': generate_code('TXN', 12),
+                'transaction_code': await sequence_allocator.next_code('TXN'),
                 'business_id': ppob_business['id'],
                 'transaction_type': 'income',
                 'category': f'Penjualan PPOB Shift {shift}',
@@ -257,14 +259,14 @@ async def seed_other_business_transactions():
                     
                     transaction = {
                         'id': generate_id(),
-                        'transaction_code': generate_code('TXN', 12),
+                        'transaction_code': await sequence_allocator.next_code('TXN'),
                         'business_id': business['id'],
                         'transaction_type': 'income',
                         'category': 'sales',
                         'description': category_desc,
                         'amount': amount,
                         'payment_method': random.choice(['cash', 'transfer', 'card']),
-                        'reference_number': generate_code('INV', 10),
+                        'reference_number': await sequence_allocator.next_code('INV'),
                         'created_by': 'system',
                         'created_at': (current_date + timedelta(hours=random.randint(8, 16))).isoformat()
                     }
@@ -307,14 +309,14 @@ async def seed_other_business_transactions():
                     
                     transaction = {
                         'id': generate_id(),
-                        'transaction_code': generate_code('TXN', 12),
+                        'transaction_code': await sequence_allocator.next_code('TXN'),
                         'business_id': business['id'],
                         'transaction_type': 'expense',
                         'category': random.choice(['operational', 'salary', 'purchase', 'maintenance']),
                         'description': expense_desc,
                         'amount': amount,
                         'payment_method': random.choice(['cash', 'transfer']),
-                        'reference_number': generate_code('EXP', 10),
+                        'reference_number': await sequence_allocator.next_code('EXP'),
                         'created_by': 'system',
                         'created_at': (current_date + timedelta(hours=random.randint(8, 16))).isoformat()
                     }
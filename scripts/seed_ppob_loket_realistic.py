@@ -15,7 +15,8 @@ from pathlib import Path
 import os
 
 # Import utils
-from utils.helpers import generate_id, generate_code, utc_now
+from utils.helpers import generate_id, utc_now
+from utils.sequences import sequence_allocator
 
 ROOT_DIR = Path('/app/backend')
 load_dotenv(ROOT_DIR / '.env')
@@ -24,6 +25,7 @@ load_dotenv(ROOT_DIR / '.env')
 mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
+sequence_allocator.bind(db)
 
 # Data realistic
 PETUGAS_LOKET = ['Agus', 'Budi', 'Citra', 'Dewi', 'Eko']
@@ -196,7 +198,7 @@ async def seed_ppob_loket_reports():
             
             transaction = {
                 'id': generate_id(),
-                'transaction_code': generate_code('TXN', 12),
+                'transaction_code': await sequence_allocator.next_code('TXN'),
                 'business_id': ppob_business['id'],
                 'transaction_type': 'income',
                 'category': f'Penjualan PPOB Shift {shift}',
@@ -16,7 +16,8 @@ from pathlib import Path
 import os
 
 # Import utils
-from utils.helpers import generate_id, generate_code, utc_now
+from utils.helpers import generate_id, utc_now
+from utils.sequences import sequence_allocator
 
 ROOT_DIR = Path('/app/backend')
 load_dotenv(ROOT_DIR / '.env')
@@ -25,6 +26,7 @@ load_dotenv(ROOT_DIR / '.env')
 mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
+sequence_allocator.bind(db)
 
 # Data realistic
 PETUGAS_LOKET = ['Agus', 'Budi', 'Citra', 'Dewi', 'Eko']
@@ -294,7 +296,7 @@ async def seed_ppob_kasir_reports(all_shifts_data):
         if total_uang_masuk > 0:
             await db.transactions.insert_one({
                 'id': generate_id(),
-                'transaction_code': generate_code('TXN', 12),
+                'transaction_code': await sequence_allocator.next_code('TXN'),
                 'business_id': ppob_business['id'],
                 'transaction_type': 'income',
                 'category': 'Setoran Kasir PPOB',
@@ -310,7 +312,7 @@ async def seed_ppob_kasir_reports(all_shifts_data):
         if total_topup > 0:
             await db.transactions.insert_one({
                 'id': generate_id(),
-                'transaction_code': generate_code('TXN', 12),
+                'transaction_code': await sequence_allocator.next_code('TXN'),
                 'business_id': ppob_business['id'],
                 'transaction_type': 'expense',
                 'category': 'Topup Modal Loket',
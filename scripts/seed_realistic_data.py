@@ -14,7 +14,9 @@ from pathlib import Path
 import os
 
 # Import utils
-from utils.helpers import generate_id, generate_code, utc_now
+from utils.helpers import generate_id, utc_now
+from utils.sequences import sequence_allocator
+from utils.search import build_order_search_fields
 from utils.auth import get_password_hash
 
 ROOT_DIR = Path('/app/backend')
@@ -24,6 +26,7 @@ load_dotenv(ROOT_DIR / '.env')
 mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
+sequence_allocator.bind(db)
 
 # Data references
 BUSINESS_CATEGORIES = ['PPOB', 'PLN Installation', 'Travel Umroh', 'PDAM', 'Inventory']
@@ -263,7 +266,7 @@ async def seed_orders(businesses, users):
             
             order = {
                 'id': generate_id(),
-                'order_number': generate_code('ORD', 12),
+                'order_number': await sequence_allocator.next_code('ORD'),
                 'business_id': business['id'],
                 'customer_name': customer_name,
                 'customer_phone': f'08{random.randint(100000000, 999999999)}',
@@ -286,6 +289,7 @@ async def seed_orders(businesses, users):
                 'created_at': target_date.replace(hour=random.randint(8, 17), minute=random.randint(0, 59)).isoformat(),
                 'updated_at': target_date.replace(hour=random.randint(8, 17), minute=random.randint(0, 59)).isoformat()
             }
+            order.update(build_order_search_fields(order))
             
             orders.append(order)
     
@@ -304,7 +308,7 @@ async def seed_transactions(businesses, orders, users):
             # Create income transaction for paid order
             transaction = {
                 'id': generate_id(),
-                'transaction_code': generate_code('TRX', 12),
+                'transaction_code': await sequence_allocator.next_code('TRX'),
                 'business_id': order['business_id'],
                 'transaction_type': 'income',
                 'category': 'Order Payment',
@@ -326,7 +330,7 @@ async def seed_transactions(businesses, orders, users):
             
             transaction = {
                 'id': generate_id(),
-                'transaction_code': generate_code('TRX', 12),
+                'transaction_code': await sequence_allocator.next_code('TRX'),
                 'business_id': business['id'],
                 'transaction_type': 'expense',
                 'category': random.choice(expense_categories),
@@ -347,7 +351,7 @@ async def seed_transactions(businesses, orders, users):
             
             transaction = {
                 'id': generate_id(),
-                'transaction_code': generate_code('TRX', 12),
+                'transaction_code': await sequence_allocator.next_code('TRX'),
                 'business_id': business['id'],
                 'transaction_type': 'transfer',
                 'category': 'Topup Loket',
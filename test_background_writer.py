@@ -0,0 +1,85 @@
+"""
+Unit tests for the buffered background writer - backend/utils/background_writer.py
+Run: python -m pytest -q test_background_writer.py
+"""
+import asyncio
+
+from pymongo import InsertOne, UpdateOne
+
+from utils.background_writer import BackgroundWriter
+
+
+class FakeResult:
+    def __init__(self, operations):
+        self.inserted_count = sum(isinstance(op, InsertOne) for op in operations)
+        self.modified_count = sum(isinstance(op, UpdateOne) for op in operations)
+        self.upserted_count = 0
+
+
+class FakeCollection:
+    def __init__(self, name, calls):
+        self.name = name
+        self.calls = calls
+
+    async def bulk_write(self, operations, ordered=True):
+        self.calls.append((self.name, list(operations)))
+        return FakeResult(operations)
+
+
+class FakeDb:
+    def __init__(self):
+        self.calls = []
+
+    def __getitem__(self, name):
+        return FakeCollection(name, self.calls)
+
+
+def test_queued_writes_are_batched_per_collection():
+    async def scenario():
+        db = FakeDb()
+        writer = BackgroundWriter(flush_interval=0.05, max_batch_size=100)
+        writer.bind(db)
+        writer.start()
+        writer.insert_many('activity_logs', [{'id': str(i)} for i in range(10)])
+        writer.enqueue('notification_counters', UpdateOne({'_id': 'u1'}, {'$inc': {'unread': 1}}, upsert=True))
+        await writer.stop()
+        return db, writer
+
+    db, writer = asyncio.run(scenario())
+    assert [name for name, _ in db.calls] == ['activity_logs', 'notification_counters']
+    assert len(db.calls[0][1]) == 10
+    assert writer.written == 11
+    assert writer.flushes == 1
+    assert not writer.running
+
+
+def test_insert_copies_the_document():
+    async def scenario():
+        db = FakeDb()
+        writer = BackgroundWriter()
+        writer.bind(db)
+        doc = {'id': '1'}
+        writer.insert('activity_logs', doc)
+        doc['id'] = 'changed'
+        await writer.stop()  # not started: waits for the direct write
+        return db, doc
+
+    db, doc = asyncio.run(scenario())
+    (_, [operation]), = db.calls
+    assert operation == InsertOne({'id': '1'})
+
+
+def test_full_queue_overflows_to_direct_writes():
+    async def scenario():
+        db = FakeDb()
+        writer = BackgroundWriter(flush_interval=10, max_queue_size=2)
+        writer.bind(db)
+        writer.start()
+        for i in range(5):
+            writer.insert('activity_logs', {'id': str(i)})
+        await writer.stop()
+        return db, writer
+
+    db, writer = asyncio.run(scenario())
+    assert writer.overflowed > 0
+    assert sum(len(ops) for _, ops in db.calls) == 5  # nothing dropped
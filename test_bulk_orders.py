@@ -0,0 +1,35 @@
+"""
+Unit tests for bulk order request validation - backend/models.py
+Run: python -m pytest -q test_bulk_orders.py
+"""
+import pytest
+from pydantic import ValidationError
+
+from models import BulkOrderAssign, BulkOrderStatusUpdate, OrderStatus
+
+
+def test_assign_accepts_up_to_500_orders():
+    request = BulkOrderAssign(order_ids=[f'o{i}' for i in range(500)], technician_id='t1')
+    assert len(request.order_ids) == 500
+
+
+@pytest.mark.parametrize('order_ids', [[], [f'o{i}' for i in range(501)]])
+def test_assign_rejects_empty_or_oversized_batches(order_ids):
+    with pytest.raises(ValidationError):
+        BulkOrderAssign(order_ids=order_ids, technician_id='t1')
+
+
+def test_assign_without_technician_unassigns():
+    assert BulkOrderAssign(order_ids=['o1']).technician_id is None
+
+
+def test_status_update_validates_status():
+    request = BulkOrderStatusUpdate(order_ids=['o1', 'o2'], status='completed')
+    assert request.status == OrderStatus.COMPLETED
+    with pytest.raises(ValidationError):
+        BulkOrderStatusUpdate(order_ids=['o1'], status='done')
+
+
+def test_status_update_batch_limit():
+    with pytest.raises(ValidationError):
+        BulkOrderStatusUpdate(order_ids=[f'o{i}' for i in range(501)], status='completed')
@@ -0,0 +1,40 @@
+"""
+Unit tests for the versioned response cache - backend/utils/cache.py
+Run: python -m pytest -q test_cache.py
+"""
+from utils.cache import ORDERS_CACHE, VersionedCache
+
+
+def test_hit_after_set_and_miss_after_invalidate():
+    cache = VersionedCache()
+    assert cache.get(ORDERS_CACHE, 'board') is None
+    cache.set(ORDERS_CACHE, 'board', {'total': 1})
+    assert cache.get(ORDERS_CACHE, 'board') == {'total': 1}
+    cache.invalidate(ORDERS_CACHE)
+    assert cache.get(ORDERS_CACHE, 'board') is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_write_during_query_is_not_cached():
+    cache = VersionedCache()
+    assert cache.get(ORDERS_CACHE, 'board') is None
+    version = cache.version(ORDERS_CACHE)  # read before the query starts
+    stale = {'total': 1}                   # ...query runs...
+    cache.invalidate(ORDERS_CACHE)         # an order write lands meanwhile
+    assert cache.set(ORDERS_CACHE, 'board', stale, version=version) is False
+    assert cache.get(ORDERS_CACHE, 'board') is None
+
+    version = cache.version(ORDERS_CACHE)
+    assert cache.set(ORDERS_CACHE, 'board', {'total': 2}, version=version) is True
+    assert cache.get(ORDERS_CACHE, 'board') == {'total': 2}
+
+
+def test_other_namespaces_and_ttl():
+    cache = VersionedCache()
+    version = cache.version('reports')
+    cache.invalidate(ORDERS_CACHE)
+    assert cache.set('reports', 'r', 1, version=version) is True
+    cache.set(ORDERS_CACHE, 'expired', 1, ttl=-1)
+    assert cache.get(ORDERS_CACHE, 'expired') is None
+    assert cache.clear() == 1
+    assert cache.get('reports', 'r') is None
@@ -0,0 +1,157 @@
+"""
+Unit tests for developer database introspection - backend/utils/db_introspection.py
+Run: python -m pytest -q test_db_introspection.py
+"""
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from pymongo.errors import OperationFailure
+
+from utils.db_introspection import (
+    MAX_QUERY_TIME_MS, clamp_max_time_ms, explain_find, get_collections_info, summarize_explain
+)
+
+
+class FakeAggregate:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length):
+        if isinstance(self.docs, Exception):
+            raise self.docs
+        return self.docs
+
+
+class FakeCollection:
+    def __init__(self, count, storage, usage, indexes):
+        self.count, self.storage, self.usage, self.indexes = count, storage, usage, indexes
+        self.scanned = False
+
+    async def estimated_document_count(self):
+        return self.count
+
+    async def count_documents(self, query):
+        self.scanned = True  # must never be used
+        return self.count
+
+    def aggregate(self, pipeline):
+        stage = next(iter(pipeline[0]))
+        return FakeAggregate(self.storage if stage == '$collStats' else self.usage)
+
+    async def index_information(self):
+        return self.indexes
+
+
+class FakeDb:
+    def __init__(self, collections):
+        self.collections = collections
+
+    async def list_collection_names(self):
+        return list(self.collections)
+
+    def __getitem__(self, name):
+        return self.collections[name]
+
+
+SINCE = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def _orders():
+    return FakeCollection(
+        count=1200,
+        storage=[{'storageStats': {'size': 4096, 'storageSize': 2048, 'avgObjSize': 512,
+                                   'totalIndexSize': 300, 'indexSizes': {'_id_': 100, 'id_1': 120, 'old_1': 80}}}],
+        usage=[
+            {'name': '_id_', 'accesses': {'ops': 0, 'since': SINCE}},
+            {'name': 'id_1', 'accesses': {'ops': 57, 'since': SINCE}},
+            {'name': 'old_1', 'accesses': {'ops': 0, 'since': SINCE}},
+        ],
+        indexes={'_id_': {'key': [('_id', 1)]}, 'id_1': {'key': [('id', 1)], 'unique': True}, 'old_1': {'key': [('old', -1)]}}
+    )
+
+
+def test_collection_stats_come_from_metadata():
+    orders = _orders()
+    (info,) = asyncio.run(get_collections_info(FakeDb({'orders': orders})))
+    assert info['count'] == 1200 and not orders.scanned
+    assert info['size_bytes'] == 4096 and info['total_index_size_bytes'] == 300
+    by_name = {index['name']: index for index in info['indexes']}
+    assert by_name['id_1'] == {
+        'name': 'id_1', 'key': [['id', 1]], 'unique': True, 'size_bytes': 120, 'ops': 57, 'since': SINCE.isoformat()
+    }
+    assert info['unused_indexes'] == ['old_1']  # _id_ is never reported
+    assert 'errors' not in info
+
+
+def test_missing_privileges_degrade_per_collection():
+    denied = OperationFailure('not authorized on gelis_db to execute command { aggregate: ... }')
+    restricted = FakeCollection(count=5, storage=denied, usage=denied, indexes={'_id_': {'key': [('_id', 1)]}})
+    infos = asyncio.run(get_collections_info(FakeDb({'users': restricted, 'orders': _orders(), 'system.views': None})))
+
+    assert [info['name'] for info in infos] == ['orders', 'users']  # sorted, system.* skipped
+    users = infos[1]
+    assert users['count'] == 5
+    assert len(users['errors']) == 2
+    assert users['size_bytes'] is None
+    assert users['indexes'][0]['ops'] is None
+    assert users['unused_indexes'] == []
+
+
+@pytest.mark.parametrize('requested, expected', [
+    (5000, 5000), (0, 1), (-100, 1), (MAX_QUERY_TIME_MS, MAX_QUERY_TIME_MS), (10**9, MAX_QUERY_TIME_MS)
+])
+def test_max_time_ms_clamp(requested, expected):
+    assert clamp_max_time_ms(requested) == expected
+
+
+INDEX_PLAN = {
+    'queryPlanner': {
+        'winningPlan': {'stage': 'LIMIT', 'inputStage': {
+            'stage': 'FETCH', 'inputStage': {'stage': 'IXSCAN', 'indexName': 'business_id_1_created_at_-1'}
+        }},
+        'rejectedPlans': [{'stage': 'COLLSCAN'}]
+    },
+    'executionStats': {'nReturned': 10, 'totalKeysExamined': 10, 'totalDocsExamined': 10, 'executionTimeMillis': 1}
+}
+
+
+def test_explain_summary_index_scan():
+    summary = summarize_explain(INDEX_PLAN)
+    assert summary['stages'] == ['LIMIT', 'FETCH', 'IXSCAN']
+    assert summary['indexes_used'] == ['business_id_1_created_at_-1']
+    assert summary['collscan'] is False
+    assert (summary['n_returned'], summary['keys_examined'], summary['docs_examined']) == (10, 10, 10)
+    assert summary['rejected_plans'] == 1
+
+
+def test_explain_summary_collscan_and_sbe_layout():
+    sbe = {'queryPlanner': {'winningPlan': {'queryPlan': {'stage': 'COLLSCAN'}, 'slotBasedPlan': {}}},
+           'executionStats': {'totalDocsExamined': 5000, 'nReturned': 3}}
+    summary = summarize_explain(sbe)
+    assert summary['collscan'] is True and summary['indexes_used'] == []
+    assert summary['docs_examined'] == 5000
+
+    merge = {'queryPlanner': {'winningPlan': {'stage': 'OR', 'inputStages': [
+        {'stage': 'IXSCAN', 'indexName': 'a_1'}, {'stage': 'IXSCAN', 'indexName': 'b_1'}
+    ]}}}
+    assert summarize_explain(merge)['indexes_used'] == ['a_1', 'b_1']
+
+
+class FakeCommandDb:
+    def __init__(self):
+        self.commands = []
+
+    async def command(self, command):
+        self.commands.append(command)
+        return INDEX_PLAN
+
+
+def test_explain_find_runs_with_limit_and_time_guard():
+    db = FakeCommandDb()
+    summary = asyncio.run(explain_find(db, 'orders', {'business_id': 'b1'}, 100, 2000))
+    assert db.commands == [{
+        'explain': {'find': 'orders', 'filter': {'business_id': 'b1'}, 'limit': 100, 'maxTimeMS': 2000},
+        'verbosity': 'executionStats'
+    }]
+    assert summary['indexes_used'] == ['business_id_1_created_at_-1']
@@ -0,0 +1,112 @@
+"""
+Unit tests for MongoDB command monitoring - backend/utils/db_monitoring.py
+Run: python -m pytest -q test_db_monitoring.py
+"""
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from utils.db_monitoring import (
+    MAX_SLOW_QUERIES, DbCommandListener, DbStatsMiddleware, command_collection, command_shape, query_shape
+)
+
+
+def test_query_shape_hides_values():
+    query = {'business_id': 'b1', 'created_at': {'$gte': '2025-01-01'}, 'id': {'$in': ['a', 'b', 'c']}}
+    assert query_shape(query) == {'business_id': '?', 'created_at': {'$gte': '?'}, 'id': {'$in': ['?']}}
+
+
+def test_query_shape_keeps_pipeline_stages():
+    pipeline = [{'$match': {'status': 'pending'}}, {'$group': {'_id': '$business_id', 'n': {'$sum': 1}}}]
+    assert query_shape(pipeline) == [{'$match': {'status': '?'}}, {'$group': {'_id': '?', 'n': {'$sum': '?'}}}]
+    assert query_shape({'a': {'b': {'c': {'d': {'e': {'f': 1}}}}}}) == {'a': {'b': {'c': {'d': {'e': '...'}}}}}
+
+
+def test_command_collection_and_shape():
+    find = {'find': 'orders', 'filter': {'status': 'pending'}}
+    update = {'update': 'orders', 'updates': [{'q': {'id': 'o1'}, 'u': {'$set': {'x': 1}}}]}
+    assert command_collection('find', find) == 'orders'
+    assert command_collection('getMore', {'getMore': 123, 'collection': 'orders'}) == 'orders'
+    assert command_shape('find', find) == {'status': '?'}
+    assert command_shape('update', update) == {'id': '?'}  # first statement's filter only
+    assert command_shape('insert', {'insert': 'orders', 'documents': [{}]}) is None
+
+
+def _event(request_id, name='find', command=None, duration_ms=1.0):
+    return SimpleNamespace(
+        request_id=request_id,
+        command_name=name,
+        command=command or {name: 'orders', 'filter': {'id': 'o1'}},
+        database_name='gelis_db',
+        duration_micros=int(duration_ms * 1000)
+    )
+
+
+def test_listener_aggregates_and_records_slow_queries():
+    listener = DbCommandListener(slow_query_ms=50)
+    for i, duration in enumerate([5, 10, 120]):
+        listener.started(_event(i))
+        listener.succeeded(_event(i, duration_ms=duration))
+    listener.started(_event(9, name='ping', command={'ping': 1}))
+    listener.succeeded(_event(9, name='ping', command={'ping': 1}))
+
+    stats = listener.stats()
+    assert stats['top_commands'] == [
+        {'collection': 'orders', 'command': 'find', 'count': 3, 'total_ms': 135.0, 'avg_ms': 45.0}
+    ]
+    (slow,) = stats['slow_queries']
+    assert slow['duration_ms'] == 120.0
+    assert slow['collection'] == 'gelis_db.orders'
+    assert slow['shape'] == {'id': '?'}
+    assert slow['failed'] is False
+
+
+def test_middleware_adds_per_request_headers():
+    listener = DbCommandListener(slow_query_ms=1000)
+
+    async def app(scope, receive, send):
+        # Commands issued while serving this request
+        for i, duration in enumerate([2.5, 4.0]):
+            listener.started(_event(i))
+            listener.succeeded(_event(i, duration_ms=duration))
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [(b'content-type', b'text/plain')]})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(DbStatsMiddleware(app)({'type': 'http', 'method': 'GET', 'path': '/api/orders'}, None, send))
+    headers = dict(sent[0]['headers'])
+    assert headers[b'x-db-calls'] == b'2'
+    assert headers[b'x-db-time'] == b'6.5'
+    assert headers[b'content-type'] == b'text/plain'
+
+
+def test_listener_counts_are_exact_across_threads():
+    listener = DbCommandListener(slow_query_ms=0.5)
+    threads, per_thread = 8, 500
+
+    def run_commands(offset):
+        for i in range(per_thread):
+            request_id = offset * per_thread + i
+            listener.started(_event(request_id))
+            listener.succeeded(_event(request_id, duration_ms=1.0))
+
+    workers = [threading.Thread(target=run_commands, args=(n,)) for n in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    (find,) = listener.stats()['top_commands']
+    assert find['count'] == threads * per_thread
+    assert find['total_ms'] == threads * per_thread * 1.0
+    assert len(listener.stats()['slow_queries']) == MAX_SLOW_QUERIES
+
+
+def test_commands_outside_requests_are_not_attributed():
+    listener = DbCommandListener(slow_query_ms=0)
+    listener.started(_event(1))
+    listener.succeeded(_event(1, duration_ms=3))
+    assert listener.stats()['slow_queries'][0]['route'] is None
@@ -0,0 +1,120 @@
+"""
+Unit tests for error fingerprinting and capture - backend/utils/error_tracking.py
+Run: python -m pytest -q test_error_tracking.py
+"""
+import asyncio
+
+import pytest
+
+from utils.error_tracking import (
+    LEVEL_ERROR, SERVER_ERROR_ACTION, ErrorCaptureMiddleware, build_error_records,
+    fingerprint_exception, route_template
+)
+
+
+def _lookup(data, key):
+    return data[key]
+
+
+def _handler_a(key):
+    return _lookup({}, key)
+
+
+def _handler_b(key):
+    return _lookup({}, key)
+
+
+def _raise(func, *args):
+    try:
+        func(*args)
+    except Exception as exc:
+        return exc
+
+
+def test_same_call_path_same_fingerprint():
+    # Different messages (keys), same type and stack
+    first = fingerprint_exception(_raise(_handler_a, 'x'))
+    assert first == fingerprint_exception(_raise(_handler_a, 'y'))
+    assert len(first) == 16
+
+
+def test_fingerprint_ignores_line_numbers():
+    # Defined on a different line, same file and function names
+    exec_globals = {'_lookup': _lookup, '__name__': __name__}
+    exec(compile('\n' * 40 + 'def _handler_a(key):\n    return _lookup({}, key)\n', __file__, 'exec'), exec_globals)
+    assert fingerprint_exception(_raise(exec_globals['_handler_a'], 'x')) == fingerprint_exception(_raise(_handler_a, 'x'))
+
+
+def test_different_path_or_type_different_fingerprint():
+    base = fingerprint_exception(_raise(_handler_a, 'x'))
+    assert fingerprint_exception(_raise(_handler_b, 'x')) != base
+    assert fingerprint_exception(_raise(lambda: [][1])) != base
+
+
+class FakeRoute:
+    path = '/api/orders/{order_id}'
+
+
+def test_route_template_prefers_the_route_path():
+    assert route_template({'route': FakeRoute(), 'path': '/api/orders/123'}) == '/api/orders/{order_id}'
+    assert route_template({'path': '/api/unknown'}) == '/api/unknown'
+
+
+def test_error_records():
+    exc = _raise(_handler_a, 'x')
+    log_entry, group_update = build_error_records(exc, 'GET', '/api/orders/{order_id}', '/api/orders/1', 12.34, 'u1')
+    fingerprint = fingerprint_exception(exc)
+
+    assert log_entry['level'] == LEVEL_ERROR
+    assert log_entry['action'] == SERVER_ERROR_ACTION
+    assert log_entry['related_id'] == fingerprint
+    assert log_entry['metadata']['latency_ms'] == 12.3
+    assert log_entry['metadata']['route'] == '/api/orders/{order_id}'
+
+    update = group_update._doc
+    assert group_update._filter == {'_id': fingerprint}
+    assert update['$inc'] == {'count': 1}
+    assert update['$setOnInsert']['exception_type'] == 'KeyError'
+    assert 'Traceback' in update['$setOnInsert']['traceback']
+
+
+class FakeWriter:
+    def __init__(self):
+        self.inserted = []
+        self.enqueued = []
+
+    def insert(self, collection, doc):
+        self.inserted.append((collection, doc))
+
+    def enqueue(self, collection, operation):
+        self.enqueued.append((collection, operation))
+
+
+def test_middleware_records_and_reraises():
+    async def app(scope, receive, send):
+        _handler_a('missing')
+
+    writer = FakeWriter()
+    middleware = ErrorCaptureMiddleware(app, writer=writer)
+    scope = {'type': 'http', 'method': 'POST', 'path': '/api/orders/9', 'route': FakeRoute()}
+    with pytest.raises(KeyError):
+        asyncio.run(middleware(scope, None, None))
+
+    (collection, entry), = writer.inserted
+    assert collection == 'activity_logs'
+    assert entry['description'].startswith('POST /api/orders/{order_id}: KeyError')
+    assert [c for c, _ in writer.enqueued] == ['error_groups']
+
+
+def test_middleware_passes_through_success_and_non_http():
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append(scope['type'])
+
+    writer = FakeWriter()
+    middleware = ErrorCaptureMiddleware(app, writer=writer)
+    asyncio.run(middleware({'type': 'http', 'path': '/'}, None, None))
+    asyncio.run(middleware({'type': 'lifespan'}, None, None))
+    assert calls == ['http', 'lifespan']
+    assert writer.inserted == [] and writer.enqueued == []
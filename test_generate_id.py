@@ -0,0 +1,47 @@
+"""
+Unit tests for time-ordered document ids - backend/utils/helpers.py
+Run: python -m pytest -q test_generate_id.py
+"""
+import time
+import uuid
+
+import utils.helpers as helpers
+from utils.helpers import generate_id
+
+
+def test_ids_are_uuid_version_7():
+    value = uuid.UUID(generate_id())
+    assert value.version == 7
+    assert value.variant == uuid.RFC_4122
+    assert len(str(value)) == 36
+
+
+def test_ids_embed_current_millisecond():
+    before = time.time_ns() // 1_000_000
+    ms = uuid.UUID(generate_id()).int >> 80
+    after = time.time_ns() // 1_000_000
+    assert before <= ms <= after + 1  # +1: a same-ms sequence overflow moves to the next ms
+
+
+def test_ids_increase_within_the_same_millisecond():
+    ids = [generate_id() for _ in range(5000)]
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+
+
+def test_ids_stay_monotonic_when_clock_goes_back(monkeypatch):
+    first = generate_id()
+    now_ns = time.time_ns()
+    monkeypatch.setattr(helpers.time, 'time_ns', lambda: now_ns - 5_000_000_000)
+    assert generate_id() > first
+
+
+def test_sequence_overflow_moves_to_next_millisecond(monkeypatch):
+    # Generator state is restored afterwards, so later ids follow the real clock again
+    monkeypatch.setattr(helpers, '_last_id_ms', helpers._last_id_ms)
+    monkeypatch.setattr(helpers, '_last_id_seq', helpers._last_id_seq)
+    frozen = time.time_ns() + 10_000_000_000  # ahead of any id issued so far
+    monkeypatch.setattr(helpers.time, 'time_ns', lambda: frozen)
+    ids = [generate_id() for _ in range(0x1000 + 10)]
+    assert ids == sorted(ids)
+    assert uuid.UUID(ids[-1]).int >> 80 == frozen // 1_000_000 + 1
@@ -0,0 +1,116 @@
+"""
+Unit tests for request metrics - backend/utils/metrics.py
+Run: python -m pytest -q test_metrics.py
+"""
+import asyncio
+
+import pytest
+
+from utils.metrics import (
+    LATENCY_BUCKETS, UNMATCHED_ROUTE, MetricsMiddleware, MetricsRegistry, RouteStats, histogram_quantile
+)
+
+
+def test_route_stats_buckets_and_errors():
+    stats = RouteStats()
+    for seconds in (0.0005, 0.003, 0.003, 20.0):
+        stats.observe(200, seconds)
+    stats.observe(503, 0.2)
+    assert stats.count == 5
+    assert stats.errors == 1
+    assert stats.buckets[0] == 1  # <= 1ms
+    assert stats.buckets[LATENCY_BUCKETS.index(0.005)] == 2
+    assert stats.buckets[-1] == 1  # +Inf
+    assert dict(stats.statuses) == {200: 4, 503: 1}
+
+
+def test_histogram_quantile():
+    assert histogram_quantile(0.5, [0] * (len(LATENCY_BUCKETS) + 1)) is None
+    buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+    buckets[LATENCY_BUCKETS.index(0.1)] = 100  # all requests in (0.05, 0.1]
+    assert histogram_quantile(0.5, buckets) == pytest.approx(0.075)
+    assert 0.05 < histogram_quantile(0.95, buckets) <= 0.1
+    buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+    buckets[-1] = 10
+    assert histogram_quantile(0.99, buckets) == LATENCY_BUCKETS[-1]
+
+
+def test_prometheus_rendering():
+    registry = MetricsRegistry()
+    registry.observe('GET', '/api/orders/{order_id}', 200, 0.004)
+    registry.observe('GET', '/api/orders/{order_id}', 404, 0.02)
+    registry.observe('POST', '/api/say "hi"', 500, 1.5)
+    text = registry.render_prometheus()
+    lines = text.splitlines()
+
+    assert text.endswith('\n')
+    assert '# TYPE http_request_duration_seconds histogram' in lines
+    assert 'http_requests_total{method="GET",route="/api/orders/{order_id}",status="200"} 1' in lines
+    assert 'http_requests_total{method="GET",route="/api/orders/{order_id}",status="404"} 1' in lines
+    assert 'http_requests_total{method="POST",route="/api/say \\"hi\\"",status="500"} 1' in lines
+
+    labels = 'method="GET",route="/api/orders/{order_id}"'
+    buckets = [l for l in lines if l.startswith(f'http_request_duration_seconds_bucket{{{labels},')]
+    counts = [int(l.rsplit(' ', 1)[1]) for l in buckets]
+    assert counts == sorted(counts)  # cumulative
+    assert f'http_request_duration_seconds_bucket{{{labels},le="0.005"}} 1' in lines
+    assert f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in lines
+    assert f'http_request_duration_seconds_count{{{labels}}} 2' in lines
+
+
+def test_summary():
+    registry = MetricsRegistry()
+    for _ in range(9):
+        registry.observe('GET', '/api/fast', 200, 0.002)
+    registry.observe('GET', '/api/slow', 500, 2.0)
+    summary = registry.summary()
+    assert summary['requests_total'] == 10
+    assert summary['requests_per_min'] == 10
+    assert summary['error_rate'] == 10.0
+    assert summary['slowest_routes'][0]['route'] == 'GET /api/slow'
+
+
+class FakeRoute:
+    def __init__(self, path):
+        self.path = path
+
+
+def _run(registry, scope, app_status=200, matched_route=None):
+    async def app(scope, receive, send):
+        if matched_route:
+            scope['route'] = FakeRoute(matched_route)  # what the router sets on a match
+        await send({'type': 'http.response.start', 'status': app_status, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def send(message):
+        pass
+
+    asyncio.run(MetricsMiddleware(app, registry=registry)({'type': 'http', **scope}, None, send))
+
+
+def test_middleware_uses_route_template():
+    registry = MetricsRegistry()
+    _run(registry, {'method': 'GET', 'path': '/api/orders/1'}, matched_route='/api/orders/{order_id}')
+    _run(registry, {'method': 'GET', 'path': '/api/orders/2'}, matched_route='/api/orders/{order_id}')
+    assert registry.routes[('GET', '/api/orders/{order_id}')].count == 2
+    assert registry.in_flight == 0
+
+
+def test_unmatched_paths_share_one_series():
+    registry = MetricsRegistry()
+    for path in ('/wp-login.php', '/.env', '/api/nope/123'):
+        _run(registry, {'method': 'GET', 'path': path}, app_status=404)
+    assert list(registry.routes) == [('GET', UNMATCHED_ROUTE)]
+    assert registry.routes[('GET', UNMATCHED_ROUTE)].statuses[404] == 3
+
+
+def test_exception_counts_as_500():
+    registry = MetricsRegistry()
+
+    async def app(scope, receive, send):
+        raise RuntimeError('boom')
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(MetricsMiddleware(app, registry=registry)({'type': 'http', 'method': 'GET', 'path': '/x'}, None, None))
+    assert registry.routes[('GET', UNMATCHED_ROUTE)].errors == 1
+    assert registry.in_flight == 0
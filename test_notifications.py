@@ -0,0 +1,214 @@
+"""
+Unit tests for the notification inbox counters - backend/utils/notifications.py
+The badge (counters) must always agree with the inbox (documents), also
+across a read-all that lands between reserving a broadcast seq and
+storing the broadcast.
+Run: python -m pytest -q test_notifications.py
+"""
+import random
+from datetime import timedelta
+
+from fake_mongo import FakeDatabase, run
+from utils.helpers import utc_now
+from utils.notifications import (
+    BROADCAST_MANAGER, REBUILD_INTERVAL, backfill_broadcast_seq, build_notification, get_inbox,
+    get_unread_count, mark_all_read, mark_read, rebuild_unread_count, send_notifications
+)
+
+ALICE = {'id': 'alice'}
+BOB = {'id': 'bob'}
+
+
+class QueueWriter:
+    """Holds queued writes until flush(), like the background writer between flushes"""
+
+    def __init__(self):
+        self.docs = []
+        self.ops = []
+
+    def insert_many(self, collection, docs):
+        self.docs.extend((collection, doc.copy()) for doc in docs)
+
+    def enqueue(self, collection, operation):
+        self.ops.append((collection, operation))
+
+    async def flush(self, db):
+        for collection, doc in self.docs:
+            await db[collection].insert_one(doc)
+        for collection, op in self.ops:
+            await db[collection].bulk_write([op])
+        self.docs, self.ops = [], []
+
+
+def personal(user, title='t'):
+    return build_notification(user['id'], title, 'pesan')
+
+
+def broadcast(title='b'):
+    return build_notification(BROADCAST_MANAGER, title, 'pesan')
+
+
+async def inbox_unread(db, user):
+    return sum(not n['is_read'] for n in await get_inbox(db, user))
+
+
+async def assert_consistent(db, user, expected):
+    """Counter badge == fresh recount == unread rows in the inbox"""
+    assert await get_unread_count(db, user) == expected
+    assert await inbox_unread(db, user) == expected
+    assert len(await get_inbox(db, user, unread_only=True)) == expected
+    assert (await rebuild_unread_count(db, user))['unread_total'] == expected
+    assert await get_unread_count(db, user) == expected
+
+
+def test_personal_send_mark_read_mark_all_read_rebuild():
+    async def scenario():
+        db = FakeDatabase()
+        docs = [personal(ALICE), personal(ALICE), personal(ALICE), personal(BOB)]
+        await send_notifications(db, docs)
+        await assert_consistent(db, ALICE, 3)
+        await assert_consistent(db, BOB, 1)
+
+        assert await mark_read(db, ALICE, docs[0]['id'])
+        assert await mark_read(db, ALICE, docs[0]['id'])  # second read is a no-op
+        await assert_consistent(db, ALICE, 2)
+        assert not await mark_read(db, ALICE, docs[3]['id'])  # Bob's, not in Alice's inbox
+
+        assert await mark_all_read(db, ALICE) == 2
+        await assert_consistent(db, ALICE, 0)
+        await assert_consistent(db, BOB, 1)
+
+        await send_notifications(db, [personal(ALICE)])
+        await assert_consistent(db, ALICE, 1)
+    run(scenario())
+
+
+def test_broadcast_send_mark_read_mark_all_read_rebuild():
+    async def scenario():
+        db = FakeDatabase()
+        docs = [broadcast('b1'), broadcast('b2'), broadcast('b3')]
+        await send_notifications(db, docs)
+        assert [d['seq'] for d in db.notifications.docs] == [1, 2, 3]
+        assert 'seq' not in docs[0]  # caller's documents untouched
+        await assert_consistent(db, ALICE, 3)
+
+        assert await mark_read(db, ALICE, docs[1]['id'])
+        assert await mark_read(db, ALICE, docs[1]['id'])
+        await assert_consistent(db, ALICE, 2)
+        await assert_consistent(db, BOB, 3)  # broadcast reads are per user
+
+        await mark_all_read(db, ALICE)
+        await assert_consistent(db, ALICE, 0)
+        assert db.notification_reads.docs == []  # markers under the watermark dropped
+
+        assert await mark_read(db, ALICE, docs[0]['id'])  # already covered by read-all
+        await assert_consistent(db, ALICE, 0)
+
+        await send_notifications(db, [broadcast('b4'), personal(ALICE)])
+        await assert_consistent(db, ALICE, 2)
+        await assert_consistent(db, BOB, 4)
+    run(scenario())
+
+
+def test_broadcast_landing_after_read_all_stays_unread():
+    async def scenario():
+        db = FakeDatabase()
+        writer = QueueWriter()
+        await send_notifications(db, [broadcast('b1')])
+        await send_notifications(db, [broadcast('late')], writer=writer)  # seq 2 reserved, not stored
+
+        await mark_all_read(db, ALICE)
+        assert await get_unread_count(db, ALICE) == 0  # counted once it is stored
+        await writer.flush(db)
+        await assert_consistent(db, ALICE, 1)
+
+        late = next(d for d in db.notifications.docs if d['title'] == 'late')
+        await mark_read(db, ALICE, late['id'])
+        await assert_consistent(db, ALICE, 0)
+    run(scenario())
+
+
+def test_lost_broadcast_is_dropped_by_the_periodic_rebuild():
+    async def scenario():
+        db = FakeDatabase()
+        await send_notifications(db, [broadcast('b1')])
+        await mark_all_read(db, ALICE)
+        await get_unread_count(db, ALICE)
+        await send_notifications(db, [broadcast('lost')], writer=QueueWriter())  # never flushed
+        assert await get_unread_count(db, ALICE) == 0  # not stored, not counted
+        await send_notifications(db, [broadcast('b3')])
+        assert await get_unread_count(db, ALICE) == 2  # the gap below seq 3 still counts
+
+        stale = (utc_now() - REBUILD_INTERVAL - timedelta(seconds=1)).isoformat()
+        await db.notification_counters.update_one({'_id': 'alice'}, {'$set': {'rebuilt_at': stale}})
+        await assert_consistent(db, ALICE, 1)
+    run(scenario())
+
+
+def test_counter_mismatch_triggers_rebuild():
+    async def scenario():
+        db = FakeDatabase()
+        await send_notifications(db, [broadcast(), personal(ALICE)])
+        await get_unread_count(db, ALICE)
+        await db.notification_counters.update_one({'_id': 'alice'}, {'$inc': {'unread': -5}})
+        assert await get_unread_count(db, ALICE) == 2
+    run(scenario())
+
+
+def test_random_interleavings_keep_badge_and_inbox_in_step():
+    async def scenario(seed):
+        rng = random.Random(seed)
+        db = FakeDatabase()
+        writer = QueueWriter()
+        for _ in range(60):
+            action = rng.choice(['personal', 'broadcast', 'queued', 'flush', 'read', 'read_all', 'count'])
+            user = rng.choice([ALICE, BOB])
+            if action == 'personal':
+                await send_notifications(db, [personal(user)])
+            elif action == 'broadcast':
+                await send_notifications(db, [broadcast() for _ in range(rng.randint(1, 3))])
+            elif action == 'queued':
+                await send_notifications(db, [broadcast(), personal(user)], writer=writer)
+            elif action == 'flush':
+                await writer.flush(db)
+            elif action == 'read':
+                inbox = await get_inbox(db, user)
+                if inbox:
+                    await mark_read(db, user, rng.choice(inbox)['id'])
+            elif action == 'read_all':
+                await mark_all_read(db, user)
+            else:
+                await get_unread_count(db, user)
+        await writer.flush(db)
+        for user in (ALICE, BOB):
+            assert await get_unread_count(db, user) == await inbox_unread(db, user)
+            assert (await rebuild_unread_count(db, user))['unread_total'] == await inbox_unread(db, user)
+
+    for seed in range(20):
+        run(scenario(seed))
+
+
+def test_backfill_numbers_legacy_broadcasts_and_their_markers():
+    async def scenario():
+        db = FakeDatabase()
+        old = [broadcast('old1'), broadcast('old2')]
+        old[0]['created_at'], old[1]['created_at'] = '2025-01-01T00:00:00', '2025-01-02T00:00:00'
+        await db.notifications.insert_many(list(reversed(old)))
+        await db.notification_counters.insert_one({'_id': 'broadcast_seq', 'seq': 2, 'version': 2})
+        await db.notification_counters.insert_one({
+            '_id': 'alice', 'unread': 0, 'broadcast_seq_read': 0, 'broadcast_read_count': 1,
+            'broadcast_read_at': '', 'rebuilt_at': utc_now().isoformat(), 'version': 3
+        })
+        await db.notification_reads.insert_one({'user_id': 'alice', 'notification_id': old[1]['id']})
+
+        assert await backfill_broadcast_seq(db) == 2
+        seqs = {d['title']: d['seq'] for d in db.notifications.docs}
+        assert seqs == {'old1': 1, 'old2': 2}
+        assert db.notification_reads.docs[0]['notification_seq'] == 2
+        assert 'rebuilt_at' not in await db.notification_counters.find_one({'_id': 'alice'})
+        await assert_consistent(db, ALICE, 1)
+
+        assert await backfill_broadcast_seq(db) == 0
+        await send_notifications(db, [broadcast('new')])
+        assert max(d['seq'] for d in db.notifications.docs) == 3
+    run(scenario())
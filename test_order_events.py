@@ -0,0 +1,31 @@
+"""
+Unit tests for the append-only order event log - backend/utils/order_events.py
+Run: python -m pytest -q test_order_events.py
+"""
+from utils.order_events import ORDER_STATUS_CHANGED, build_order_event, token_actor
+
+
+def test_event_keeps_actor_id_and_display_name_only():
+    actor = {'id': 'u1', 'full_name': 'Teknisi Satu', 'username': 'teknisi1', 'password_hash': 'x'}
+    event = build_order_event('o1', ORDER_STATUS_CHANGED, actor, {'from': 'pending', 'to': 'processing'})
+    assert event['order_id'] == 'o1'
+    assert event['type'] == ORDER_STATUS_CHANGED
+    assert event['actor'] == {'id': 'u1', 'name': 'Teknisi Satu'}
+    assert event['payload'] == {'from': 'pending', 'to': 'processing'}
+    assert event['id'] and event['ts']
+
+
+def test_event_without_actor_or_payload():
+    event = build_order_event('o1', 'created')
+    assert event['actor'] is None
+    assert event['payload'] == {}
+
+
+def test_token_actor_falls_back_to_username():
+    actor = token_actor({'sub': 'u2', 'username': 'kasir1', 'role_id': 5})
+    assert build_order_event('o1', 'note_added', actor)['actor'] == {'id': 'u2', 'name': 'kasir1'}
+
+
+def test_events_of_one_order_sort_by_creation():
+    events = [build_order_event('o1', 'note_added') for _ in range(50)]
+    assert sorted(events, key=lambda e: (e['ts'], e['id'])) == events
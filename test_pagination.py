@@ -0,0 +1,98 @@
+"""
+Unit tests for keyset (cursor) pagination - backend/utils/pagination.py
+Run: python -m pytest -q test_pagination.py
+"""
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from utils.pagination import (
+    MAX_PAGE_SIZE, decode_cursor, encode_cursor, fetch_keyset_page, keyset_query, keyset_sort
+)
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+        self.limit_value = None
+
+    def sort(self, keys):
+        for field, direction in reversed(keys):
+            self.docs.sort(key=lambda d: d[field], reverse=direction < 0)
+        return self
+
+    def limit(self, value):
+        self.limit_value = value
+        return self
+
+    async def to_list(self, length):
+        return self.docs[:length]
+
+
+class FakeCollection:
+    """Sort/limit only; the keyset predicate itself is covered by keyset_query tests"""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.cursor = None
+
+    def find(self, query, projection):
+        self.cursor = FakeCursor(list(self.docs))
+        return self.cursor
+
+
+def test_cursor_round_trip():
+    doc = {'id': 'abc-123', 'created_at': '2025-01-15T10:00:00+00:00'}
+    token = encode_cursor(doc)
+    assert '=' not in token  # padding stripped, URL safe
+    assert decode_cursor(token) == ('2025-01-15T10:00:00+00:00', 'abc-123')
+
+
+def test_cursor_encodes_datetime_and_custom_field():
+    ts = datetime(2025, 1, 15, 10, 0, tzinfo=timezone.utc)
+    token = encode_cursor({'id': 'e1', 'ts': ts}, sort_field='ts')
+    assert decode_cursor(token) == (ts.isoformat(), 'e1')
+
+
+@pytest.mark.parametrize('token', ['not-base64!!', 'bnVsbA', encode_cursor({'id': 'x', 'created_at': None})])
+def test_invalid_cursor_is_400(token):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(token)
+    assert exc.value.status_code == 400
+
+
+def test_keyset_query_without_cursor_is_unchanged():
+    query = {'business_id': 'b1'}
+    assert keyset_query(query, None) is query
+
+
+def test_keyset_query_seeks_past_cursor():
+    token = encode_cursor({'id': 'id-5', 'created_at': '2025-01-05'})
+    seek = {'$or': [
+        {'created_at': {'$lt': '2025-01-05'}},
+        {'created_at': '2025-01-05', 'id': {'$lt': 'id-5'}}
+    ]}
+    assert keyset_query({}, token) == seek
+    assert keyset_query({'status': 'pending'}, token) == {'$and': [{'status': 'pending'}, seek]}
+    assert keyset_sort() == [('created_at', -1), ('id', -1)]
+
+
+def _docs(n):
+    return [{'id': f'id-{i:03d}', 'created_at': f'2025-01-{i % 28 + 1:02d}'} for i in range(n)]
+
+
+@pytest.mark.parametrize('requested, expected', [(0, 1), (-5, 1), (10, 10), (10_000, MAX_PAGE_SIZE)])
+def test_page_limit_is_clamped(requested, expected):
+    collection = FakeCollection(_docs(MAX_PAGE_SIZE + 10))
+    items, next_cursor = asyncio.run(fetch_keyset_page(collection, {}, requested))
+    assert len(items) == expected
+    assert collection.cursor.limit_value == expected + 1  # one look-ahead row
+    assert next_cursor == encode_cursor(items[-1])
+
+
+def test_last_page_has_no_cursor():
+    items, next_cursor = asyncio.run(fetch_keyset_page(FakeCollection(_docs(3)), {}, 10))
+    assert len(items) == 3
+    assert next_cursor is None
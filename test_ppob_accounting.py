@@ -0,0 +1,134 @@
+"""
+Unit tests for PPOB journals and period closing - backend/utils/ppob_accounting.py
+Run: python -m pytest -q test_ppob_accounting.py
+"""
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from fake_mongo import FakeDatabase, run
+from models import PPOBKasirReportCreate, SetoranLoketEntry, TopupSaldoEntry
+from utils.helpers import utc_now
+from utils.ppob_accounting import (
+    build_ppob_journal_entry, build_ppob_kasir_report, close_ppob_period, ensure_ppob_period_open,
+    ppob_period_bounds, reopen_ppob_period
+)
+
+
+def entry(tanggal, debit, kredit, amount):
+    return build_ppob_journal_entry(tanggal, 'test', debit, kredit, amount, 'loket_shift', 'r1', 'u1')
+
+
+def seeded_db():
+    db = FakeDatabase()
+    db.ppob_journal_entries.docs = [
+        entry('2024-01-10T08:00:00', 'Piutang Setoran Loket', 'Pendapatan PPOB', 100.0),
+        entry('2024-01-31T23:59:59', 'Kas', 'Piutang Setoran Loket', 60.0),
+        entry('2024-02-01T00:00:00', 'Piutang Setoran Loket', 'Pendapatan PPOB', 50.0),
+        entry('2024-02-15T12:00:00', 'Kas', 'Piutang Setoran Loket', 90.0),
+        entry('2024-03-01T00:00:00', 'Kas', 'Pendapatan Admin', 5.0),
+    ]
+    return db
+
+
+def accounts(closing):
+    return {acc['account_name']: acc for acc in closing['accounts']}
+
+
+def test_period_bounds_roll_over_december():
+    assert ppob_period_bounds(2024, 12) == ('2024-12', '2024-12-01T00:00:00', '2025-01-01T00:00:00')
+    assert ppob_period_bounds(2024, 2) == ('2024-02', '2024-02-01T00:00:00', '2024-03-01T00:00:00')
+
+
+@pytest.mark.parametrize('month', [0, 13])
+def test_period_bounds_reject_invalid_month(month):
+    with pytest.raises(HTTPException) as exc:
+        ppob_period_bounds(2024, month)
+    assert exc.value.status_code == 400
+
+
+def test_kasir_report_posts_only_non_zero_amounts():
+    report = PPOBKasirReportCreate(
+        business_id='b1',
+        tanggal=datetime(2024, 1, 5),
+        setoran_loket=[SetoranLoketEntry(loket_report_id='s1', nama_petugas='Ani', shift=1, amount=70, waktu='Pagi')],
+        penerimaan_admin=5,
+        topup_saldo=[TopupSaldoEntry(channel_name='BRIS', amount=200)]
+    )
+    doc, entries, settled = build_ppob_kasir_report(report, 'u1')
+    assert [(e['debit_account'], e['kredit_account'], e['debit_amount']) for e in entries] == [
+        ('Kas', 'Piutang Setoran Loket', 70),
+        ('Kas', 'Pendapatan Admin', 5),
+        ('Modal Saldo PPOB', 'Kas', 200),
+    ]
+    assert all(e['reference_id'] == doc['id'] and e['tanggal'] == '2024-01-05T00:00:00' for e in entries)
+    assert settled == ['s1']
+    assert doc['total_setoran_loket'] == 70 and doc['total_topup'] == 200
+
+    _, _, settled = build_ppob_kasir_report(PPOBKasirReportCreate(business_id='b1', tanggal=datetime(2024, 1, 5)), 'u1')
+    assert settled == []
+
+
+def test_first_closing_sums_everything_before_period_end():
+    db = seeded_db()
+    closing = run(close_ppob_period(db, 2024, 1, 'u1'))
+    assert closing['period'] == '2024-01' and closing['previous_period'] is None
+    assert closing['entries_in_period'] == 2  # each entry is counted on its debit and kredit side
+    piutang = accounts(closing)['Piutang Setoran Loket']
+    assert (piutang['debit_total'], piutang['kredit_total'], piutang['balance']) == (100.0, 60.0, 40.0)
+    assert db.ppob_period_closings.docs[0]['period_end'] == '2024-02-01T00:00:00'
+
+
+def test_next_closing_merges_onto_the_checkpoint():
+    db = seeded_db()
+    run(close_ppob_period(db, 2024, 1, 'u1'))
+    db.ppob_journal_entries.docs[0]['debit_amount'] = 999.0  # closed entries are not scanned again
+
+    closing = run(close_ppob_period(db, 2024, 2, 'u1'))
+    assert closing['previous_period'] == '2024-01'
+    assert closing['entries_in_period'] == 2
+    by_name = accounts(closing)
+    assert by_name['Piutang Setoran Loket']['debit_total'] == 150.0
+    assert by_name['Piutang Setoran Loket']['kredit_total'] == 150.0
+    assert by_name['Piutang Setoran Loket']['entry_count'] == 4
+    assert by_name['Kas']['balance'] == 150.0
+    assert 'Pendapatan Admin' not in by_name  # March entry is outside the period
+
+
+def test_unfinished_period_cannot_be_closed():
+    now = utc_now()
+    with pytest.raises(HTTPException) as exc:
+        run(close_ppob_period(FakeDatabase(), now.year, now.month, 'u1'))
+    assert exc.value.status_code == 400
+    assert 'belum berakhir' in exc.value.detail
+
+
+@pytest.mark.parametrize('month', [1, 2])
+def test_period_covered_by_a_closing_cannot_be_closed_again(month):
+    db = seeded_db()
+    run(close_ppob_period(db, 2024, 2, 'u1'))
+    with pytest.raises(HTTPException) as exc:
+        run(close_ppob_period(db, 2024, month, 'u1'))
+    assert exc.value.status_code == 400
+    assert 's/d 2024-02' in exc.value.detail
+    assert len(db.ppob_period_closings.docs) == 1
+
+
+def test_postings_into_closed_period_are_rejected():
+    db = seeded_db()
+    run(close_ppob_period(db, 2024, 1, 'u1'))
+    with pytest.raises(HTTPException) as exc:
+        run(ensure_ppob_period_open(db, datetime(2024, 1, 31, 23, 0)))
+    assert exc.value.status_code == 400
+    run(ensure_ppob_period_open(db, datetime(2024, 2, 1)))
+
+
+def test_only_latest_closing_can_be_reopened():
+    db = seeded_db()
+    run(close_ppob_period(db, 2024, 1, 'u1'))
+    run(close_ppob_period(db, 2024, 2, 'u1'))
+    with pytest.raises(HTTPException):
+        run(reopen_ppob_period(db, '2024-01'))
+    assert run(reopen_ppob_period(db, '2024-02'))['period'] == '2024-02'
+    assert [c['period'] for c in db.ppob_period_closings.docs] == ['2024-01']
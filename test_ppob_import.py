@@ -0,0 +1,119 @@
+"""
+Unit tests for PPOB bulk import - backend/utils/ppob_import.py
+Run: python -m pytest -q test_ppob_import.py
+"""
+import csv
+import json
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from fake_mongo import FakeDatabase, run
+from models import PPOBKasirReportCreate, PPOBLoketShiftImport
+from utils.ppob_import import import_ppob_records, parse_ppob_csv, validate_ppob_records
+
+CHANNELS = json.dumps([{'channel_name': 'BRIS', 'saldo_awal': 500, 'total_penjualan': 100}])
+
+
+def shift(import_ref=None, business_id='b1', day=10, shift_no=1):
+    return PPOBLoketShiftImport(
+        business_id=business_id,
+        tanggal=datetime(2024, 3, day),
+        shift=shift_no,
+        nama_petugas='Ani',
+        channels=[{'channel_name': 'BRIS', 'saldo_awal': 500, 'total_penjualan': 100}],
+        import_ref=import_ref
+    )
+
+
+def kasir(loket_report_id, business_id='b1', day=10):
+    return PPOBKasirReportCreate(
+        business_id=business_id,
+        tanggal=datetime(2024, 3, day),
+        setoran_loket=[{'loket_report_id': loket_report_id, 'nama_petugas': 'Ani', 'shift': 1, 'amount': 100, 'waktu': 'Pagi'}]
+    )
+
+
+def test_csv_list_columns_are_json():
+    text = f'business_id,tanggal,shift,nama_petugas,channels,catatan\nb1,2024-03-10,1,Ani,"{CHANNELS.replace(chr(34), chr(34) * 2)}",\n'
+    records = parse_ppob_csv(text)
+    assert records == [{'business_id': 'b1', 'tanggal': '2024-03-10', 'shift': '1', 'nama_petugas': 'Ani',
+                        'channels': json.loads(CHANNELS)}]  # empty columns dropped
+    valid, errors = validate_ppob_records(records, PPOBLoketShiftImport)
+    assert errors == [] and valid[0].channels[0].channel_name == 'BRIS'
+
+
+def test_invalid_json_cell_is_400_with_row_index():
+    text = 'business_id,channels\nb1,[]\nb2,[{broken\n'
+    with pytest.raises(HTTPException) as exc:
+        parse_ppob_csv(text)
+    assert exc.value.status_code == 400
+    assert exc.value.detail['index'] == 1
+    assert 'channels' in exc.value.detail['error']
+
+
+def test_csv_reader_error_is_400_with_row_index():
+    limit = csv.field_size_limit()
+    csv.field_size_limit(20)
+    try:
+        with pytest.raises(HTTPException) as exc:
+            parse_ppob_csv('business_id,catatan\nb1,ok\nb2,' + 'x' * 50 + '\n')
+    finally:
+        csv.field_size_limit(limit)
+    assert exc.value.status_code == 400
+    assert exc.value.detail['index'] == 1
+
+
+def test_import_ref_links_setoran_to_shift_in_same_batch():
+    db = FakeDatabase()
+    summary = run(import_ppob_records(db, [shift('A'), shift('B', shift_no=2)], [kasir('A')], 'u1'))
+
+    shifts = {doc['id']: doc for doc in db.ppob_loket_shifts.docs}
+    assert set(summary['import_refs']) == {'A', 'B'}
+    settled_id = summary['import_refs']['A']
+    assert shifts[settled_id]['status_setoran'] == 'Lunas'
+    assert shifts[summary['import_refs']['B']]['status_setoran'] == 'Belum Disetor'
+    assert db.ppob_kasir_reports.docs[0]['setoran_loket'][0]['loket_report_id'] == settled_id
+    assert all('import_ref' not in doc for doc in shifts.values())
+
+    assert summary['loket_shifts_imported'] == 2 and summary['kasir_reports_imported'] == 1
+    assert summary['journal_entries_created'] == len(db.ppob_journal_entries.docs) == 3
+    assert summary['shifts_settled'] == 1
+    assert {d['import_batch_id'] for d in db.ppob_journal_entries.docs} == {summary['import_batch_id']}
+    counter, = db.ppob_setoran_counters.docs
+    assert (counter['outstanding_count'], counter['outstanding_total']) == (1, 100.0)
+
+
+def test_duplicate_import_ref_is_rejected_before_any_write():
+    db = FakeDatabase()
+    with pytest.raises(HTTPException) as exc:
+        run(import_ppob_records(db, [shift('A'), shift('A', shift_no=2)], [], 'u1'))
+    assert exc.value.status_code == 400
+    assert 'import_ref duplikat' in exc.value.detail
+    assert db.ppob_loket_shifts.docs == []
+
+
+def test_records_in_closed_period_are_rejected():
+    db = FakeDatabase()
+    db.ppob_period_closings.docs.append({'id': 'c1', 'period': '2024-03', 'period_end': '2024-04-01T00:00:00'})
+    with pytest.raises(HTTPException) as exc:
+        run(import_ppob_records(db, [shift(day=31)], [kasir('x', day=5)], 'u1'))
+    assert exc.value.status_code == 400
+    assert [(r['type'], r['index']) for r in exc.value.detail['records']] == [('loket_shift', 0), ('kasir_report', 0)]
+    assert db.ppob_loket_shifts.docs == [] and db.ppob_kasir_reports.docs == []
+
+
+def test_write_failure_reports_partial_summary():
+    db = FakeDatabase()
+    run(db.ppob_kasir_reports.create_index('business_id', unique=True))  # second report collides
+
+    with pytest.raises(HTTPException) as exc:
+        run(import_ppob_records(db, [shift('A')], [kasir('A'), kasir('x', day=11)], 'u1', chunk_size=1))
+    detail = exc.value.detail
+    assert exc.value.status_code == 500
+    assert detail['loket_shifts_imported'] == 1
+    assert detail['kasir_reports_imported'] == 1
+    assert detail['journal_entries_created'] == 0
+    assert detail['import_batch_id'] in detail['message']
+    assert [d['import_batch_id'] for d in db.ppob_kasir_reports.docs] == [detail['import_batch_id']]
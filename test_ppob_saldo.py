@@ -0,0 +1,96 @@
+"""
+Unit tests for channel saldo chaining - backend/utils/ppob_saldo.py
+The saldo index update is an update pipeline; it runs against the
+in-memory fake's evaluator for $replaceRoot/$cond/$mergeObjects.
+Run: python -m pytest -q test_ppob_saldo.py
+"""
+from fake_mongo import FakeDatabase, run
+from utils.ppob_saldo import (
+    SALDO_GAP_TOLERANCE, find_channel_saldo_gaps, get_channel_saldo, update_channel_saldo_index
+)
+
+
+def shift_doc(report_id, tanggal, shift, channels, business_id='b1'):
+    return {
+        'id': report_id,
+        'business_id': business_id,
+        'tanggal': tanggal,
+        'shift': shift,
+        'nama_petugas': 'Ani',
+        'channels': [
+            {'channel_name': name, 'saldo_awal': awal, 'saldo_akhir': akhir}
+            for name, awal, akhir in channels
+        ]
+    }
+
+
+def saldo_by_channel(db, business_id='b1'):
+    return {s['channel_name']: (s['saldo_akhir'], s['report_id']) for s in run(get_channel_saldo(db, business_id))}
+
+
+def test_newest_shift_wins_within_one_batch():
+    db = FakeDatabase()
+    run(update_channel_saldo_index(db, [
+        shift_doc('r2', '2024-03-10T00:00:00', 2, [('BRIS', 0, 200)]),
+        shift_doc('r1', '2024-03-10T00:00:00', 1, [('BRIS', 0, 100), ('BCA', 0, 50)]),
+    ]))
+    assert saldo_by_channel(db) == {'BCA': (50, 'r1'), 'BRIS': (200, 'r2')}
+    assert db.ppob_channel_saldo.calls.count('bulk_write') == 1
+
+
+def test_back_dated_shift_does_not_overwrite_newer_saldo():
+    db = FakeDatabase()
+    run(update_channel_saldo_index(db, [shift_doc('r3', '2024-03-10T00:00:00', 3, [('BRIS', 0, 300)])]))
+    run(update_channel_saldo_index(db, [shift_doc('r2', '2024-03-10T00:00:00', 2, [('BRIS', 0, 200)])]))
+    run(update_channel_saldo_index(db, [shift_doc('r0', '2024-03-09T00:00:00', 3, [('BRIS', 0, 90)])]))
+    assert saldo_by_channel(db) == {'BRIS': (300, 'r3')}
+
+    run(update_channel_saldo_index(db, [shift_doc('r4', '2024-03-11T00:00:00', 1, [('BRIS', 0, 400)])]))
+    assert saldo_by_channel(db) == {'BRIS': (400, 'r4')}
+
+
+def test_same_tanggal_and_shift_replaces_saldo():
+    db = FakeDatabase()
+    run(update_channel_saldo_index(db, [shift_doc('r1', '2024-03-10T00:00:00', 1, [('BRIS', 0, 100)])]))
+    run(update_channel_saldo_index(db, [shift_doc('r1b', '2024-03-10T00:00:00', 1, [('BRIS', 0, 120)])]))
+    assert saldo_by_channel(db) == {'BRIS': (120, 'r1b')}
+    assert len(db.ppob_channel_saldo.docs) == 1
+
+
+def test_saldo_is_kept_per_business():
+    db = FakeDatabase()
+    run(update_channel_saldo_index(db, [
+        shift_doc('r1', '2024-03-10T00:00:00', 1, [('BRIS', 0, 100)]),
+        shift_doc('x1', '2024-03-09T00:00:00', 1, [('BRIS', 0, 7)], business_id='b2'),
+    ]))
+    assert saldo_by_channel(db, 'b2') == {'BRIS': (7, 'x1')}
+    assert run(update_channel_saldo_index(db, [])) is None
+
+
+PREVIOUS = [
+    {'channel_name': 'BRIS', 'saldo_akhir': 1000.0, 'tanggal': '2024-03-10T00:00:00', 'shift': 1, 'report_id': 'r1'},
+    {'channel_name': 'BCA', 'saldo_akhir': 500.0, 'tanggal': '2024-03-10T00:00:00', 'shift': 1, 'report_id': 'r1'},
+]
+
+
+def test_matching_saldo_within_tolerance_has_no_gaps():
+    doc = shift_doc('r2', '2024-03-10T00:00:00', 2, [('BRIS', 1000 + SALDO_GAP_TOLERANCE, 0), ('BCA', 499.5, 0)])
+    assert find_channel_saldo_gaps(PREVIOUS, doc) == []
+
+
+def test_mismatch_and_missing_channel_are_reported():
+    doc = shift_doc('r2', '2024-03-11T00:00:00', 1, [('BRIS', 900.0, 0), ('Mandiri', 10.0, 0)])
+    gaps = find_channel_saldo_gaps(PREVIOUS, doc)
+    assert gaps == [
+        {'channel_name': 'BRIS', 'type': 'saldo_mismatch', 'expected_saldo_awal': 1000.0,
+         'saldo_awal': 900.0, 'selisih': -100.0, 'previous_report_id': 'r1'},
+        {'channel_name': 'BCA', 'type': 'channel_missing', 'expected_saldo_awal': 500.0,
+         'previous_report_id': 'r1'},
+    ]
+
+
+def test_back_dated_or_same_shift_is_not_checked():
+    same_shift = shift_doc('r1b', '2024-03-10T00:00:00', 1, [('BRIS', 0.0, 0)])
+    earlier = shift_doc('r0', '2024-03-09T00:00:00', 3, [])
+    assert find_channel_saldo_gaps(PREVIOUS, same_shift) == []
+    assert find_channel_saldo_gaps(PREVIOUS, earlier) == []
@@ -0,0 +1,79 @@
+"""
+Unit tests for outstanding setoran counters - backend/utils/ppob_setoran.py
+Run: python -m pytest -q test_ppob_setoran.py
+"""
+from fake_mongo import FakeDatabase, run
+from utils.ppob_setoran import (
+    STATUS_BELUM_DISETOR, STATUS_LUNAS, add_outstanding_setoran, get_outstanding_setoran_queue,
+    get_setoran_counters, rebuild_setoran_counters, settle_loket_shifts
+)
+
+
+def shift(shift_id, business_id='b1', total=100.0, status=STATUS_BELUM_DISETOR, tanggal='2024-03-10T00:00:00'):
+    return {'id': shift_id, 'business_id': business_id, 'total_sisa_setoran': total,
+            'status_setoran': status, 'tanggal': tanggal, 'shift': 1}
+
+
+def counters(db):
+    return {c['business_id']: (c['outstanding_count'], c['outstanding_total']) for c in run(get_setoran_counters(db))}
+
+
+def seeded_db():
+    db = FakeDatabase()
+    docs = [shift('s1'), shift('s2', total=50.0), shift('s3', business_id='b2', total=70.0),
+            shift('s4', status=STATUS_LUNAS)]
+    db.ppob_loket_shifts.docs = [d.copy() for d in docs]
+    run(add_outstanding_setoran(db, docs))
+    return db
+
+
+def test_new_shifts_count_only_when_outstanding():
+    assert counters(seeded_db()) == {'b1': (2, 150.0), 'b2': (1, 70.0)}
+
+
+def test_settle_is_one_update_and_one_find():
+    db = seeded_db()
+    db.ppob_loket_shifts.calls.clear()
+    settled = run(settle_loket_shifts(db, ['s1', 's3', 's1', 's4', 'missing']))
+
+    assert db.ppob_loket_shifts.calls == ['update_many', 'find']
+    assert sorted(d['id'] for d in settled) == ['s1', 's3']
+    assert counters(db) == {'b1': (1, 50.0), 'b2': (0, 0.0)}
+    statuses = {d['id']: d['status_setoran'] for d in db.ppob_loket_shifts.docs}
+    assert statuses == {'s1': STATUS_LUNAS, 's2': STATUS_BELUM_DISETOR, 's3': STATUS_LUNAS, 's4': STATUS_LUNAS}
+
+
+def test_settling_again_never_double_decrements():
+    db = seeded_db()
+    run(settle_loket_shifts(db, ['s1']))
+    assert run(settle_loket_shifts(db, ['s1'])) == []
+    assert run(settle_loket_shifts(db, [])) == []
+    assert counters(db)['b1'] == (1, 50.0)
+
+
+def test_rebuild_fixes_drift_for_given_businesses():
+    db = seeded_db()
+    run(db.ppob_setoran_counters.update_one({'business_id': 'b1'}, {'$inc': {'outstanding_count': 7}}))
+    run(db.ppob_setoran_counters.update_one({'business_id': 'b2'}, {'$inc': {'outstanding_count': 3}}))
+
+    run(rebuild_setoran_counters(db, ['b1']))
+    assert counters(db) == {'b1': (2, 150.0), 'b2': (4, 70.0)}  # b2 untouched
+
+
+def test_full_rebuild_zeroes_businesses_without_outstanding_shifts():
+    db = seeded_db()
+    for doc in db.ppob_loket_shifts.docs:
+        if doc['business_id'] == 'b2':
+            doc['status_setoran'] = STATUS_LUNAS  # settled behind the counters' back
+    db.ppob_loket_shifts.docs.append(shift('s5', business_id='b3', total=20.0))
+
+    run(rebuild_setoran_counters(db))
+    assert counters(db) == {'b1': (2, 150.0), 'b2': (0, 0.0), 'b3': (1, 20.0)}
+
+
+def test_queue_is_oldest_first_and_outstanding_only():
+    db = seeded_db()
+    db.ppob_loket_shifts.docs.append(shift('s0', tanggal='2024-03-01T00:00:00'))
+    queue = run(get_outstanding_setoran_queue(db, 'b1'))
+    assert [d['id'] for d in queue] == ['s0', 's1', 's2']
+    assert [d['id'] for d in run(get_outstanding_setoran_queue(db, limit=2))] == ['s0', 's1']
@@ -0,0 +1,105 @@
+"""
+Unit tests for PPOB loket shift exports - backend/utils/report_generator.py
+PDF text is read back from the (ASCII85 + Flate) content streams; workbooks
+are checked through their XML parts, so no PDF/Excel reader is needed.
+Run: python -m pytest -q test_report_generator.py
+"""
+import asyncio
+import base64
+import io
+import re
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.report_generator import (
+    _ZipSink, ppob_loket_shift_filename, render_ppob_loket_shift_pdfs, render_ppob_loket_shifts_excel,
+    report_generator, stream_ppob_loket_shift_zip
+)
+
+
+def loket_shift(n, tanggal='2024-03-10T00:00:00', catatan=None):
+    return {
+        'id': f'shift-id-{n:08d}',
+        'tanggal': tanggal,
+        'created_at': '2024-03-10T01:30:00+00:00',
+        'shift': n,
+        'nama_petugas': 'Ani Lestari',
+        'status_setoran': 'Belum Disetor',
+        'channels': [{'channel_name': 'BRIS', 'saldo_awal': 1000, 'total_penjualan': 250,
+                      'saldo_inject': 0, 'sisa_setoran': 250, 'saldo_akhir': 750}],
+        'total_penjualan': 250,
+        'total_sisa_setoran': 250,
+        'catatan': catatan
+    }
+
+
+def pdf_text(data: bytes) -> str:
+    text = b''
+    for raw in re.findall(rb'stream\r?\n(.*?)endstream', data, re.S):
+        text += zlib.decompress(base64.a85decode(raw.strip(), adobe=True))
+    return text.decode('latin-1')
+
+
+def test_loket_shift_pdf_uses_the_timezone_passed_in():
+    shift = loket_shift(1, catatan='Selisih < 5 & kas kurang')
+    utc = pdf_text(report_generator.generate_ppob_loket_shift_pdf(shift, 'UTC').getvalue())
+    jakarta = pdf_text(report_generator.generate_ppob_loket_shift_pdf(shift).getvalue())
+
+    assert 'Tanggal Laporan: 10 March 2024, 01:30 UTC' in utc
+    assert 'Tanggal Laporan: 10 March 2024, 08:30 WIB' in jakarta  # no leftover from the previous call
+    assert 'Rp 1,000' in utc and 'Ani Lestari' in utc
+    assert 'Selisih < 5 & kas kurang' in utc  # escaped for ReportLab markup, rendered verbatim
+
+
+def test_unknown_timezone_falls_back_to_default():
+    text = pdf_text(report_generator.generate_ppob_loket_shift_pdf(loket_shift(1), 'Mars/Olympus').getvalue())
+    assert '08:30 WIB' in text
+
+
+def test_render_chunk_names_each_pdf():
+    rendered = render_ppob_loket_shift_pdfs([loket_shift(1), loket_shift(2)], 'UTC')
+    assert [name for name, _ in rendered] == [
+        '20240310_shift1_Ani_Lestari_00000001.pdf',
+        '20240310_shift2_Ani_Lestari_00000002.pdf'
+    ]
+    assert all(content.startswith(b'%PDF') for _, content in rendered)
+    assert ppob_loket_shift_filename(loket_shift(3)) == '20240310_shift3_Ani_Lestari_00000003.pdf'
+
+
+def test_excel_has_one_sheet_per_day():
+    shifts = [loket_shift(2), loket_shift(1), loket_shift(1, tanggal='2024-03-11T00:00:00')]
+    with zipfile.ZipFile(io.BytesIO(render_ppob_loket_shifts_excel(shifts))) as workbook:
+        sheets = re.findall(r'<sheet name="([^"]+)"', workbook.read('xl/workbook.xml').decode())
+        strings = workbook.read('xl/sharedStrings.xml').decode()
+    assert sheets == ['2024-03-10', '2024-03-11']
+    assert 'Shift 1 - Ani Lestari' in strings and 'LAPORAN SHIFT LOKET PPOB - 2024-03-11' in strings
+
+    with zipfile.ZipFile(io.BytesIO(render_ppob_loket_shifts_excel([]))) as workbook:
+        assert re.findall(r'<sheet name="([^"]+)"', workbook.read('xl/workbook.xml').decode()) == ['Kosong']
+
+
+def test_zip_sink_hands_out_only_new_bytes():
+    sink = _ZipSink()
+    assert sink.writable() and not sink.seekable()
+    sink.write(b'abc')
+    sink.write(memoryview(b'de'))
+    assert sink.drain() == b'abcde'
+    assert sink.drain() == b''
+
+
+def test_zip_stream_yields_per_chunk_and_builds_a_valid_archive():
+    shifts = [loket_shift(n) for n in range(1, 6)]
+
+    async def collect():
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            return [part async for part in stream_ppob_loket_shift_zip(shifts, 2, 'UTC', executor=executor)]
+
+    parts = asyncio.run(collect())
+    assert len(parts) == 4  # three chunks of PDFs, then the central directory
+    assert all(parts[:3])
+
+    with zipfile.ZipFile(io.BytesIO(b''.join(parts))) as archive:
+        assert archive.testzip() is None
+        assert sorted(archive.namelist()) == sorted(ppob_loket_shift_filename(s) for s in shifts)
+        assert '01:30 UTC' in pdf_text(archive.read(ppob_loket_shift_filename(shifts[0])))
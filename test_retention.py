@@ -0,0 +1,112 @@
+"""
+Unit tests for activity log retention - backend/utils/retention.py
+Run: python -m pytest -q test_retention.py
+"""
+import asyncio
+from datetime import timedelta
+
+import pytest
+
+import utils.retention as retention
+from utils.helpers import utc_now
+from utils.retention import archive_collection_name, purge_activity_logs
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, field, direction):
+        self.docs.sort(key=lambda d: d[field], reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, length):
+        return self.docs[:length]
+
+
+class FakeCollection:
+    """Just the queries purge_activity_logs issues ({'created_at': {'$lt': x}}, {'_id': {'$in': ids}})"""
+
+    def __init__(self):
+        self.docs = []
+
+    def _matches(self, doc, query):
+        if 'created_at' in query:
+            return doc['created_at'] < query['created_at']['$lt']
+        return doc['_id'] in query['_id']['$in']
+
+    def find(self, query):
+        return FakeCursor([dict(d) for d in self.docs if self._matches(d, query)])
+
+    async def count_documents(self, query):
+        return sum(self._matches(d, query) for d in self.docs)
+
+    async def delete_many(self, query):
+        before = len(self.docs)
+        self.docs = [d for d in self.docs if not self._matches(d, query)]
+        return type('Result', (), {'deleted_count': before - len(self.docs)})
+
+    async def insert_many(self, docs, ordered=True):
+        self.docs.extend(dict(d) for d in docs)
+
+    async def create_index(self, *args, **kwargs):
+        pass
+
+
+class FakeDb:
+    def __init__(self):
+        self.collections = {}
+
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, FakeCollection())
+
+    def __getattr__(self, name):
+        return self[name]
+
+    async def create_collection(self, name, **kwargs):
+        self[name]
+
+
+@pytest.fixture(autouse=True)
+def fresh_archive_cache(monkeypatch):
+    monkeypatch.setattr(retention, '_archive_collections', set())
+
+
+def _log(i, days_ago):
+    return {'_id': i, 'id': f'log-{i}', 'created_at': (utc_now() - timedelta(days=days_ago)).isoformat()}
+
+
+def test_archive_collection_name_is_monthly():
+    assert archive_collection_name('2025-03-14T08:00:00+00:00') == 'activity_logs_archive_2025_03'
+
+
+def test_dry_run_only_counts():
+    db = FakeDb()
+    db.activity_logs.docs = [_log(1, 400), _log(2, 10)]
+    summary = asyncio.run(purge_activity_logs(db, retention_days=365, dry_run=True))
+    assert summary['eligible'] == 1
+    assert len(db.activity_logs.docs) == 2
+
+
+def test_expired_logs_move_to_monthly_archives_in_batches():
+    db = FakeDb()
+    db.activity_logs.docs = [_log(i, 400 + i * 20) for i in range(7)] + [_log(100, 5)]
+    summary = asyncio.run(purge_activity_logs(db, retention_days=365, batch_size=3))
+
+    assert summary['purged'] == 7
+    assert [d['id'] for d in db.activity_logs.docs] == ['log-100']
+    archived = [d for name in summary['archived_to'] for d in db[name].docs]
+    assert sorted(d['id'] for d in archived) == sorted(f'log-{i}' for i in range(7))
+    assert all(archive_collection_name(d['created_at']) in summary['archived_to'] for d in archived)
+
+
+def test_purge_without_archive_just_deletes():
+    db = FakeDb()
+    db.activity_logs.docs = [_log(1, 400)]
+    summary = asyncio.run(purge_activity_logs(db, retention_days=30, archive=False))
+    assert summary['purged'] == 1 and summary['archived_to'] == []
+    assert set(db.collections) == {'activity_logs'}
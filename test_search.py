@@ -0,0 +1,70 @@
+"""
+Unit tests for order search tokens - backend/utils/search.py
+Run: python -m pytest -q test_search.py
+"""
+import pytest
+from fastapi import HTTPException
+
+from utils.search import (
+    MAX_SEARCH_CANDIDATES, MAX_SEARCH_TERMS, MAX_TOKEN_LENGTH,
+    build_order_search_fields, build_order_search_pipeline, parse_search_terms, search_fields_for_update
+)
+
+ORDER = {
+    'customer_name': 'Budi Santoso',
+    'customer_phone': '+62 812-3456-7890',
+    'customer_email': 'budi.s@mail.com',
+    'order_number': 'ORD20250115000042'
+}
+
+
+def test_search_fields_cover_every_source_field():
+    fields = build_order_search_fields(ORDER)
+    words = set(fields['search_words'])
+    assert {'budi', 'santoso', 'mail', 'com', 's'} <= words
+    assert {'6281234567890', '081234567890'} <= words  # both phone spellings
+    assert {'ord20250115000042', '20250115000042'} <= words  # order number with/without prefix
+    assert 'budi.s@mail.com' not in words  # whole email is never a token source
+
+
+def test_tokens_are_prefixes_within_bounds():
+    tokens = build_order_search_fields(ORDER)['search_tokens']
+    assert {'bu', 'bud', 'budi', 'sa', 'santoso', '08', '0812'} <= set(tokens)
+    assert all(2 <= len(t) <= MAX_TOKEN_LENGTH for t in tokens)
+    assert tokens == sorted(set(tokens))
+
+
+def test_every_parsed_term_matches_its_own_order():
+    tokens = set(build_order_search_fields(ORDER)['search_tokens'])
+    for q in ['budi', 'Santo', '0812 3456', '+62 812-3456', 'ORD2025', '20250115']:
+        assert set(parse_search_terms(q)) <= tokens, q
+
+
+def test_parse_search_terms_normalizes():
+    assert parse_search_terms('  Budi   SANTOSO ') == ['budi', 'santoso']
+    assert parse_search_terms('+62 (812) 3456-7890') == ['6281234567890']
+    assert parse_search_terms('budi budi a') == ['budi']  # duplicates and 1-char words dropped
+    assert parse_search_terms('x' * 50) == ['x' * MAX_TOKEN_LENGTH]
+    assert len(parse_search_terms('aa bb cc dd ee ff gg')) == MAX_SEARCH_TERMS
+
+
+@pytest.mark.parametrize('q', ['', 'a', '  ', '!@#'])
+def test_parse_search_terms_rejects_short_queries(q):
+    with pytest.raises(HTTPException) as exc:
+        parse_search_terms(q)
+    assert exc.value.status_code == 400
+
+
+def test_update_rebuilds_tokens_only_for_source_fields():
+    assert search_fields_for_update(ORDER, {'status': 'completed'}) == {}
+    fields = search_fields_for_update(ORDER, {'customer_name': 'Siti Aminah'})
+    assert 'siti' in fields['search_words'] and 'santoso' not in fields['search_words']
+    assert '081234567890' in fields['search_words']  # unchanged fields kept
+
+
+def test_pipeline_caps_candidates_before_scoring():
+    pipeline = build_order_search_pipeline(['budi'], {'business_id': 'b1'}, skip=0, limit=20)
+    stages = [next(iter(stage)) for stage in pipeline]
+    assert stages[:4] == ['$match', '$sort', '$limit', '$addFields']
+    assert pipeline[0]['$match'] == {'business_id': 'b1', 'search_tokens': {'$all': ['budi']}}
+    assert pipeline[2]['$limit'] == MAX_SEARCH_CANDIDATES
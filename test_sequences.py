@@ -0,0 +1,78 @@
+"""
+Unit tests for leased sequence blocks - backend/utils/sequences.py
+Run: python -m pytest -q test_sequences.py
+"""
+import asyncio
+from datetime import datetime, timezone
+
+import utils.sequences as sequences
+from fake_mongo import FakeDatabase
+from utils.sequences import SEQUENCE_DIGITS, SequenceAllocator
+
+
+def allocator(db, block_size=3):
+    seq = SequenceAllocator(block_size=block_size)
+    seq.bind(db)
+    return seq
+
+
+def slow_leases(db):
+    """Yield to the event loop inside every lease, like a real round-trip"""
+    lease = db.counters.find_one_and_update
+
+    async def find_one_and_update(*args, **kwargs):
+        await asyncio.sleep(0)
+        return await lease(*args, **kwargs)
+
+    db.counters.find_one_and_update = find_one_and_update
+
+
+def test_block_is_refilled_when_exhausted():
+    async def scenario():
+        db = FakeDatabase()
+        seq = allocator(db)
+        values = [await seq.next_value('ORD-20250115') for _ in range(7)]
+        assert values == [1, 2, 3, 4, 5, 6, 7]
+        assert db.counters.calls.count('find_one_and_update') == 3  # 7 values, blocks of 3
+        assert db.counters.docs[0]['value'] == 9  # 8 and 9 stay leased to this worker
+    asyncio.run(scenario())
+
+
+def test_workers_get_disjoint_blocks():
+    async def scenario():
+        db = FakeDatabase()
+        first, second = allocator(db), allocator(db)
+        a, b = [], []
+        for _ in range(4):
+            a.append(await first.next_value('TXN-20250115'))
+            b.append(await second.next_value('TXN-20250115'))
+        assert a == [1, 2, 3, 7] and b == [4, 5, 6, 10]
+    asyncio.run(scenario())
+
+
+def test_concurrent_codes_are_unique_with_one_lease_per_block():
+    async def scenario():
+        db = FakeDatabase()
+        slow_leases(db)
+        seq = allocator(db, block_size=10)
+        codes = await asyncio.gather(*(seq.next_code('ORD') for _ in range(95)))
+        assert len(set(codes)) == 95
+        assert db.counters.calls.count('find_one_and_update') == 10
+        day = datetime.now(timezone.utc).strftime('%Y%m%d')
+        assert sorted(codes)[0] == f'ORD{day}{1:0{SEQUENCE_DIGITS}d}'
+    asyncio.run(scenario())
+
+
+def test_sequence_restarts_each_day_and_drops_old_blocks(monkeypatch):
+    async def scenario():
+        db = FakeDatabase()
+        seq = allocator(db)
+        now = [datetime(2025, 1, 15, 23, 59, tzinfo=timezone.utc)]
+        monkeypatch.setattr(sequences, 'utc_now', lambda: now[0])
+
+        assert await seq.next_code('JE') == 'JE20250115000001'
+        assert await seq.next_code('TXN') == 'TXN20250115000001'
+        now[0] = datetime(2025, 1, 16, 0, 1, tzinfo=timezone.utc)
+        assert await seq.next_code('JE') == 'JE20250116000001'
+        assert set(seq._blocks) == {'JE-20250116', 'TXN-20250115'}  # other prefixes evict on their own
+    asyncio.run(scenario())
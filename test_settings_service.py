@@ -0,0 +1,148 @@
+"""
+Unit tests for the in-process settings cache - backend/utils/settings_service.py
+Run: python -m pytest -q test_settings_service.py
+"""
+import asyncio
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from utils.auth import ACCESS_TOKEN_EXPIRE_MINUTES
+from utils.settings_service import SETTINGS_DEFAULTS, VERSION_ID, SettingsService
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length):
+        return self.docs
+
+
+class FakeSettings:
+    def __init__(self, docs):
+        self.docs = {doc['setting_key']: doc for doc in docs}
+        self.finds = 0
+
+    def find(self, query, projection):
+        self.finds += 1
+        return FakeCursor([dict(doc) for doc in self.docs.values()])
+
+    async def bulk_write(self, operations, ordered=True):
+        for op in operations:
+            key = op._filter['setting_key']
+            self.docs.setdefault(key, {'setting_key': key}).update(op._doc['$set'])
+        return type('Result', (), {'modified_count': len(operations), 'upserted_count': 0})
+
+
+class FakeCounters:
+    def __init__(self):
+        self.value = 0
+        self.reads = 0
+
+    async def find_one(self, query):
+        self.reads += 1
+        return {'_id': VERSION_ID, 'value': self.value} if self.value else None
+
+    async def update_one(self, query, update, upsert=False):
+        self.value += update['$inc']['value']
+
+
+class FakeDb:
+    def __init__(self, settings=()):
+        self.settings = FakeSettings([{'setting_key': k, 'setting_value': v} for k, v in settings])
+        self.counters = FakeCounters()
+
+
+def _service(db, check_interval=60):
+    service = SettingsService(check_interval=check_interval)
+    service.bind(db)
+    return service
+
+
+def test_reads_are_served_from_memory():
+    db = FakeDb([('company_name', 'GELIS')])
+    service = _service(db)
+
+    async def scenario():
+        return [await service.get('company_name') for _ in range(20)]
+
+    assert asyncio.run(scenario()) == ['GELIS'] * 20
+    assert db.settings.finds == 1
+    assert db.counters.reads == 1
+
+
+def test_reload_only_when_version_moves():
+    db = FakeDb([('company_name', 'GELIS')])
+    service = _service(db, check_interval=0)
+
+    async def scenario():
+        await service.get('company_name')
+        await service.get('company_name')  # version unchanged: no reload
+        assert db.settings.finds == 1
+        # Another worker writes and bumps the version
+        db.settings.docs['company_name']['setting_value'] = 'GELIS Baru'
+        db.counters.value += 1
+        return await service.get('company_name')
+
+    assert asyncio.run(scenario()) == 'GELIS Baru'
+    assert db.settings.finds == 2
+    assert service.stats()['reloads'] == 2
+
+
+def test_own_write_is_visible_immediately():
+    db = FakeDb()
+    service = _service(db, check_interval=60)
+
+    async def scenario():
+        await service.get('language')
+        await service.set_many({'language': 'en', 'currency': 'USD'}, updated_by='u1')
+        return await service.get('language'), await service.get_document('currency')
+
+    language, currency = asyncio.run(scenario())
+    assert language == 'en'
+    assert currency['updated_by'] == 'u1'
+    assert db.counters.value == 1
+
+
+def test_defaults_and_typed_getters():
+    db = FakeDb([('data_retention_days', 'abc'), ('two_factor_auth', 'yes'), ('company_phone', None)])
+    service = _service(db)
+
+    async def scenario():
+        return (
+            await service.get('timezone'),
+            await service.get_int('data_retention_days'),
+            await service.get_bool('two_factor_auth'),
+            await service.get_str('company_phone', '-'),
+            (await service.all())['currency'],
+        )
+
+    assert asyncio.run(scenario()) == (
+        SETTINGS_DEFAULTS['timezone'], SETTINGS_DEFAULTS['data_retention_days'], True, '-', 'IDR'
+    )
+
+
+def test_timezone_and_session_timeout():
+    async def read(settings):
+        service = _service(FakeDb(settings))
+        return await service.get_timezone(), await service.get_session_timeout()
+
+    assert asyncio.run(read([])) == ('Asia/Jakarta', ACCESS_TOKEN_EXPIRE_MINUTES)
+    assert asyncio.run(read([('timezone', 'Asia/Makassar'), ('session_timeout', '60')])) == ('Asia/Makassar', 60)
+    assert asyncio.run(read([('timezone', 'Mars/Olympus'), ('session_timeout', 0)])) == ('Asia/Jakarta', 1)
+
+
+def test_session_timeout_defaults_to_env_token_lifetime():
+    # ACCESS_TOKEN_EXPIRE_MINUTES is read at import time, so check it in a fresh interpreter
+    script = (
+        'import asyncio\n'
+        'from test_settings_service import FakeDb, _service\n'
+        'print(asyncio.run(_service(FakeDb()).get_session_timeout()))\n'
+        'print(asyncio.run(_service(FakeDb([("session_timeout", 15)])).get_session_timeout()))\n'
+    )
+    root = Path(__file__).parent
+    env = {**os.environ, 'ACCESS_TOKEN_EXPIRE_MINUTES': '90', 'PYTHONPATH': os.pathsep.join([str(root), str(root / 'backend')])}
+    result = subprocess.run([sys.executable, '-c', script], env=env, capture_output=True, text=True, check=True)
+    assert result.stdout.split() == ['90', '15']  # env value unless a setting is stored
@@ -0,0 +1,148 @@
+"""
+Unit tests for technical progress - backend/utils/technical_progress.py
+The server-side OVERALL_PROGRESS_EXPR must give the same number as
+calculate_overall_progress; it is checked with a small evaluator for the
+aggregation operators it uses.
+Run: python -m pytest -q test_technical_progress.py
+"""
+import asyncio
+
+import pytest
+
+from utils.technical_progress import (
+    OVERALL_PROGRESS_EXPR, build_progress_summary, calculate_overall_progress,
+    get_progress_by_order_ids, newer_summary_filter
+)
+
+
+def evaluate(expr, variables):
+    """Evaluate the subset of aggregation expressions used by OVERALL_PROGRESS_EXPR"""
+    if isinstance(expr, str) and expr.startswith('$$'):
+        name, *path = expr[2:].split('.')
+        value = variables[name]
+        for key in path:
+            value = value.get(key) if isinstance(value, dict) else None
+        return value
+    if isinstance(expr, str) and expr.startswith('$'):
+        return evaluate('$$ROOT.' + expr[1:], variables)
+    if not isinstance(expr, dict):
+        return expr
+
+    (op, arg), = expr.items()
+    if op == '$sum':
+        values = evaluate(arg, variables)
+        return sum(v for v in values if isinstance(v, (int, float)))
+    if op == '$map':
+        return [
+            evaluate(arg['in'], {**variables, arg['as']: item})
+            for item in evaluate(arg['input'], variables)
+        ]
+    if op == '$ifNull':
+        value = evaluate(arg[0], variables)
+        return evaluate(arg[1], variables) if value is None else value
+    if op == '$switch':
+        for branch in arg['branches']:
+            if evaluate(branch['case'], variables):
+                return evaluate(branch['then'], variables)
+        return evaluate(arg['default'], variables)
+    if op == '$eq':
+        return evaluate(arg[0], variables) == evaluate(arg[1], variables)
+    if op == '$multiply':
+        result = 1
+        for value in arg:
+            result *= evaluate(value, variables)
+        return result
+    raise AssertionError(f'operator {op} not covered by the test evaluator')
+
+
+def server_progress(doc):
+    return evaluate(OVERALL_PROGRESS_EXPR, {'ROOT': doc})
+
+
+STEP_CASES = [
+    [],
+    [{'step_name': 'a', 'status': 'pending', 'step_weight': 30}],
+    [{'step_name': 'a', 'status': 'completed', 'step_weight': 30},
+     {'step_name': 'b', 'status': 'in_progress', 'step_weight': 45},
+     {'step_name': 'c', 'status': 'pending', 'step_weight': 25}],
+    [{'step_name': 'a', 'status': 'completed', 'step_weight': 50},
+     {'step_name': 'b', 'status': 'completed', 'step_weight': 50}],
+    [{'step_name': 'a', 'status': 'in_progress'},  # missing weight counts as 0
+     {'step_name': 'b', 'status': 'completed', 'step_weight': 15}],
+    [{'step_name': 'a', 'status': 'skipped', 'step_weight': 40}],
+]
+
+
+@pytest.mark.parametrize('steps', STEP_CASES)
+def test_server_expression_matches_python(steps):
+    assert server_progress({'steps': steps}) == pytest.approx(calculate_overall_progress(steps))
+
+
+def test_missing_steps_are_zero():
+    assert server_progress({}) == 0
+    assert calculate_overall_progress(None) == 0
+
+
+def test_summary_is_compact():
+    progress = {
+        'id': 'p1', 'order_id': 'o1', 'updated_at': '2025-01-01T00:00:00', 'version': 4,
+        'steps': [{'step_name': 'a', 'status': 'completed', 'step_weight': 60, 'notes': 'n', 'photos': ['x']}]
+    }
+    summary = build_progress_summary(progress)
+    assert summary == {
+        'id': 'p1',
+        'overall_progress': 60,
+        'steps': [{'step_name': 'a', 'status': 'completed', 'step_weight': 60}],
+        'updated_at': '2025-01-01T00:00:00',
+        'version': 4
+    }
+
+
+def test_newer_summary_filter_only_replaces_older_versions():
+    assert newer_summary_filter('o1', {'version': 3}) == {'id': 'o1', '$or': [
+        {'technical_progress.version': {'$lt': 3}},
+        {'technical_progress.version': {'$exists': False}}
+    ]}
+
+
+class FakeFind:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        self._iter = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeDb:
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = []
+
+    @property
+    def technical_progress(self):
+        return self
+
+    def find(self, query, projection):
+        self.queries.append(query)
+        ids = query['order_id']['$in']
+        return FakeFind([d for d in self.docs if d['order_id'] in ids])
+
+
+def test_progress_for_many_orders_is_one_query():
+    db = FakeDb([
+        {'id': 'p1', 'order_id': 'o1', 'steps': [{'step_name': 'a', 'status': 'completed', 'step_weight': 100}]},
+        {'id': 'p2', 'order_id': 'o2', 'steps': []},
+    ])
+    progress = asyncio.run(get_progress_by_order_ids(db, ['o1', 'o2', 'o3']))
+    assert len(db.queries) == 1
+    assert set(progress) == {'o1', 'o2'}
+    assert progress['o1']['overall_progress'] == 100
+    assert asyncio.run(get_progress_by_order_ids(db, [])) == {}
+    assert len(db.queries) == 1
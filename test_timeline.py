@@ -0,0 +1,125 @@
+"""
+Unit tests for the entity audit timeline - backend/utils/timeline.py
+Run: python -m pytest -q test_timeline.py
+"""
+import asyncio
+
+from utils.timeline import get_entity_timeline
+
+
+def matches(doc, query):
+    """Equality, $lt, $and and $or: the operators keyset_query produces"""
+    for key, condition in query.items():
+        if key == '$and':
+            if not all(matches(doc, q) for q in condition):
+                return False
+        elif key == '$or':
+            if not any(matches(doc, q) for q in condition):
+                return False
+        elif isinstance(condition, dict):
+            if not doc.get(key) < condition['$lt']:
+                return False
+        elif doc.get(key) != condition:
+            return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, keys):
+        for field, direction in reversed(keys):
+            self.docs.sort(key=lambda d: d[field], reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, length):
+        return self.docs[:length]
+
+
+class FakeCollection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.finds = 0
+
+    def find(self, query, projection):
+        self.finds += 1
+        return FakeCursor([dict(d) for d in self.docs if matches(d, query)])
+
+
+class FakeDb:
+    def __init__(self, collections):
+        self.collections = collections
+
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, FakeCollection([]))
+
+
+def _db():
+    logs = [
+        {'id': f'log-{i}', 'related_type': 'order', 'related_id': 'o1', 'action': 'update_order',
+         'created_at': f'2025-01-01T00:00:{i:02d}', 'user_id': 'u1', 'description': f'log {i}'}
+        for i in range(0, 20, 2)
+    ]
+    logs.append({'id': 'log-other', 'related_type': 'order', 'related_id': 'o2', 'created_at': '2025-01-01T00:00:30'})
+    notifications = [
+        {'id': f'notif-{i}', 'related_type': 'order', 'related_id': 'o1', 'type': 'info',
+         'created_at': f'2025-01-01T00:00:{i:02d}', 'user_id': 'u2', 'title': f'notif {i}'}
+        for i in range(1, 20, 4)
+    ]
+    events = [
+        {'id': f'event-{i}', 'order_id': 'o1', 'type': 'status_changed',
+         'ts': f'2025-01-01T00:00:{i:02d}', 'actor': {'id': 'u3', 'name': 'x'}}
+        for i in range(3, 20, 4)
+    ]
+    # Same timestamp in two sources: order falls back to id
+    events.append({'id': 'event-tie', 'order_id': 'o1', 'type': 'note_added', 'ts': '2025-01-01T00:00:04'})
+    return FakeDb({
+        'activity_logs': FakeCollection(logs),
+        'notifications': FakeCollection(notifications),
+        'order_events': FakeCollection(events),
+    })
+
+
+def _all_pages(db, limit, related_type='order'):
+    pages, after = [], None
+    while True:
+        items, after = asyncio.run(get_entity_timeline(db, related_type, 'o1', after=after, limit=limit))
+        pages.append(items)
+        if after is None:
+            return pages
+
+
+def test_sources_are_merged_newest_first():
+    items, _ = asyncio.run(get_entity_timeline(_db(), 'order', 'o1', limit=100))
+    keys = [(item['created_at'], item['id']) for item in items]
+    assert keys == sorted(keys, reverse=True)
+    assert {item['source'] for item in items} == {'activity_log', 'notification', 'order_event'}
+    assert 'log-other' not in {item['id'] for item in items}
+    assert len(items) == 10 + 5 + 5 + 1
+
+
+def test_item_fields_are_normalized():
+    items, _ = asyncio.run(get_entity_timeline(_db(), 'order', 'o1', limit=100))
+    by_id = {item['id']: item for item in items}
+    assert by_id['log-2']['type'] == 'update_order' and by_id['log-2']['description'] == 'log 2'
+    assert by_id['notif-5']['description'] == 'notif 5' and by_id['notif-5']['user_id'] == 'u2'
+    assert by_id['event-3']['created_at'] == '2025-01-01T00:00:03' and by_id['event-3']['user_id'] == 'u3'
+
+
+def test_pages_cover_everything_exactly_once():
+    everything, _ = asyncio.run(get_entity_timeline(_db(), 'order', 'o1', limit=100))
+    pages = _all_pages(_db(), limit=4)
+    assert all(len(page) == 4 for page in pages[:-1])
+    assert [item['id'] for page in pages for item in page] == [item['id'] for item in everything]
+
+
+def test_order_events_only_for_orders():
+    db = _db()
+    asyncio.run(get_entity_timeline(db, 'transaction', 'o1'))
+    assert db['order_events'].finds == 0
+    assert db['activity_logs'].finds == 1
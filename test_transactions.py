@@ -0,0 +1,77 @@
+"""
+Unit tests for committing related writes together - backend/utils/transactions.py
+Run: python -m pytest -q test_transactions.py
+"""
+import pytest
+from pymongo.errors import OperationFailure
+
+from fake_mongo import FakeClient, run
+from utils import transactions
+from utils.transactions import commit_together
+
+
+@pytest.fixture(autouse=True)
+def fresh_support_flag(monkeypatch):
+    monkeypatch.setattr(transactions, '_transactions_supported', None)
+
+
+def order_and_payment(db, sessions):
+    async def insert_order(session):
+        sessions.append(session)
+        await db.orders.insert_one({'id': 'o1'}, session=session)
+
+    async def insert_payment(session):
+        sessions.append(session)
+        await db.transactions.insert_one({'id': 't1', 'order_id': 'o1'}, session=session)
+
+    return [insert_order, insert_payment]
+
+
+def test_writes_commit_in_one_transaction():
+    client = FakeClient()
+    db = client['gelis_db']
+    sessions = []
+    run(commit_together(client, order_and_payment(db, sessions)))
+
+    assert len(db.orders.docs) == 1 and len(db.transactions.docs) == 1
+    assert sessions == [client.sessions[0]] * 2
+    assert client.sessions[0].transactions == 1
+    assert transactions._transactions_supported is True
+
+
+def test_failed_write_rolls_back_the_others():
+    client = FakeClient()
+    db = client['gelis_db']
+
+    async def failing_payment(session):
+        raise OperationFailure('write conflict', 112)
+
+    writes = order_and_payment(db, [])[:1] + [failing_payment]
+    with pytest.raises(OperationFailure):
+        run(commit_together(client, writes))
+    assert db.orders.docs == []
+    assert transactions._transactions_supported is None
+
+
+def test_standalone_falls_back_to_plain_writes():
+    client = FakeClient(transactions=False)
+    db = client['gelis_db']
+    sessions = []
+    run(commit_together(client, order_and_payment(db, sessions)))
+
+    assert len(db.orders.docs) == 1 and len(db.transactions.docs) == 1
+    assert sessions == [None, None]
+    assert transactions._transactions_supported is False
+
+    # Known standalone: no more sessions are opened
+    run(commit_together(client, order_and_payment(db, sessions)))
+    assert len(client.sessions) == 1
+    assert sessions[2:] == [None, None]
+
+
+def test_single_write_needs_no_session():
+    client = FakeClient()
+    sessions = []
+    run(commit_together(client, order_and_payment(client['gelis_db'], sessions)[:1]))
+    assert sessions == [None]
+    assert client.sessions == []